@@ -0,0 +1,158 @@
+import os
+import time
+import shutil
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+import orjson
+import registro_dados
+
+
+PASTA_RELATORIOS = os.path.join(registro_dados.PASTA_DADOS, "relatorios")
+
+# Espaço máximo ocupado por PDFs e textos; acima disso saem os relatórios usados há mais tempo
+TAMANHO_MAXIMO = int(os.getenv("RELATORIOS_TAMANHO_MAXIMO", str(500 * 1024 * 1024)))
+
+
+@contextmanager
+def area_trabalho(pasta_base=os.path.join(registro_dados.PASTA_DADOS, "downloads")):
+    """
+    Pasta temporária exclusiva de uma requisição, apagada ao final; usuários simultâneos
+    não enxergam os downloads uns dos outros.
+    """
+    os.makedirs(pasta_base, exist_ok=True)
+    pasta = tempfile.mkdtemp(prefix="relatorio_", dir=pasta_base)
+    try:
+        yield pasta
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+class AcervoRelatorios:
+    """
+    Relatórios gerenciais já baixados, por (ticker, mês de referência, hash do conteúdo).
+
+    O PDF e o texto de cada página ficam em `<sha256>.pdf` e `<sha256>.json`, uma única vez
+    por conteúdo; o índice em SQLite liga cada ticker e mês ao conteúdo e guarda o último acesso.
+    """
+
+    def __init__(self, pasta=PASTA_RELATORIOS, tamanho_maximo=TAMANHO_MAXIMO):
+        self.pasta = pasta
+        self.tamanho_maximo = tamanho_maximo
+        self._lock = threading.Lock()
+        self._conexao = None
+
+    def conexao(self):
+        if self._conexao is None:
+            os.makedirs(self.pasta, exist_ok=True)
+            conexao = sqlite3.connect(os.path.join(self.pasta, "indice.sqlite3"), timeout=30, check_same_thread=False, isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("""CREATE TABLE IF NOT EXISTS relatorios (
+                ticker TEXT, mes TEXT, url TEXT, sha256 TEXT, PRIMARY KEY (ticker, mes))""")
+            conexao.execute("CREATE TABLE IF NOT EXISTS conteudos (sha256 TEXT PRIMARY KEY, tamanho INTEGER, acessado_em REAL)")
+            self._conexao = conexao
+        return self._conexao
+
+    def caminho_pdf(self, sha256):
+        return os.path.join(self.pasta, f"{sha256}.pdf")
+
+    def caminho_paginas(self, sha256):
+        return os.path.join(self.pasta, f"{sha256}.json")
+
+    def obter(self, ticker, mes, url=None):
+        """
+        Texto das páginas do relatório de `ticker` no mês `mes` ("AAAA-MM"), ou None se não
+        estiver guardado. Com `url`, um relatório guardado de outro endereço (republicado) não vale.
+        """
+        with self._lock:
+            linha = self.conexao().execute(
+                "SELECT url, sha256 FROM relatorios WHERE ticker = ? AND mes = ?", (ticker.lower(), mes)
+            ).fetchone()
+            if linha is None or (url is not None and linha[0] != url):
+                return None
+            sha256 = linha[1]
+            try:
+                with open(self.caminho_paginas(sha256), "rb") as arquivo:
+                    paginas = orjson.loads(arquivo.read())
+            except FileNotFoundError:
+                return None
+            self.conexao().execute("UPDATE conteudos SET acessado_em = ? WHERE sha256 = ?", (time.time(), sha256))
+        return paginas
+
+    def guardar_pdf(self, caminho_pdf):
+        """
+        Move o PDF para o acervo e já o registra na conta do espaço, para que um PDF cuja
+        extração falhe também possa ser despejado. Ele só fica ligado a um ticker e mês com o texto.
+
+        Returns:
+            str: Hash SHA-256 do PDF.
+        """
+        sha256 = registro_dados.hash_arquivo(caminho_pdf)
+        with self._lock:
+            conexao = self.conexao()
+            if not os.path.exists(self.caminho_pdf(sha256)):
+                shutil.move(caminho_pdf, self.caminho_pdf(sha256))
+            # Um conteúdo já guardado mantém o tamanho com o texto; só o acesso é atualizado
+            conexao.execute("INSERT OR IGNORE INTO conteudos VALUES (?, ?, ?)", (sha256, os.path.getsize(self.caminho_pdf(sha256)), time.time()))
+            conexao.execute("UPDATE conteudos SET acessado_em = ? WHERE sha256 = ?", (time.time(), sha256))
+            self._despejar(conexao)
+        return sha256
+
+    def guardar_paginas(self, ticker, mes, url, sha256, paginas):
+        with self._lock:
+            temporario = f"{self.caminho_paginas(sha256)}.{os.getpid()}.tmp"
+            with open(temporario, "wb") as arquivo:
+                arquivo.write(orjson.dumps(paginas))
+            os.replace(temporario, self.caminho_paginas(sha256))
+
+            conexao = self.conexao()
+            tamanho = os.path.getsize(self.caminho_pdf(sha256)) + os.path.getsize(self.caminho_paginas(sha256))
+            conexao.execute("INSERT OR REPLACE INTO conteudos VALUES (?, ?, ?)", (sha256, tamanho, time.time()))
+            conexao.execute("INSERT OR REPLACE INTO relatorios VALUES (?, ?, ?, ?)", (ticker.lower(), mes, url, sha256))
+            self._despejar(conexao)
+
+    def guardar(self, ticker, mes, url, caminho_pdf, paginas):
+        """
+        Guarda o PDF (movido para o acervo) e o texto das páginas.
+
+        Returns:
+            str: Hash SHA-256 do PDF.
+        """
+        sha256 = self.guardar_pdf(caminho_pdf)
+        self.guardar_paginas(ticker, mes, url, sha256, paginas)
+        return sha256
+
+    def extrair_e_guardar(self, ticker, mes, url, sha256, extrair):
+        """
+        Gera o texto das páginas com `extrair(caminho_pdf)` à medida que sai e, ao final,
+        guarda tudo no acervo. Uma extração interrompida no meio não é guardada.
+        """
+        paginas = []
+        for texto in extrair(self.caminho_pdf(sha256)):
+            paginas.append(texto)
+            yield texto
+        self.guardar_paginas(ticker, mes, url, sha256, paginas)
+
+    def _despejar(self, conexao):
+        total = conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM conteudos").fetchone()[0]
+        if total <= self.tamanho_maximo:
+            return
+
+        # Mantém sempre o conteúdo acessado por último, mesmo que sozinho passe do limite
+        excedente = total - self.tamanho_maximo
+        linhas = conexao.execute("SELECT sha256, tamanho FROM conteudos ORDER BY acessado_em").fetchall()[:-1]
+        for sha256, tamanho in linhas:
+            if excedente <= 0:
+                break
+            conexao.execute("DELETE FROM relatorios WHERE sha256 = ?", (sha256,))
+            conexao.execute("DELETE FROM conteudos WHERE sha256 = ?", (sha256,))
+            for caminho in (self.caminho_pdf(sha256), self.caminho_paginas(sha256)):
+                try:
+                    os.remove(caminho)
+                except OSError:
+                    pass
+            excedente -= tamanho
+
+
+acervo = AcervoRelatorios()
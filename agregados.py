@@ -0,0 +1,135 @@
+import os
+import glob
+import pandas as pd
+import ingestao
+import registro_dados
+import ranking
+
+
+PASTA_AGREGADOS = os.path.join(registro_dados.PASTA_COLUNAR, "agregados")
+
+# Fundos por ano nos rankings de ativos e passivos
+TOP_N = 5
+
+COLUNAS_ATIVO = ["Total_Necessidades_Liquidez", "Total_Investido", "Direitos_Bens_Imoveis", "Valores_Receber"]
+
+
+def agregar_ativo_passivo(df):
+    """
+    Soma de ativos (balanço contábil) e de passivos por fundo e ano.
+    """
+    totais = pd.DataFrame({
+        "CNPJ_Fundo": df["CNPJ_Fundo"].astype(str),
+        "Ano": df["Data_Referencia"].dt.year,
+        "Total_Ativo": df[COLUNAS_ATIVO].sum(axis=1),
+        "Total_Passivo": df["Total_Passivo"],
+    })
+    return totais.groupby(["CNPJ_Fundo", "Ano"], observed=True)[["Total_Ativo", "Total_Passivo"]].sum().reset_index()
+
+
+def montar_maiores(df):
+    # Ativos e passivos ranqueados na mesma passada sobre os totais
+    maiores = ranking.maiores_por_grupo(agregar_ativo_passivo(df), "Ano", ["Total_Ativo", "Total_Passivo"], TOP_N, colunas=["CNPJ_Fundo"])
+    return {"maiores_ativos": maiores["Total_Ativo"], "maiores_passivos": maiores["Total_Passivo"]}
+
+
+def montar_segmentos_ano(df):
+    segmentos = pd.DataFrame({"Segmento_Atuacao": df["Segmento_Atuacao"].astype(object), "Ano": df["Data_Referencia"].dt.year})
+    return {
+        "segmentos_ano": segmentos.groupby(["Segmento_Atuacao", "Ano"])["Segmento_Atuacao"].count().reset_index(name="Quantidade_Segmentos")
+    }
+
+
+def montar_dividend_yield_ano(df):
+    dividend_yield = pd.DataFrame({
+        "CNPJ_Fundo": df["CNPJ_Fundo"].astype(str),
+        "Ano": df["Data_Referencia"].dt.year,
+        "Percentual_Dividend_Yield_Mes": pd.to_numeric(df["Percentual_Dividend_Yield_Mes"], errors="coerce"),
+    })
+    return {
+        "dividend_yield_ano": (
+            dividend_yield.groupby(["CNPJ_Fundo", "Ano"])["Percentual_Dividend_Yield_Mes"].sum()
+            .reset_index(name="Percentual_Dividend_Yield_Ano")
+        )
+    }
+
+
+# Nome -> (conjunto de origem, colunas lidas, função que monta {nome: tabela}); tabelas com a
+# mesma função são montadas juntas, com uma só leitura do conjunto
+AGREGADOS = {
+    "maiores_ativos": ("ativo_passivo", ["CNPJ_Fundo", "Data_Referencia"] + COLUNAS_ATIVO + ["Total_Passivo"], montar_maiores),
+    "maiores_passivos": ("ativo_passivo", ["CNPJ_Fundo", "Data_Referencia"] + COLUNAS_ATIVO + ["Total_Passivo"], montar_maiores),
+    "segmentos_ano": ("geral", ["Data_Referencia", "Segmento_Atuacao"], montar_segmentos_ano),
+    "dividend_yield_ano": ("complemento", ["CNPJ_Fundo", "Data_Referencia", "Percentual_Dividend_Yield_Mes"], montar_dividend_yield_ano),
+}
+
+
+def versao_agregado(nome, manifesto=None):
+    # Cada tabela acompanha a versão do conjunto de onde vem
+    return ingestao.versao_conjunto(AGREGADOS[nome][0], manifesto)
+
+
+def caminho_agregado(nome, versao):
+    return os.path.join(PASTA_AGREGADOS, f"{nome}-{versao}.parquet")
+
+
+def coletar_agregados(nome, versao):
+    # Mantém também a geração anterior (a mais recente das demais), que ainda pode estar sendo lida
+    atual = caminho_agregado(nome, versao)
+    anteriores = sorted(
+        (caminho for caminho in glob.glob(os.path.join(PASTA_AGREGADOS, f"{nome}-*.parquet")) if caminho != atual),
+        key=os.path.getmtime,
+    )
+    for caminho in anteriores[:-1]:
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+
+def garantir_agregado(nome, manifesto=None):
+    """
+    Monta a tabela `nome` da versão publicada, se ainda não existir.
+
+    Returns:
+        str: Caminho do arquivo.
+    """
+    manifesto = manifesto or registro_dados.ler_manifesto()
+    versao = versao_agregado(nome, manifesto)
+    caminho = caminho_agregado(nome, versao)
+    if os.path.exists(caminho):
+        return caminho
+
+    conjunto, colunas, montar = AGREGADOS[nome]
+    os.makedirs(PASTA_AGREGADOS, exist_ok=True)
+    # Um lock por conjunto de origem: as tabelas montadas juntas nunca são montadas em paralelo
+    with registro_dados.bloqueio(os.path.join(PASTA_AGREGADOS, f"{conjunto}.lock"), espera=300):
+        if not os.path.exists(caminho):
+            print(f"Montando agregados de {conjunto} na versão {versao}...")
+            for nome_tabela, tabela in montar(ingestao.carregar_conjunto(conjunto, colunas, manifesto=manifesto)).items():
+                destino = caminho_agregado(nome_tabela, versao)
+                temporario = f"{destino}.{os.getpid()}.tmp"
+                tabela.to_parquet(temporario, index=False)
+                os.replace(temporario, destino)
+                coletar_agregados(nome_tabela, versao)
+    return caminho
+
+
+def construir_agregados(nomes=None):
+    """
+    Monta as tabelas da página de Insights para a versão publicada; as já atualizadas ficam como estão.
+    """
+    manifesto = registro_dados.ler_manifesto()
+    for nome in nomes or AGREGADOS:
+        garantir_agregado(nome, manifesto)
+
+
+def carregar_agregado(nome, manifesto=None):
+    return pd.read_parquet(garantir_agregado(nome, manifesto))
+
+
+if __name__ == "__main__":
+    construir_agregados()
+    for nome in AGREGADOS:
+        caminho = garantir_agregado(nome)
+        print(f"{nome}: {len(pd.read_parquet(caminho))} linhas, {os.path.getsize(caminho) / 1024:.1f} KB")
@@ -0,0 +1,353 @@
+import os
+import hmac
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError, Field
+from dotenv import load_dotenv
+import orjson
+import registro_dados
+import ingestao
+import indice_cnpj
+import cache_respostas
+import memoria_conversa
+import tabela_scores
+import recomendacao
+import ranking
+
+# API separada da interface: este módulo não importa Streamlit, gráficos, Selenium nem leitura de PDF.
+# Rodar com: uvicorn api:app
+
+load_dotenv('env/config.txt')
+api_key = os.getenv('API_KEY')
+
+
+# Intervalo (segundos) entre verificações do manifesto; 0 desativa a recarga automática
+INTERVALO_RECARGA = float(os.getenv("INTERVALO_RECARGA", "5"))
+
+
+def recarregar_dados():
+    """
+    Troca os índices e as respostas em cache deste processo pela versão publicada no manifesto.
+    """
+    alterados = indice_cnpj.recarregar_indices()
+    if alterados:
+        cache_respostas.respostas.limpar()
+    # A tabela de scores acompanha o complemento e o geral; o motor de recomendação troca de versão sozinho
+    if tabela_scores.tabela_desatualizada():
+        tabela_scores.materializar_scores()
+        recomendacao.respostas.limpar()
+    return alterados
+
+
+async def vigiar_manifesto():
+    # Cada worker do uvicorn acompanha o manifesto e recarrega sem precisar reiniciar
+    versao = registro_dados.versao_dados()
+    while True:
+        await asyncio.sleep(INTERVALO_RECARGA)
+        try:
+            atual = registro_dados.versao_dados()
+            if atual != versao:
+                alterados = await asyncio.to_thread(recarregar_dados)
+                print(f"Dados recarregados na versão {atual}: {', '.join(alterados) or 'nenhum índice alterado'}")
+                versao = atual
+        except Exception as e:
+            print(f"Erro ao recarregar os dados: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Índices por CNPJ construídos uma única vez por processo
+    indice_cnpj.construir_indices()
+    vigia = asyncio.create_task(vigiar_manifesto()) if INTERVALO_RECARGA > 0 else None
+    yield
+    if vigia:
+        vigia.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+_llm_api = None
+
+
+def llm_api():
+    # A biblioteca da OpenAI e o cliente só são carregados na primeira requisição de chat
+    global _llm_api
+    if _llm_api is None:
+        import cliente_llm
+        _llm_api = cliente_llm.ClienteLLM(api_key=api_key)
+    return _llm_api
+
+
+class Message(BaseModel):
+    role: str
+    content: str
+
+class ChatRequest(BaseModel):
+    messages: List[Message]
+    # True responde em server-sent events, trecho a trecho
+    stream: bool = False
+
+class ChatResponse(BaseModel):
+    response: str
+    messages: List[Message]
+
+class PerfilInvestidor(BaseModel):
+    perfil: str
+    historico: str = "Histórica"
+    segmentos: Optional[List[str]] = None
+    # Faixa de preço da cota: acima de preco_minimo e até preco_maximo
+    preco_minimo: Optional[float] = None
+    preco_maximo: Optional[float] = None
+    quantidade: int = Field(5, ge=1, le=50)
+
+class RecomendacaoRequest(BaseModel):
+    perfis: List[PerfilInvestidor] = Field(..., min_length=1, max_length=1000)
+
+async def resumir_conversa_api(resumo_anterior, bloco):
+    response = await llm_api().completar(
+        memoria_conversa.mensagens_resumo(resumo_anterior, bloco),
+        temperature=0,
+        max_tokens=memoria_conversa.LIMITE_TOKENS_RESUMO
+    )
+    return response.choices[0].message.content
+
+
+def erro_openai(e):
+    import openai
+
+    if isinstance(e, (asyncio.TimeoutError, openai.APITimeoutError)):
+        return HTTPException(status_code=504, detail="Tempo esgotado aguardando a OpenAI")
+    if isinstance(e, openai.RateLimitError):
+        return HTTPException(status_code=503, detail="Limite de requisições da OpenAI atingido, tente novamente")
+    if isinstance(e, openai.APIError):
+        return HTTPException(status_code=502, detail=f"Erro na OpenAI: {str(e)}")
+    return HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+
+def evento_sse(dados, evento=None):
+    linhas = f"event: {evento}\n" if evento else ""
+    return (linhas + "data: ").encode() + orjson.dumps(dados) + b"\n\n"
+
+
+async def transmitir_chat(chat_request: ChatRequest, trechos, primeiro: str):
+    """
+    Eventos SSE: um {"delta": ...} por trecho e, ao final, o evento "fim" com o mesmo
+    corpo da resposta sem streaming (ChatResponse). Falhas no meio viram o evento "erro".
+    """
+    resposta = [primeiro]
+    try:
+        yield evento_sse({"delta": primeiro})
+        async for trecho in trechos:
+            resposta.append(trecho)
+            yield evento_sse({"delta": trecho})
+    except Exception as e:
+        yield evento_sse({"detail": erro_openai(e).detail}, "erro")
+        return
+    finally:
+        # Libera o semáforo mesmo se o cliente desconectar no meio
+        await trechos.aclose()
+
+    assistant_response = "".join(resposta)
+    updated_messages = chat_request.messages + [Message(role="assistant", content=assistant_response)]
+    yield evento_sse(ChatResponse(response=assistant_response, messages=updated_messages).model_dump(), "fim")
+
+
+@app.post("/chat/especialista_fii", response_model=ChatResponse)
+async def chat_endpoint(chat_request: ChatRequest):
+    try:
+        # O histórico completo continua na resposta; o modelo recebe as mensagens recentes e o resumo das antigas
+        resumo, janela = await memoria_conversa.memoria.compactar_async(
+            [message.model_dump() for message in chat_request.messages], resumir_conversa_api
+        )
+        messages_for_api = memoria_conversa.montar_mensagens(memoria_conversa.SYSTEM_CONTEXT, resumo, janela)
+
+        if chat_request.stream:
+            trechos = llm_api().transmitir(messages_for_api, temperature=0.7, max_tokens=1000)
+
+            # O primeiro trecho é aguardado aqui para que falhas na abertura ainda virem códigos HTTP
+            try:
+                primeiro = await trechos.__anext__()
+            except StopAsyncIteration:
+                primeiro = ""
+
+            return StreamingResponse(
+                transmitir_chat(chat_request, trechos, primeiro),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+
+        # Chamada assíncrona: enquanto a OpenAI responde, o worker continua atendendo outras requisições
+        response = await llm_api().completar(
+            messages_for_api,
+            temperature=0.7,
+            max_tokens=1000
+        )
+        
+        assistant_response = response.choices[0].message.content
+        updated_messages = chat_request.messages + [
+            Message(role="assistant", content=assistant_response)
+        ]
+        
+        return ChatResponse(
+            response=assistant_response,
+            messages=updated_messages
+        )
+        
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail="Erro de validação nos dados")
+    except Exception as e:
+        raise erro_openai(e)
+
+# Função auxiliar para processar consultas de CNPJ; os handlers de /dataset são síncronos
+# para que o FastAPI a rode no threadpool e uma falta no cache não bloqueie o event loop
+def process_cnpj_query(conjunto: str, cnpj: int, tipo_consulta: str, if_none_match: Optional[str] = None):
+    try:
+        indice = indice_cnpj.obter_indice(conjunto)
+        chave = (conjunto, cnpj, indice.versao)
+        resposta = cache_respostas.respostas.obter(chave)
+
+        if resposta is None:
+            fundo = indice.buscar(cnpj)
+            
+            if fundo.empty:
+                raise HTTPException(
+                    status_code=404, 
+                    detail=f"CNPJ não encontrado na base de {tipo_consulta}"
+                )
+
+            fundo = fundo.assign(cnpj_normalizado=cnpj)
+
+            # Datas no mesmo formato dos CSVs da CVM
+            for coluna in fundo.select_dtypes("datetime").columns:
+                fundo[coluna] = fundo[coluna].dt.strftime("%Y-%m-%d")
+            fundo = fundo.astype(object).fillna(0)
+
+            corpo = orjson.dumps(fundo.to_dict(orient="records"))
+            resposta = cache_respostas.respostas.guardar(chave, corpo, indice.ultima_modificacao)
+
+        headers = {"ETag": resposta.etag, "Last-Modified": resposta.ultima_modificacao}
+        if resposta.corresponde(if_none_match):
+            return Response(status_code=304, headers=headers)
+        return Response(content=resposta.corpo, media_type="application/json", headers=headers)
+        
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Erro ao processar dados de {tipo_consulta}: {str(e)}"
+        )
+
+@app.post("/admin/recarregar")
+async def recarregar_endpoint(request: Request):
+    # Sem ADMIN_TOKEN configurado o endpoint fica desativado: a recarga refaz a ingestão inteira
+    token = os.getenv("ADMIN_TOKEN")
+    if not token:
+        raise HTTPException(status_code=503, detail="Recarga desativada: ADMIN_TOKEN não configurado")
+    if not hmac.compare_digest(request.headers.get("x-admin-token", "").encode(), token.encode()):
+        raise HTTPException(status_code=403, detail="Token de administração inválido")
+
+    # Publica CSVs alterados e recarrega este worker; os demais seguem o manifesto
+    await asyncio.to_thread(ingestao.ingerir)
+    alterados = await asyncio.to_thread(recarregar_dados)
+    return {"versao": registro_dados.versao_dados(), "recarregados": alterados}
+
+
+@app.get("/dataset/ativos_passivos/{cnpj}")
+def read_concatenacao(cnpj: int, request: Request):
+    """
+    Endpoint destinado a obter as informações dos ativos e passivos desde 2020 ate o mês mais recente, por CNPJ desejado
+    """
+    try:
+        return process_cnpj_query("ativo_passivo", cnpj, "ativos e passivos", request.headers.get("if-none-match"))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Erro ao consultar ativos e passivos: {str(e)}"
+        )
+
+@app.get("/dataset/complemento/{cnpj}")
+def read_concatenacao(cnpj: int, request: Request):
+    """
+    Endpoint destinado a obter as informações dos complementos desde 2020 ate o mês mais recente, por CNPJ desejado
+    """
+    try:
+        return process_cnpj_query("complemento", cnpj, "complementos", request.headers.get("if-none-match"))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Erro ao consultar complementos: {str(e)}"
+        )
+
+@app.get("/dataset/geral/{cnpj}")
+def read_concatenacao(cnpj: int, request: Request):
+    """
+    Endpoint destinado a obter as informações gerais desde 2020 ate o mês mais recente, por CNPJ desejado
+    """
+    try:
+        return process_cnpj_query("geral", cnpj, "informações gerais", request.headers.get("if-none-match"))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Erro ao consultar informações gerais: {str(e)}"
+        )
+
+@app.post("/recommendations")
+async def recommendations_endpoint(recomendacao_request: RecomendacaoRequest):
+    """
+    Endpoint destinado a obter as recomendações de FIIs de um ou vários perfis de investidor em uma única requisição
+    """
+    try:
+        lista_parametros = [recomendacao.normalizar_parametros(**perfil.model_dump()) for perfil in recomendacao_request.perfis]
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    try:
+        corpo = await asyncio.to_thread(recomendacao.recomendar_lote, lista_parametros)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao gerar recomendações: {str(e)}")
+    return Response(content=corpo, media_type="application/json")
+
+
+def ranking_serializado(conjunto, metricas, periodo, n, manifesto):
+    rankings = ranking.ranking_fundos(conjunto, metricas, periodo, n, manifesto=manifesto)
+    return orjson.dumps({
+        "versao": ingestao.versao_conjunto(conjunto, manifesto),
+        "periodo": periodo,
+        "rankings": {metrica: df.to_dict(orient="records") for metrica, df in rankings.items()},
+    })
+
+
+@app.get("/rankings/{conjunto}")
+async def rankings_endpoint(conjunto: str, request: Request, metricas: List[str] = Query(...),
+                            periodo: str = "Ano", n: int = Query(5, ge=1, le=100)):
+    """
+    Endpoint destinado a obter os fundos com os maiores totais de cada métrica por ano ou por mês
+    """
+    # Chave, conteúdo e Last-Modified saem do mesmo manifesto
+    manifesto = registro_dados.ler_manifesto()
+    chave = ("ranking", conjunto, tuple(metricas), periodo, n, ingestao.versao_conjunto(conjunto, manifesto))
+    resposta = cache_respostas.respostas.obter(chave)
+    if resposta is None:
+        try:
+            corpo = await asyncio.to_thread(ranking_serializado, conjunto, metricas, periodo, n, manifesto)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Erro ao gerar o ranking: {str(e)}")
+        resposta = cache_respostas.respostas.guardar(chave, corpo, ingestao.ultima_modificacao_conjunto(conjunto, manifesto))
+
+    headers = {"ETag": resposta.etag, "Last-Modified": resposta.ultima_modificacao}
+    if resposta.corresponde(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=resposta.corpo, media_type="application/json", headers=headers)
@@ -1,38 +1,42 @@
 import streamlit as st
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 import plotly.express as px
 import plotly.graph_objects as go
 import time
 import os
-import requests
-import shutil
-from bs4 import BeautifulSoup
-from zipfile import ZipFile
-from fastapi import FastAPI, HTTPException
-from sklearn.preprocessing import MinMaxScaler
-from datetime import datetime
-import yfinance as yf
-import openai
-from openai import OpenAI
-from typing import List, Union, TypedDict
-from pydantic import BaseModel, ValidationError
-from typing import List, Optional
 from dotenv import load_dotenv
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from PyPDF2 import PdfReader
+import ingestao
+import registro_dados
+import memoria_conversa
+import cache_llm
+import resumo_relatorio
+import download_relatorio
+import busca_relatorio
+import preparo_relatorios
+import cotacoes
+import recomendacao
+import acervo_relatorios
+import extracao_pdf
+import indice_cnpj
+import tabela_scores
+import agregados
+import atualizacao_cvm
+
+# Interface em Streamlit (streamlit run app.py); a API fica em api.py (uvicorn api:app).
+# OpenAI e Selenium são importados só nas funções que os usam.
 
 load_dotenv('env/config.txt')
 api_key = os.getenv('API_KEY')
 
 
+def __getattr__(nome):
+    # `uvicorn app:app` continua funcionando, mas carrega a interface junto; prefira `uvicorn api:app`
+    if nome == "app":
+        from api import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+
 def inicial():
 
     st.markdown("<h1 style='text-align: center;'>💰 Recomendação de FII's 💰</h1>", unsafe_allow_html=True)
@@ -71,7 +75,7 @@ def data():
         </p>
         """, unsafe_allow_html=True
     )
-    df_2024 = pd.read_csv("data/inf_mensal_fii_2024/inf_mensal_fii_complemento_2024.csv", delimiter=";", encoding="ISO-8859-1")
+    df_2024 = ingestao.carregar_conjunto("complemento", anos=[2024])
     st.dataframe(df_2024)
 
 
@@ -214,80 +218,58 @@ def explicacao():
 
     
 @st.cache_data
-def concatenacao_at_pas():
-    df_2020_at_pas = pd.read_csv("data/inf_mensal_fii_2020/inf_mensal_fii_ativo_passivo_2020.csv", delimiter=";", encoding="ISO-8859-1")
-    df_2021_at_pas = pd.read_csv("data/inf_mensal_fii_2021/inf_mensal_fii_ativo_passivo_2021.csv", delimiter=";", encoding="ISO-8859-1")
-    df_2022_at_pas = pd.read_csv("data/inf_mensal_fii_2022/inf_mensal_fii_ativo_passivo_2022.csv", delimiter=";", encoding="ISO-8859-1")
-    df_2023_at_pas = pd.read_csv("data/inf_mensal_fii_2023/inf_mensal_fii_ativo_passivo_2023.csv", delimiter=";", encoding="ISO-8859-1")
-    df_2024_at_pas = pd.read_csv("data/inf_mensal_fii_2024/inf_mensal_fii_ativo_passivo_2024.csv", delimiter=";", encoding="ISO-8859-1")
-    df_at_pas_concat = pd.concat([df_2020_at_pas, df_2021_at_pas, df_2022_at_pas, df_2023_at_pas, df_2024_at_pas]) 
+def carregar_conjunto_versionado(conjunto, colunas, versao, _manifesto):
+    # A versão entra na chave do cache e os dados são lidos do mesmo manifesto de onde ela saiu
+    # (o Streamlit não usa parâmetros com "_" na chave)
+    return ingestao.carregar_conjunto(conjunto, colunas, manifesto=_manifesto)
 
-    return df_at_pas_concat
 
+def exigir_versao(conjunto, versao):
+    # A ingestão fica com o botão de atualização e a CLI; as páginas só leem a versão publicada
+    if versao is None:
+        st.warning(f'O conjunto {conjunto} ainda não foi ingerido. Use o botão "Atualizar Conjunto de Dados" ou rode `python ingestao.py`.')
+        st.stop()
+    return versao
 
-@st.cache_data
-def concatenacao_complement():
-    df_2020_complement = pd.read_csv("data/inf_mensal_fii_2020/inf_mensal_fii_complemento_2020.csv", delimiter=";", encoding="ISO-8859-1")
-    df_2021_complement = pd.read_csv("data/inf_mensal_fii_2021/inf_mensal_fii_complemento_2021.csv", delimiter=";", encoding="ISO-8859-1")
-    df_2022_complement = pd.read_csv("data/inf_mensal_fii_2022/inf_mensal_fii_complemento_2022.csv", delimiter=";", encoding="ISO-8859-1")
-    df_2023_complement = pd.read_csv("data/inf_mensal_fii_2023/inf_mensal_fii_complemento_2023.csv", delimiter=";", encoding="ISO-8859-1")
-    df_2024_complement = pd.read_csv("data/inf_mensal_fii_2024/inf_mensal_fii_complemento_2024.csv", delimiter=";", encoding="ISO-8859-1")
-    df_complement_concat = pd.concat([df_2020_complement, df_2021_complement, df_2022_complement, df_2023_complement, df_2024_complement])
 
-    return df_complement_concat
+def carregar_versao_atual(conjunto, colunas=None):
+    manifesto = registro_dados.ler_manifesto()
+    versao = exigir_versao(conjunto, ingestao.versao_conjunto(conjunto, manifesto))
+    return carregar_conjunto_versionado(conjunto, colunas, versao, manifesto)
 
 
-@st.cache_data
-def concatenacao_geral():
-    df_2020_geral = pd.read_csv("data/inf_mensal_fii_2020/inf_mensal_fii_geral_2020.csv", delimiter=";", encoding="ISO-8859-1")
-    df_2021_geral = pd.read_csv("data/inf_mensal_fii_2021/inf_mensal_fii_geral_2021.csv", delimiter=";", encoding="ISO-8859-1")
-    df_2022_geral = pd.read_csv("data/inf_mensal_fii_2022/inf_mensal_fii_geral_2022.csv", delimiter=";", encoding="ISO-8859-1")
-    df_2023_geral = pd.read_csv("data/inf_mensal_fii_2023/inf_mensal_fii_geral_2023.csv", delimiter=";", encoding="ISO-8859-1")
-    df_2024_geral = pd.read_csv("data/inf_mensal_fii_2024/inf_mensal_fii_geral_2024.csv", delimiter=";", encoding="ISO-8859-1")
-    df_geral_concat = pd.concat([df_2020_geral, df_2021_geral, df_2022_geral, df_2023_geral, df_2024_geral])
+def concatenacao_at_pas(colunas=None):
+    return carregar_versao_atual("ativo_passivo", colunas)
 
-    return df_geral_concat
 
+def concatenacao_complement(colunas=None):
+    return carregar_versao_atual("complemento", colunas)
 
 
+def concatenacao_geral(colunas=None):
+    return carregar_versao_atual("geral", colunas)
 
-def metrica_at_pas_v1(funcao):
-    st.title("Análise de ativos e passivos")
 
-
-    # Barra de progresso
-    progress_container = st.empty()
-    progress_bar = progress_container.progress(0)
-    progress_container.write("Carregando dados...")
-    time.sleep(3)
+@st.cache_data
+def carregar_agregado_versionado(nome, versao, _manifesto):
+    return agregados.carregar_agregado(nome, _manifesto)
 
 
-    # Trazendo o df concatenado
-    df_v1 = funcao()
-    progress_bar.progress(20)
-    
+def carregar_agregado_atual(nome):
+    # Tabelas de kilobytes, versionadas junto com o conjunto de origem
+    manifesto = registro_dados.ler_manifesto()
+    versao = exigir_versao(agregados.AGREGADOS[nome][0], agregados.versao_agregado(nome, manifesto))
+    return carregar_agregado_versionado(nome, versao, manifesto)
 
-    # Cálculo de ativo com base no balanço contábil
-    df_v1['Total_Ativo'] = df_v1[['Total_Necessidades_Liquidez',
-                                  'Total_Investido',
-                                  'Direitos_Bens_Imoveis',
-                                  'Valores_Receber'
-                                  ]].sum(axis=1)
-    progress_bar.progress(40)
 
 
-    # Transformação para datetime, e obtendo apenas o ano
-    df_v1["Data_Referencia"] = pd.to_datetime(df_v1["Data_Referencia"], format="%Y-%m-%d")
-    df_v1["Ano"] = df_v1["Data_Referencia"].dt.year
-    progress_bar.progress(60)
 
+def metrica_at_pas_v1(funcao):
+    st.title("Análise de ativos e passivos")
 
-    # Agregando os valores por fundo e ano e realizando a soma de passivos e ativos e utilizando apenas os top 5 para melhor visualização
-    ativos_por_fundo = df_v1.groupby(["CNPJ_Fundo", "Ano"])["Total_Ativo"].sum().reset_index()
-    passivos_por_fundo = df_v1.groupby(["CNPJ_Fundo", "Ano"])["Total_Passivo"].sum().reset_index()
-    maiores_ativos = ativos_por_fundo.groupby("Ano").apply(lambda x: x.nlargest(5, "Total_Ativo")).reset_index(drop=True)
-    maiores_passivos = passivos_por_fundo.groupby("Ano").apply(lambda x: x.nlargest(5, "Total_Passivo")).reset_index(drop=True)
-    progress_bar.progress(80)
+    # Top 5 por ano já montados na ingestão (agregados.py)
+    maiores_ativos = funcao("maiores_ativos")
+    maiores_passivos = funcao("maiores_passivos")
 
 
     # Gráfico ativos
@@ -332,11 +314,6 @@ def metrica_at_pas_v1(funcao):
                             legend_title_text='Fundo')
     
     st.plotly_chart(fig_passivos)
-    
-
-    # Finalização da barra de progresso e exclusão da mesma
-    progress_bar.progress(100)
-    progress_container.empty()
 
 
 
@@ -344,13 +321,8 @@ def metrica_at_pas_v1(funcao):
 def segmento_fiis(funcao):
     st.title("Quantidade de FII's em cada segmento por ano")
 
-    # Trazendo o df concatenado e ano
-    df_v2 = funcao()
-    df_v2["Data_Referencia"] = pd.to_datetime(df_v2["Data_Referencia"], format="%Y-%m-%d")
-    df_v2["Ano"] = df_v2["Data_Referencia"].dt.year
-
-    # Agrupar por Segmento e Ano
-    segmentos = df_v2.groupby(["Segmento_Atuacao", "Ano"])["Segmento_Atuacao"].count().reset_index(name="Quantidade_Segmentos")
+    # Contagem por segmento e ano já montada na ingestão
+    segmentos = funcao("segmentos_ano")
     
 
     anos = segmentos['Ano'].unique()
@@ -379,12 +351,8 @@ def segmento_fiis(funcao):
 def scatter_plot(funcao):
     st.title("Dividend Yield ao longo dos anos, observando os top 5 fundos com mais DY")
 
-    # Ajustes nos dados
-    df_v3 = funcao()
-    df_v3["Data_Referencia"] = pd.to_datetime(df_v3["Data_Referencia"], format="mixed")
-    df_v3["Ano"] = df_v3["Data_Referencia"].dt.year
-    df_v3["Percentual_Dividend_Yield_Mes"] = pd.to_numeric(df_v3["Percentual_Dividend_Yield_Mes"], errors='coerce')
-    dividend_yield = df_v3.groupby(["CNPJ_Fundo", "Ano"])["Percentual_Dividend_Yield_Mes"].sum().reset_index(name="Percentual_Dividend_Yield_Ano")
+    # DY anual por fundo já montado na ingestão; só o top 5 é calculado aqui, sobre a tabela pequena
+    dividend_yield = funcao("dividend_yield_ano")
     top_5_fundos = dividend_yield.groupby("CNPJ_Fundo")["Percentual_Dividend_Yield_Ano"].sum().nlargest(5).index
     
     # Cálculo das métricas para os top 5 fundos
@@ -399,7 +367,7 @@ def scatter_plot(funcao):
 
 
     # Gráfico scatter plot
-    dividend_yield['Cor'] = dividend_yield['CNPJ_Fundo'].apply(lambda x: 'Top 5' if x in top_5_fundos else 'Outros')
+    dividend_yield = dividend_yield.assign(Cor=dividend_yield['CNPJ_Fundo'].isin(top_5_fundos).map({True: 'Top 5', False: 'Outros'}))
     fig = px.scatter(
         dividend_yield,
         x='Ano',
@@ -458,7 +426,7 @@ def datasets_download(funcao_1, funcao_2, funcao_3):
             cnpj_fundo = st.text_input("Digite o CNPJ do Fundo:", value="", key=f"cnpj_input_{option}")
             
             if data_referencia:
-                df = df[df['Data_Referencia'] == data_referencia]
+                df = df[df['Data_Referencia'] == pd.Timestamp(data_referencia)]
             if cnpj_fundo:
                 df = df[df['CNPJ_Fundo'] == cnpj_fundo]
 
@@ -494,75 +462,30 @@ def datasets_download(funcao_1, funcao_2, funcao_3):
 
 def atualizar_dados_scrapping():
 
-    def baixar_arquivo_zip():
-
-        url = "https://dados.cvm.gov.br/dataset/fii-doc-inf_mensal"
-        response = requests.get(url)
-
-        links = [] 
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                if 'inf_mensal_fii_2024.zip' in href:
-                    print(f"Link encontrado: {href}")
-                    links.append(href)
-        else:
-            print(f"Falha ao acessar a página. Código de status: {response.status_code}")
-            return None
-
-        if links:
-            output_file = "data/inf_mensal_fii_2024.zip"
-            os.makedirs(os.path.dirname(output_file), exist_ok=True)
-
-            download_url = links[0]
-            response = requests.get(download_url)
-
-            if response.status_code == 200:
-                with open(output_file, 'wb') as file:
-                    file.write(response.content)
-                print(f"Download concluído e salvo como {output_file}")
-                return output_file
-            else:
-                print(f"Falha no download. Código de status: {response.status_code}")
-                return None
-        else:
-            print("Nenhum link correspondente foi encontrado.")
-            return None
-
-
-    def limpar_pasta_destino(pasta_destino):
-        if os.path.exists(pasta_destino):
-            shutil.rmtree(pasta_destino)  
-        os.makedirs(pasta_destino)
-
-    def extrair_arquivo_zip(arquivo_zip, pasta_destino):
-        with ZipFile(arquivo_zip, 'r') as zip_ref:
-            zip_ref.extractall(pasta_destino)
-        print(f"Arquivos extraídos para {pasta_destino}")
-
-    def excluir_arquivo_zip(arquivo_zip):
-        if os.path.exists(arquivo_zip):
-            os.remove(arquivo_zip)
-            print(f"Arquivo ZIP {arquivo_zip} excluído.")
-
-
-    pasta_destino = "data/inf_mensal_fii_2024"
+    def atualizar_dados():
 
+        # Baixa apenas os anos alterados na CVM (HEAD condicional para os demais)
+        anos_atualizados = atualizacao_cvm.atualizar()
 
-    def atualizar_dados():
+        # Incremental: converte os anos baixados agora e CSVs que ainda não viraram partição.
+        # Novas partições publicam uma nova versão no manifesto; a API recarrega sozinha
+        if ingestao.ingerir():
+            tabela_scores.materializar_scores()
+            indice_cnpj.construir_mapas()
+            agregados.construir_agregados()
 
-        arquivo_zip = baixar_arquivo_zip()
-        if arquivo_zip:
-            limpar_pasta_destino(pasta_destino)
-            extrair_arquivo_zip(arquivo_zip, pasta_destino)
-            excluir_arquivo_zip(arquivo_zip)
+            # Libera da memória os DataFrames da versão anterior
+            carregar_conjunto_versionado.clear()
+            carregar_agregado_versionado.clear()
+        return anos_atualizados
 
     
     if st.button("Atualizar Conjunto de Dados"):
-        atualizar_dados()
-        st.write("Conjunto de Dados Atualizado")
+        anos_atualizados = atualizar_dados()
+        if anos_atualizados:
+            st.write(f"Conjunto de Dados Atualizado: {', '.join(str(ano) for ano in anos_atualizados)}")
+        else:
+            st.write("Conjunto de Dados já está atualizado")
     
 
 def recomendacao_inicial():
@@ -667,9 +590,8 @@ def recomendacao_segmento():
     st.markdown("""
 Selecione os segmentos dos FIIs a serem recomendados:
 """)
-    df = concatenacao_geral()
-    df["Segmento_Atuacao"] = df["Segmento_Atuacao"].fillna("Outros")
-    lista_segmentos = df["Segmento_Atuacao"].unique().tolist()
+    df = concatenacao_geral(colunas=["Segmento_Atuacao"])
+    lista_segmentos = df["Segmento_Atuacao"].astype(object).fillna("Outros").unique().tolist()
 
     segmentos = st.multiselect(
     "Selecione as opções desejadas:",
@@ -697,149 +619,22 @@ Selecione quantos FIIs deseja obter de recomendação:
 
 
 def score_df():
-    # Obtendo os DFs
-    metrica_1 = concatenacao_complement()
-    df_segmento = concatenacao_geral()
-
-    # Trazendo os tickers de todos os FIIs listados na bolsa atualmente
-    df_fiis_listados_atuais = pd.read_csv(r"data\Tickers\cnpj_fundos.csv", sep=";")
-    df_fiis_listados_atuais = df_fiis_listados_atuais.rename(columns={'CNPJ': 'CNPJ_Fundo'})
-
-    # Obtendo apenas os FIIs listados atualmente
-    metrica_1 = metrica_1.merge(df_fiis_listados_atuais[["TICKER", "CNPJ_Fundo"]], how='left')
-    metrica_1 = metrica_1[~metrica_1['TICKER'].isna()]
-
-    # Seleção das colunas necessárias
-    metrica_1 = metrica_1[["CNPJ_Fundo", "Data_Referencia", "TICKER", "Percentual_Rentabilidade_Efetiva_Mes", "Percentual_Rentabilidade_Patrimonial_Mes", "Percentual_Dividend_Yield_Mes"]]
-
-    # Tratamento no dataset em relação as valores
-    metrica_1["Percentual_Rentabilidade_Efetiva_Mes"] = metrica_1["Percentual_Rentabilidade_Efetiva_Mes"].replace({'.': ''}, regex=True)
-    metrica_1["Percentual_Rentabilidade_Efetiva_Mes"] = metrica_1["Percentual_Rentabilidade_Efetiva_Mes"].replace({',': '.'}, regex=True)
-    metrica_1["Percentual_Rentabilidade_Efetiva_Mes"] = metrica_1["Percentual_Rentabilidade_Efetiva_Mes"].replace('', '0')
-    metrica_1["Percentual_Rentabilidade_Efetiva_Mes"] = metrica_1["Percentual_Rentabilidade_Efetiva_Mes"].fillna(0)
-
-    metrica_1["Percentual_Rentabilidade_Patrimonial_Mes"] = metrica_1["Percentual_Rentabilidade_Patrimonial_Mes"].replace({'.': ''}, regex=True)
-    metrica_1["Percentual_Rentabilidade_Patrimonial_Mes"] = metrica_1["Percentual_Rentabilidade_Patrimonial_Mes"].replace({',': '.'}, regex=True)
-    metrica_1["Percentual_Rentabilidade_Patrimonial_Mes"] = metrica_1["Percentual_Rentabilidade_Patrimonial_Mes"].replace('', '0')
-    metrica_1["Percentual_Rentabilidade_Patrimonial_Mes"] = metrica_1["Percentual_Rentabilidade_Patrimonial_Mes"].fillna(0)
-
-    metrica_1["Percentual_Dividend_Yield_Mes"] = metrica_1["Percentual_Dividend_Yield_Mes"].replace({'.': ''}, regex=True)
-    metrica_1["Percentual_Dividend_Yield_Mes"] = metrica_1["Percentual_Dividend_Yield_Mes"].replace({',': '.'}, regex=True)
-    metrica_1["Percentual_Dividend_Yield_Mes"] = metrica_1["Percentual_Dividend_Yield_Mes"].replace('', '0')
-    metrica_1["Percentual_Dividend_Yield_Mes"] = metrica_1["Percentual_Dividend_Yield_Mes"].fillna(0)
-
-    # Trasnformando em float
-    metrica_1["Percentual_Rentabilidade_Efetiva_Mes"] = metrica_1["Percentual_Rentabilidade_Efetiva_Mes"].astype(float) * 100
-    metrica_1["Percentual_Rentabilidade_Patrimonial_Mes"] = metrica_1["Percentual_Rentabilidade_Patrimonial_Mes"].astype(float) * 100
-    metrica_1["Percentual_Dividend_Yield_Mes"] = metrica_1["Percentual_Dividend_Yield_Mes"].astype(float) * 100
-
-    # Filtrando valores
-    metrica_1.loc[metrica_1['Percentual_Rentabilidade_Efetiva_Mes'] < 0, 'Percentual_Rentabilidade_Efetiva_Mes'] = 0
-    metrica_1.loc[metrica_1['Percentual_Rentabilidade_Patrimonial_Mes'] < 0, 'Percentual_Rentabilidade_Patrimonial_Mes'] = 0
-    metrica_1.loc[metrica_1['Percentual_Dividend_Yield_Mes'] < 0, 'Percentual_Dividend_Yield_Mes'] = 0
-
-    # Normalização dos dados
-    scaler = MinMaxScaler(feature_range=(0, 100))
-    metrica_1[['Percentual_Rentabilidade_Efetiva_Mes', 'Percentual_Rentabilidade_Patrimonial_Mes', 'Percentual_Dividend_Yield_Mes']] = scaler.fit_transform(
-        metrica_1[['Percentual_Rentabilidade_Efetiva_Mes', 'Percentual_Rentabilidade_Patrimonial_Mes', 'Percentual_Dividend_Yield_Mes']]
-    )
-
-    # Cálculo de score para cada tipo de perfil de investidor
-    metrica_1['score1_conservador'] = (0.6 * metrica_1["Percentual_Dividend_Yield_Mes"]) + (0.3 * metrica_1["Percentual_Rentabilidade_Efetiva_Mes"]) + (0.1 * metrica_1["Percentual_Rentabilidade_Patrimonial_Mes"])
-    metrica_1['score1_conservador'] = metrica_1['score1_conservador'].apply(lambda x: f"{x:.2f}")
-    metrica_1['score1_moderado'] = (0.4 * metrica_1["Percentual_Dividend_Yield_Mes"]) + (0.4 * metrica_1["Percentual_Rentabilidade_Efetiva_Mes"]) + (0.2 * metrica_1["Percentual_Rentabilidade_Patrimonial_Mes"])
-    metrica_1['score1_moderado'] = metrica_1['score1_moderado'].apply(lambda x: f"{x:.2f}")
-    metrica_1['score1_arrojado'] = (0.2 * metrica_1["Percentual_Dividend_Yield_Mes"]) + (0.5 * metrica_1["Percentual_Rentabilidade_Efetiva_Mes"]) + (0.3 * metrica_1["Percentual_Rentabilidade_Patrimonial_Mes"])
-    metrica_1['score1_arrojado'] = metrica_1['score1_arrojado'].apply(lambda x: f"{x:.2f}")
-
-    # Deixando apenas as colunas calculadas para diminuir o tamanho do dataset
-    metrica_1 = metrica_1[["CNPJ_Fundo", "Data_Referencia", "TICKER", "score1_conservador", "score1_moderado", "score1_arrojado"]]
-
-    # Organização da data
-    metrica_1['Data_Referencia'] = pd.to_datetime(metrica_1['Data_Referencia'], dayfirst=True, format='mixed')
-    
-    # Trazendo o segmento dos fundos
-    df_segmento = df_segmento[["CNPJ_Fundo", "Segmento_Atuacao"]]
-    df_segmento = df_segmento.drop_duplicates(subset=["CNPJ_Fundo"], keep="first")
-    metrica_1 = metrica_1.merge(df_segmento[["CNPJ_Fundo", "Segmento_Atuacao"]], how="left", on="CNPJ_Fundo")
-    metrica_1["Segmento_Atuacao"] = metrica_1["Segmento_Atuacao"].fillna("Outros")
- 
-    # Filtrando o DF com base nas escolhas do usuário
+    # Mesmo motor do endpoint /recommendations: ranking por perfil e período calculado uma vez
+    # por versão da tabela de scores, filtrado pelas escolhas do usuário
     perfil_investidor = st.session_state.get('investidor_conser_mod_arroj')
-    if perfil_investidor == "Conservador":
-        metrica_1 = metrica_1[["CNPJ_Fundo", "Data_Referencia", "TICKER", "Segmento_Atuacao", "score1_conservador"]]
-        metrica_1 = metrica_1.sort_values(by="score1_conservador", ascending=False)
-
-    elif perfil_investidor == "Moderado":
-        metrica_1 = metrica_1[["CNPJ_Fundo", "Data_Referencia", "TICKER", "Segmento_Atuacao", "score1_moderado"]]
-        metrica_1 = metrica_1.sort_values(by="score1_moderado", ascending=False)
-
-    elif perfil_investidor == "Arrojado":
-        metrica_1 = metrica_1[["CNPJ_Fundo", "Data_Referencia", "TICKER", "Segmento_Atuacao", "score1_arrojado"]]
-        metrica_1 = metrica_1.sort_values(by="score1_arrojado", ascending=False)
-    
-    
-
-    # Filtrando o DF com base no histórico escolhido
-    historico = st.session_state.get('historico')
-    ano_mais_recente = metrica_1['Data_Referencia'].dt.year.max()
-    mes_mais_recente_v1 = metrica_1[metrica_1['Data_Referencia'].dt.year == ano_mais_recente]
-    mes_mais_recente_v2 = mes_mais_recente_v1['Data_Referencia'].dt.month.max()
-    if historico == "Anual":
-        metrica_1 = metrica_1[metrica_1['Data_Referencia'].dt.year == ano_mais_recente]
-
-    elif historico == "Mensal":
-        metrica_1 = metrica_1[metrica_1['Data_Referencia'].dt.year == ano_mais_recente]
-        metrica_1 = metrica_1[metrica_1['Data_Referencia'].dt.month == mes_mais_recente_v2]
-
-    # Filtrando o DF com base nos segmentos escolhidos
-    segmentos = st.session_state.get('segmentos')
-    if segmentos:
-        metrica_1 = metrica_1[metrica_1["Segmento_Atuacao"].isin(segmentos)]
-
-    # Diminuindo tamanho do dataset para pegar as cotações
-    metrica_1 = metrica_1.head(300)
-    
-
-    # Obter cotações de forma otimizada
-    metrica_1['TICKERS_SA'] = metrica_1['TICKER'] + ".SA"
-    tickers_unicos = " ".join(metrica_1['TICKERS_SA'].unique())
-    
-    # Obtém todas as cotações de uma vez
-    cotacoes = yf.download(tickers_unicos, period="1d")['Close']
-    
-    # Mapeia as cotações para o DataFrame
-    if isinstance(cotacoes, pd.Series):  # caso de um único ticker
-        metrica_1['cotacao'] = cotacoes.iloc[-1]
-    else:  # caso de múltiplos tickers
-        cotacoes_dict = cotacoes.iloc[-1].to_dict()
-        metrica_1['cotacao'] = metrica_1['TICKERS_SA'].map(cotacoes_dict)
-
-    # Limpeza das cotações
-    metrica_1 = metrica_1[metrica_1['cotacao'].notna()]
-    metrica_1.drop(columns=['TICKERS_SA'], inplace=True)
-
-
-
-
-
-    # Filtrando o DF com base no valor que o usuário está disposto a investir
-    valor_disposto = st.session_state.get('valor_investir')
-    if valor_disposto == "R$0,00 a R$90,00":
-        metrica_1 = metrica_1[metrica_1['cotacao'] <= 90.00]
-
-    elif valor_disposto == "R$91,00 a R$120,00":
-        metrica_1 = metrica_1[(metrica_1['cotacao'] > 90.00) & (metrica_1['cotacao'] <= 120.00)]
-
-    elif valor_disposto == "Acima de R$121,00":
-        metrica_1 = metrica_1[metrica_1['cotacao'] > 121.00]
-
-    # Filtrando o DF com base na quantidade de FIIs escolhidos para recomendação
-    quantidade = int(st.session_state.get('quantidade'))
-    metrica_1 = metrica_1.head(quantidade)
-    metrica_1 = metrica_1.drop_duplicates(subset='TICKER')
+    motor = recomendacao.motor_atual()
+    preco_minimo, preco_maximo = recomendacao.FAIXAS_VALOR.get(st.session_state.get('valor_investir'), (None, None))
+    parametros = recomendacao.normalizar_parametros(
+        perfil_investidor,
+        historico=st.session_state.get('historico'),
+        segmentos=st.session_state.get('segmentos'),
+        preco_minimo=preco_minimo,
+        preco_maximo=preco_maximo,
+        quantidade=st.session_state.get('quantidade')
+    )
 
-    return metrica_1
+    # Cotações da base local (em memória); as vencidas são atualizadas em segundo plano
+    return motor.recomendar(*parametros, cotacoes.base.precos(motor.tickers))
 
 def formatar_numero(valor):
     if valor >= 1e9:  # Bilhões
@@ -852,27 +647,51 @@ def formatar_numero(valor):
         return f"{valor:.2f}"
     
 
-def llm_resumo(lista):
-    openai.api_key = api_key
+# Incrementar ao mudar o texto de um prompt, para não reaproveitar respostas do prompt antigo
+VERSAO_PROMPT_RESUMO = 2
+VERSAO_PROMPT_ANALISE = 1
+
+
+def completar_em_cache(nome, versao_prompt, prompt, **parametros):
+    # Mesmo prompt, modelo e parâmetros devolvem a resposta guardada, sem nova chamada à OpenAI
+    modelo = "gpt-3.5-turbo"
+
+    def gerar():
+        import openai
+
+        openai.api_key = api_key
+        response = openai.chat.completions.create(
+            model=modelo,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            **parametros
+        )
+        return response.choices[0].message.content
+
+    return cache_llm.respostas.obter_ou_gerar(nome, versao_prompt, modelo, parametros, prompt, gerar)
 
-    prompt = f"""Você irá analisar o conteúdo a seguir, que consiste em um relatório gerencial de um fundo imobiliário, e deverá resumir as informações mais relevantes de forma clara e objetiva, sem usar listas. O objetivo é destacar os pontos principais, incluindo:
+
+def resumir_relatorio_fii(lista):
+    def reduzir(resumos):
+        prompt = f"""Você irá analisar o conteúdo a seguir, que consiste em um relatório gerencial de um fundo imobiliário, e deverá resumir as informações mais relevantes de forma clara e objetiva, sem usar listas. O objetivo é destacar os pontos principais, incluindo:
     1. Os **objetivos estratégicos** do fundo, como metas de rentabilidade, diversificação e crescimento.
     2. **Resultados financeiros atualizados** do mês, como rentabilidade, dividendos pagos e variação do patrimônio líquido.
     3. **Indicadores de performance** importantes, como o rendimento por cota, a valorização das cotas e o comparativo com benchmarks do mercado.
     4. **Principais investimentos e ativos do fundo**, incluindo a performance desses ativos no mês e quaisquer mudanças significativas na carteira.
     5. **Gestão de riscos**: aspectos como a alavancagem utilizada, a exposição a diferentes setores e a diversificação geográfica ou de ativos.
     6. **Perspectivas futuras** do fundo, incluindo estratégias planejadas para os próximos meses ou anos.
-    O resumo deve ser fluido, sem perder a objetividade, e cobrir todos esses pontos de forma integrada, destacando as informações mais relevantes para os investidores e stakeholders, sem simplesmente repetir os dados da lista. A lista com as informações a serem resumidas é a seguinte: {lista}
+    O resumo deve ser fluido, sem perder a objetividade, e cobrir todos esses pontos de forma integrada, destacando as informações mais relevantes para os investidores e stakeholders, sem simplesmente repetir os dados da lista. Os resumos parciais do relatório, na ordem das páginas, são os seguintes: {resumos}
 """
+        return completar_em_cache("llm_resumo", VERSAO_PROMPT_RESUMO, prompt, temperature=0.7)
+
+    # Páginas agrupadas em trechos resumidos em paralelo (com cache por trecho) e depois combinados
+    return resumo_relatorio.resumir_relatorio(lista, completar_em_cache, reduzir)
+
+
+def llm_resumo(lista):
     try:
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7
-        )
-        return response.choices[0].message.content
+        return resumir_relatorio_fii(lista)
     except Exception as e:
         return f"Erro ao gerar análise: {str(e)}"
 
@@ -881,8 +700,6 @@ def llm_resumo(lista):
 
 
 def gerar_analise_fii(ticker, dividend_yield, patrimonio_liquido, valor_cota, cotistas, segmento):
-    openai.api_key = api_key
-    
     prompt = f"""Você é um analista financeiro especializado em Fundos Imobiliários (FIIs) do Brasil.
     Analise os dados abaixo e forneça insights valiosos sobre o FII em questão.
     
@@ -903,15 +720,7 @@ def gerar_analise_fii(ticker, dividend_yield, patrimonio_liquido, valor_cota, co
     Mantenha um tom profissional e objetivo."""
 
     try:
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1000
-        )
-        return response.choices[0].message.content
+        return completar_em_cache("gerar_analise_fii", VERSAO_PROMPT_ANALISE, prompt, temperature=0.7, max_tokens=1000)
     except Exception as e:
         return f"Erro ao gerar análise: {str(e)}"
 
@@ -920,8 +729,20 @@ def inicializar_chat():
     if "mensagens" not in st.session_state:
         st.session_state.mensagens = []
     if "openai_client" not in st.session_state:
+        from openai import OpenAI
+
         st.session_state.openai_client = OpenAI(api_key=api_key)
 
+def resumir_conversa(resumo_anterior, bloco):
+    response = st.session_state.openai_client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=memoria_conversa.mensagens_resumo(resumo_anterior, bloco),
+        temperature=0,
+        max_tokens=memoria_conversa.LIMITE_TOKENS_RESUMO
+    )
+    return response.choices[0].message.content
+
+
 def chat_fii():
     inicializar_chat()
     
@@ -935,28 +756,25 @@ def chat_fii():
         with st.chat_message("user"):
             st.write(prompt)
             
-        contexto = """Você é um especialista em Fundos Imobiliários (FIIs) do mercado brasileiro.
-        Forneça respostas claras e objetivas sobre FIIs, incluindo análises, recomendações e explicações
-        sobre conceitos importantes do mercado. Mantenha um tom profissional e educativo."""
-        
         try:
-            mensagens_completas = [
-                {"role": "system", "content": contexto}
-            ] + st.session_state.mensagens
+            # A tela mostra a conversa inteira, mas o modelo recebe só as mensagens recentes e o resumo das antigas
+            resumo, janela = memoria_conversa.memoria.compactar(st.session_state.mensagens, resumir_conversa)
+            mensagens_completas = memoria_conversa.montar_mensagens(memoria_conversa.SYSTEM_CONTEXT, resumo, janela)
             
-            response = st.session_state.openai_client.chat.completions.create(
+            stream = st.session_state.openai_client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=mensagens_completas,
                 temperature=0.7,
-                max_tokens=1000
+                max_tokens=1000,
+                stream=True
             )
-            
-            resposta = response.choices[0].message.content
-            
-            st.session_state.mensagens.append({"role": "assistant", "content": resposta})
-            
+
+            # Os trechos aparecem à medida que chegam; write_stream devolve o texto completo
+            import cliente_llm
             with st.chat_message("assistant"):
-                st.write(resposta)
+                resposta = st.write_stream(cliente_llm.textos_stream(stream))
+
+            st.session_state.mensagens.append({"role": "assistant", "content": resposta})
                 
         except Exception as e:
             st.error(f"Erro ao gerar resposta: {str(e)}")
@@ -968,8 +786,11 @@ def escolha_analise():
 
     df = score_df()
 
-    df_complemento = concatenacao_complement()
-    df_complemento['Data_Referencia'] = pd.to_datetime(df_complemento['Data_Referencia'], dayfirst=True, format='mixed')
+    # Relatórios dos fundos recomendados preparados em segundo plano enquanto o usuário lê os cards
+    preparo_relatorios.compartilhado(preparar_relatorio).agendar(df['TICKER'])
+
+    df_complemento = concatenacao_complement(colunas=["CNPJ_Fundo", "Data_Referencia", "Percentual_Dividend_Yield_Mes",
+                                                      "Patrimonio_Liquido", "Total_Numero_Cotistas", "Cotas_Emitidas"])
     
     # CSS atualizado para exibir um card por linha
     st.markdown("""
@@ -1328,10 +1149,10 @@ def escolha_analise():
                 st.write("")
                 st.subheader("Resumo do relatório gerencial mais recente disponível")
                 ticker = str(st.session_state.ticker_escolhido).lower()  # Código do fundo imobiliário
-                diretorio_download = "data/downloads"
-                headless = True  # Executar navegador em modo headless
-                relatorio_textos = relatorio_gerencial(ticker, diretorio_download, headless)
-                st.write(llm_resumo(relatorio_textos))
+                try:
+                    st.write(preparo_relatorios.compartilhado(preparar_relatorio).obter(ticker))
+                except Exception as e:
+                    st.write(f"Erro ao gerar análise: {str(e)}")
 
     st.markdown("<h3 style='text-align: center;'>🤖 Tire suas dúvidas com o Assistente Virtual!</h3>", unsafe_allow_html=True)
     chat_fii()
@@ -1339,48 +1160,23 @@ def escolha_analise():
     return st.session_state.ticker_escolhido
 
 def scrapping_relatorio(ticker):
+    _, url_relatorio = localizar_relatorio(ticker)
+    return url_relatorio
 
-    url = f"https://www.fundsexplorer.com.br/funds/{ticker}"
-
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36'
-    }
-
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-
-    soup = BeautifulSoup(response.text, 'html.parser')
-
-    links = soup.find_all('a', href=True)
 
-    data_atual = datetime.now()
-    ano = data_atual.year
-    mes = data_atual.month
-
-    def retroceder_mes(ano, mes):
-        """Retrocede um mês, ajustando o ano se necessário."""
-        if mes == 1:
-            mes = 12
-            ano -= 1
-        else:
-            mes -= 1
-        return ano, mes
-
-    relatorio_mais_recente = None
-    while not relatorio_mais_recente:
-        mes_ano = f"{mes:02d}/{ano}"
-
-        for link in links:
-            texto = link.get_text(strip=True).lower()
-            if 'gerencial' in texto and mes_ano in texto:
-                relatorio_mais_recente = link['href']
-                print(f"Relatório encontrado para: {mes_ano}")
-                break
+def localizar_relatorio(ticker):
+    """
+    Procura o relatório gerencial mais recente do fundo.
 
-        ano, mes = retroceder_mes(ano, mes)
-    return relatorio_mais_recente
+    Returns:
+        tuple: (mês de referência "AAAA-MM", link do relatório), ou (None, None)
+    """
+    # Uma leitura da página por ticker (com TTL) e no máximo busca_relatorio.LIMITE_MESES meses para trás
+    return busca_relatorio.localizar_relatorio(ticker)
 
 def configurar_download_automatico(diretorio_download, headless=False):
+    from selenium.webdriver.chrome.options import Options
+
     chrome_options = Options()
     
     # Configurações para download automático
@@ -1402,6 +1198,13 @@ def configurar_download_automatico(diretorio_download, headless=False):
     return chrome_options
 
 def baixar_pdf_selenium(url, diretorio_download, headless=False):
+    # O navegador é só o plano B do download; Selenium só é carregado quando ele é usado
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from webdriver_manager.chrome import ChromeDriverManager
 
     diretorio_download = os.path.abspath(diretorio_download)
     
@@ -1413,12 +1216,15 @@ def baixar_pdf_selenium(url, diretorio_download, headless=False):
                             options=chrome_options)
     
     try:
+        existentes = set(os.listdir(diretorio_download))
         driver.get(url)
         wait = WebDriverWait(driver, 10)
         botao_download = wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="icon"]/cr-icon')))
         botao_download.click()
-        time.sleep(5)
-        print(f"Download iniciado. Verifique a pasta: {diretorio_download}")
+
+        # Espera o arquivo terminar de baixar em vez de um tempo fixo
+        caminho = download_relatorio.aguardar_download(diretorio_download, existentes)
+        print(f"Download concluído: {caminho}")
         
     except Exception as e:
         print(f"Erro ao fazer download: {e}")
@@ -1427,34 +1233,13 @@ def baixar_pdf_selenium(url, diretorio_download, headless=False):
         driver.quit()
 
 
-def ult():
-
-    downloads_path = "data/downloads"
-    arquivos = os.listdir(downloads_path)
-
-    lista = []
-
-    for arquivo in arquivos:
-        caminho_arquivo = os.path.join(downloads_path, arquivo)
-        if arquivo.lower().endswith(".pdf"):
-            try:
-                reader = PdfReader(caminho_arquivo)
-                for i, page in enumerate(reader.pages):
-                    print(f"--- Página {i + 1} do arquivo {arquivo} ---")
-                    texto = page.extract_text()
-                    lista.append(texto)
-            except Exception as e:
-                print(f"Erro ao processar o arquivo {arquivo}: {e}")
-
-    for arquivo in arquivos:
-        caminho_arquivo = os.path.join(downloads_path, arquivo)
-        try:
-            os.remove(caminho_arquivo)
-            print(f"Arquivo {arquivo} removido com sucesso.")
-        except Exception as e:
-            print(f"Erro ao excluir o arquivo {arquivo}: {e}")
-
-    return lista
+def baixar_relatorio(url, diretorio_download, headless=False):
+    # Download direto por HTTP; o navegador só entra se ele falhar
+    try:
+        download_relatorio.baixar_pdf(url, diretorio_download)
+    except Exception as e:
+        print(f"Download direto falhou ({e}), tentando pelo navegador...")
+        baixar_pdf_selenium(url, diretorio_download, headless)
 
 
 def relatorio_gerencial(ticker, diretorio_download, headless=False):
@@ -1468,153 +1253,58 @@ def relatorio_gerencial(ticker, diretorio_download, headless=False):
         headless (bool): Se True, executa o navegador em modo headless.
         
     Returns:
-        list: Lista de textos extraídos dos PDFs baixados.
+        iterable: Textos das páginas do relatório. Um relatório novo vem como gerador,
+            para que o resumo comece enquanto o PDF ainda está sendo lido.
     """
     try:
         print("Iniciando scraping para encontrar o relatório...")
-        url_relatorio = scrapping_relatorio(ticker)
+        mes_referencia, url_relatorio = localizar_relatorio(ticker)
         if not url_relatorio:
             print("Nenhum relatório encontrado.")
             return None
         
         print(f"Link do relatório encontrado: {url_relatorio}")
+
+        # Relatório já baixado e extraído antes: nada de download nem de leitura do PDF
+        textos_extraidos = acervo_relatorios.acervo.obter(ticker, mes_referencia, url_relatorio)
+        if textos_extraidos is not None:
+            print(f"Relatório de {mes_referencia} encontrado no acervo.")
+            return textos_extraidos
         
-        print("Iniciando download do relatório...")
-        baixar_pdf_selenium(url_relatorio, diretorio_download, headless)
-        
-        print("Processando PDFs baixados...")
-        textos_extraidos = ult()
-        
-        print("Processamento concluído.")
-        return textos_extraidos
+        # Cada requisição baixa em uma pasta própria, apagada ao final
+        with acervo_relatorios.area_trabalho(diretorio_download) as pasta:
+            print("Iniciando download do relatório...")
+            baixar_relatorio(url_relatorio, pasta, headless)
+
+            pdfs = [os.path.join(pasta, arquivo) for arquivo in os.listdir(pasta) if arquivo.lower().endswith(".pdf")]
+            if not pdfs:
+                print("Nenhum PDF baixado.")
+                return None
+            sha256 = acervo_relatorios.acervo.guardar_pdf(pdfs[0])
+
+        # Páginas extraídas em paralelo e entregues conforme ficam prontas; o texto entra no acervo ao final
+        print("Processando PDF baixado...")
+        return acervo_relatorios.acervo.extrair_e_guardar(
+            ticker, mes_referencia, url_relatorio, sha256, extracao_pdf.extrair_paginas
+        )
 
     except Exception as e:
         print(f"Erro durante a execução: {e}")
         return None
 
 
-
-########################################################### APIS ##############################################################
-
-app = FastAPI()
-
-
-openai_client = OpenAI(api_key=api_key)
-
-class Message(BaseModel):
-    role: str
-    content: str
-
-class ChatRequest(BaseModel):
-    messages: List[Message]
-
-class ChatResponse(BaseModel):
-    response: str
-    messages: List[Message]
-
-SYSTEM_CONTEXT = """Você é um especialista em Fundos Imobiliários (FIIs) do mercado brasileiro.
-Forneça respostas claras e objetivas sobre FIIs, incluindo análises, recomendações e explicações
-sobre conceitos importantes do mercado. Mantenha um tom profissional e educativo."""
-
-@app.post("/chat/especialista_fii", response_model=ChatResponse)
-async def chat_endpoint(chat_request: ChatRequest):
-    try:
-        messages_for_api = [
-            {"role": "system", "content": SYSTEM_CONTEXT}
-        ] + [message.model_dump() for message in chat_request.messages]
-        
-        response = openai_client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=messages_for_api,
-            temperature=0.7,
-            max_tokens=1000
-        )
-        
-        assistant_response = response.choices[0].message.content
-        updated_messages = chat_request.messages + [
-            Message(role="assistant", content=assistant_response)
-        ]
-        
-        return ChatResponse(
-            response=assistant_response,
-            messages=updated_messages
-        )
-        
-    except ValidationError as e:
-        raise HTTPException(status_code=422, detail="Erro de validação nos dados")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
-
-# Função auxiliar para processar consultas de CNPJ
-def process_cnpj_query(df: pd.DataFrame, cnpj: int, tipo_consulta: str):
-    try:
-        df = df.fillna(0)
-        df['cnpj_normalizado'] = df['CNPJ_Fundo'].str.replace(".", "").str.replace("/", "").str.replace("-", "").astype(int)
-        fundo = df[df['cnpj_normalizado'] == cnpj]
-        
-        if fundo.empty:
-            raise HTTPException(
-                status_code=404, 
-                detail=f"CNPJ não encontrado na base de {tipo_consulta}"
-            )
-        
-        return fundo.to_dict(orient="records")
-        
-    except Exception as e:
-        if isinstance(e, HTTPException):
-            raise e
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Erro ao processar dados de {tipo_consulta}: {str(e)}"
-        )
-
-@app.get("/dataset/ativos_passivos/{cnpj}")
-async def read_concatenacao(cnpj: int):
-    """
-    Endpoint destinado a obter as informações dos ativos e passivos desde 2020 ate o mês mais recente, por CNPJ desejado
+def preparar_relatorio(ticker, diretorio_download="data/downloads", headless=True):
     """
-    try:
-        df = concatenacao_at_pas()
-        return process_cnpj_query(df, cnpj, "ativos e passivos")
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Erro ao consultar ativos e passivos: {str(e)}"
-        )
+    Resumo do relatório gerencial mais recente do fundo: busca, download, extração e resumo.
 
-@app.get("/dataset/complemento/{cnpj}")
-async def read_concatenacao(cnpj: int):
-    """
-    Endpoint destinado a obter as informações dos complementos desde 2020 ate o mês mais recente, por CNPJ desejado
+    Raises:
+        RuntimeError: Se o relatório não puder ser obtido.
     """
-    try:
-        df = concatenacao_complement()
-        return process_cnpj_query(df, cnpj, "complementos")
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Erro ao consultar complementos: {str(e)}"
-        )
+    relatorio_textos = relatorio_gerencial(ticker, diretorio_download, headless)
+    if relatorio_textos is None:
+        raise RuntimeError(f"Relatório gerencial de {ticker.upper()} não encontrado")
+    return resumir_relatorio_fii(relatorio_textos)
 
-@app.get("/dataset/geral/{cnpj}")
-async def read_concatenacao(cnpj: int):
-    """
-    Endpoint destinado a obter as informações gerais desde 2020 ate o mês mais recente, por CNPJ desejado
-    """
-    try:
-        df = concatenacao_geral()
-        return process_cnpj_query(df, cnpj, "informações gerais")
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Erro ao consultar informações gerais: {str(e)}"
-        )
 
 
 ########################################################### EXIBIÇÃO ##########################################################
@@ -1631,13 +1321,13 @@ def pagina_metricas():
     explicacao()
     st.write("")
     st.markdown("<hr>", unsafe_allow_html=True)
-    metrica_at_pas_v1(concatenacao_at_pas)
+    metrica_at_pas_v1(carregar_agregado_atual)
     st.write("")
     st.markdown("<hr>", unsafe_allow_html=True)
-    segmento_fiis(concatenacao_geral)
+    segmento_fiis(carregar_agregado_atual)
     st.write("")
     st.markdown("<hr>", unsafe_allow_html=True)
-    scatter_plot(concatenacao_complement)
+    scatter_plot(carregar_agregado_atual)
     st.write("")
 
 
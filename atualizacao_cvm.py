@@ -0,0 +1,208 @@
+import os
+import re
+import glob
+import json
+import shutil
+import hashlib
+import tempfile
+from zipfile import ZipFile
+from urllib.parse import urljoin
+import requests
+from bs4 import BeautifulSoup
+import ingestao
+import registro_dados
+
+
+URL_CVM = "https://dados.cvm.gov.br/dataset/fii-doc-inf_mensal"
+ARQUIVO_ESTADO = os.path.join(ingestao.PASTA_DADOS, "atualizacao_cvm.json")
+
+# Anos mantidos pela aplicação; anos mais antigos só são atualizados se já existirem localmente
+ANO_INICIAL = 2020
+
+TAMANHO_BLOCO = 1024 * 1024
+TIMEOUT = 30
+
+PADRAO_ZIP = re.compile(r"inf_mensal_fii_(\d{4})\.zip$")
+
+
+def ler_estado(caminho=ARQUIVO_ESTADO):
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def gravar_estado(estado, caminho=ARQUIVO_ESTADO):
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(estado, arquivo, indent=2)
+    os.replace(temporario, caminho)
+
+
+def descobrir_arquivos(sessao, url=URL_CVM):
+    """
+    Procura na página da CVM os links inf_mensal_fii_<ano>.zip.
+
+    Returns:
+        dict: {ano: url do zip}
+    """
+    response = sessao.get(url, timeout=TIMEOUT)
+    response.raise_for_status()
+
+    soup = BeautifulSoup(response.text, 'html.parser')
+    arquivos = {}
+    for link in soup.find_all('a', href=True):
+        encontrado = PADRAO_ZIP.search(link['href'])
+        if encontrado:
+            arquivos[int(encontrado.group(1))] = urljoin(url, link['href'])
+    return arquivos
+
+
+def arquivo_alterado(sessao, url, anterior):
+    """
+    Verifica com um único HEAD condicional se o zip mudou desde o último download.
+    """
+    if not anterior:
+        return True
+
+    headers = {}
+    if anterior.get("etag"):
+        headers["If-None-Match"] = anterior["etag"]
+    if anterior.get("last_modified"):
+        headers["If-Modified-Since"] = anterior["last_modified"]
+
+    response = sessao.head(url, headers=headers, timeout=TIMEOUT, allow_redirects=True)
+    if response.status_code == 304:
+        return False
+    if response.status_code != 200:
+        return True
+
+    # Servidores que ignoram os cabeçalhos condicionais ainda devolvem os validadores
+    etag = response.headers.get("ETag")
+    if etag and etag == anterior.get("etag"):
+        return False
+    last_modified = response.headers.get("Last-Modified")
+    tamanho = response.headers.get("Content-Length")
+    if not etag and last_modified and last_modified == anterior.get("last_modified") and tamanho == anterior.get("tamanho"):
+        return False
+    return True
+
+
+def baixar_zip(sessao, url, destino):
+    """
+    Baixa o zip em blocos direto para o disco, calculando o hash durante o download.
+
+    Returns:
+        dict: Validadores do arquivo (etag, last_modified, tamanho, sha256).
+    """
+    sha256 = hashlib.sha256()
+    with sessao.get(url, stream=True, timeout=TIMEOUT) as response:
+        response.raise_for_status()
+        with open(destino, 'wb') as arquivo:
+            for bloco in response.iter_content(chunk_size=TAMANHO_BLOCO):
+                arquivo.write(bloco)
+                sha256.update(bloco)
+
+        return {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "tamanho": response.headers.get("Content-Length"),
+            "sha256": sha256.hexdigest(),
+        }
+
+
+def extrair_atomico(arquivo_zip, pasta_destino):
+    """
+    Extrai em uma pasta versionada oculta ao lado do destino e troca o link simbólico
+    do destino com uma única renomeação, para que leitores nunca vejam uma pasta pela
+    metade nem a ausência dela. A geração anterior é mantida, como no coletar_lixo.
+
+    Só na primeira troca de uma pasta antiga (um diretório comum, não um link) há um
+    intervalo curto entre mover o diretório e publicar o link.
+    """
+    pasta_pai = os.path.dirname(os.path.abspath(pasta_destino))
+    nome = os.path.basename(os.path.abspath(pasta_destino))
+    versionada = tempfile.mkdtemp(prefix=f".{nome}-", dir=pasta_pai)
+    link = f"{pasta_destino}.{os.getpid()}.tmp"
+    try:
+        with ZipFile(arquivo_zip, 'r') as zip_ref:
+            zip_ref.extractall(versionada)
+        os.symlink(os.path.basename(versionada), link)
+    except BaseException:
+        shutil.rmtree(versionada)
+        raise
+
+    anterior = None
+    if os.path.islink(pasta_destino):
+        anterior = os.path.join(pasta_pai, os.readlink(pasta_destino))
+    elif os.path.isdir(pasta_destino):
+        anterior = tempfile.mkdtemp(prefix=f".{nome}-", dir=pasta_pai)
+        os.rmdir(anterior)
+        os.replace(pasta_destino, anterior)
+    os.replace(link, pasta_destino)
+
+    # Gerações mais antigas que a anterior já não são vistas por ninguém
+    for pasta in glob.glob(os.path.join(pasta_pai, f".{nome}-*")):
+        if pasta not in (versionada, anterior):
+            shutil.rmtree(pasta, ignore_errors=True)
+
+    print(f"Arquivos extraídos para {pasta_destino}")
+
+
+def atualizar(url=URL_CVM, sessao=None, anos=None, pasta_dados=ingestao.PASTA_DADOS, arquivo_estado=ARQUIVO_ESTADO):
+    """
+    Atualiza as pastas inf_mensal_fii_<ano> a partir da página da CVM.
+
+    Anos sem alteração custam apenas um HEAD; anos alterados são baixados em blocos e
+    extraídos atomicamente. Um download com o mesmo hash do anterior não é extraído.
+
+    Args:
+        url (str): Página da CVM com os links dos zips (ou um servidor local em testes).
+        sessao (requests.Session): Sessão HTTP; uma nova é criada se não for informada.
+        anos (list): Anos a atualizar. None atualiza os anos desde ANO_INICIAL e os já existentes.
+        pasta_dados (str): Pasta onde ficam as pastas inf_mensal_fii_<ano>.
+        arquivo_estado (str): JSON com os validadores do último download de cada ano.
+
+    Returns:
+        list: Anos cujos arquivos foram atualizados.
+    """
+    sessao = sessao or requests.Session()
+
+    # Duas atualizações simultâneas (duas sessões do Streamlit, CLI) baixariam e trocariam as mesmas pastas
+    with registro_dados.bloqueio(os.path.join(pasta_dados, "atualizacao_cvm.lock"), espera=registro_dados.BLOQUEIO_EXPIRADO):
+        estado = ler_estado(arquivo_estado)
+
+        arquivos = descobrir_arquivos(sessao, url)
+        if anos is None:
+            anos = [ano for ano in arquivos if ano >= ANO_INICIAL or os.path.isdir(os.path.join(pasta_dados, f"inf_mensal_fii_{ano}"))]
+
+        atualizados = []
+        for ano in sorted(anos):
+            if ano not in arquivos:
+                print(f"Nenhum link encontrado para {ano}")
+                continue
+
+            pasta_destino = os.path.join(pasta_dados, f"inf_mensal_fii_{ano}")
+            anterior = estado.get(str(ano)) if os.path.isdir(pasta_destino) else None
+
+            if not arquivo_alterado(sessao, arquivos[ano], anterior):
+                print(f"{ano}: sem alterações")
+                continue
+
+            os.makedirs(pasta_dados, exist_ok=True)
+            descritor, arquivo_zip = tempfile.mkstemp(prefix=f".inf_mensal_fii_{ano}_", suffix=".zip", dir=pasta_dados)
+            os.close(descritor)
+            try:
+                validadores = baixar_zip(sessao, arquivos[ano], arquivo_zip)
+                if anterior and validadores["sha256"] == anterior.get("sha256"):
+                    print(f"{ano}: conteúdo idêntico ao anterior")
+                else:
+                    extrair_atomico(arquivo_zip, pasta_destino)
+                    atualizados.append(ano)
+            finally:
+                os.remove(arquivo_zip)
+
+            estado[str(ano)] = validadores
+            gravar_estado(estado, arquivo_estado)
+
+        return atualizados
@@ -0,0 +1,105 @@
+import os
+import time
+import argparse
+import tempfile
+from PyPDF2 import PdfReader
+import extracao_pdf
+
+
+PARAGRAFO = (
+    "O fundo distribuiu R$ 0,85 por cota no mes, equivalente a um dividend yield anualizado de 11,2%. "
+    "A vacancia fisica da carteira ficou em 4,3% e o fundo concluiu a aquisicao de um galpao logistico. "
+)
+
+
+def _pdf_bruto(paginas):
+    """
+    Monta um PDF mínimo a partir de uma lista de páginas: "texto", "vazia" ou "imagem".
+    """
+    objetos = {1: b"<< /Type /Catalog /Pages 2 0 R >>", 3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    imagem = 4
+    objetos[imagem] = b"<< /Type /XObject /Subtype /Image /Width 1 /Height 1 /ColorSpace /DeviceGray /BitsPerComponent 8 /Length 1 >>\nstream\n\x80\nendstream"
+    filhos = []
+    proximo = 5
+    for numero, tipo in enumerate(paginas):
+        if tipo == "texto":
+            linhas = [f"BT /F1 9 Tf 40 {800 - 12 * i} Td ({PARAGRAFO[:95]} p{numero} l{i}) Tj ET" for i in range(60)]
+            recursos = b"<< /Font << /F1 3 0 R >> >>"
+        elif tipo == "imagem":
+            linhas = ["q 500 0 0 700 40 60 cm /Im1 Do Q"]
+            recursos = f"<< /XObject << /Im1 {imagem} 0 R >> >>".encode()
+        else:
+            linhas = []
+            recursos = b"<< >>"
+        conteudo = "\n".join(linhas).encode("latin-1")
+        objetos[proximo] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(conteudo), conteudo)
+        objetos[proximo + 1] = b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources %s /Contents %d 0 R >>" % (recursos, proximo)
+        filhos.append(proximo + 1)
+        proximo += 2
+    objetos[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{f} 0 R" for f in filhos).encode(), len(filhos))
+
+    saida = bytearray(b"%PDF-1.4\n")
+    posicoes = {}
+    for numero in sorted(objetos):
+        posicoes[numero] = len(saida)
+        saida += b"%d 0 obj\n%s\nendobj\n" % (numero, objetos[numero])
+    inicio_xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for numero in sorted(objetos):
+        saida += b"%010d 00000 n \n" % posicoes[numero]
+    saida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, inicio_xref)
+    return bytes(saida)
+
+
+def gerar_pdfs(pasta, quantidade=3, paginas=60):
+    # Relatórios sintéticos: a cada 10 páginas, uma só com imagem e uma em branco
+    caminhos = []
+    tipos = ["imagem" if i % 10 == 3 else "vazia" if i % 10 == 7 else "texto" for i in range(paginas)]
+    for indice in range(quantidade):
+        caminho = os.path.join(pasta, f"relatorio_{indice}.pdf")
+        with open(caminho, "wb") as arquivo:
+            arquivo.write(_pdf_bruto(tipos))
+        caminhos.append(caminho)
+    return caminhos
+
+
+def sequencial(caminho):
+    # Forma anterior: todas as páginas lidas em ordem, no mesmo processo
+    return [page.extract_text() for page in PdfReader(caminho).pages]
+
+
+def medir(funcao, caminhos):
+    inicio = time.perf_counter()
+    primeira = None
+    paginas = 0
+    for caminho in caminhos:
+        for _ in funcao(caminho):
+            if primeira is None:
+                primeira = time.perf_counter() - inicio
+            paginas += 1
+    return time.perf_counter() - inicio, primeira, paginas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a extração sequencial de PDFs com a extração paralela por páginas.")
+    parser.add_argument("--pasta", help="Pasta com PDFs; sem ela são gerados relatórios sintéticos")
+    parser.add_argument("--trabalhadores", type=int, default=extracao_pdf.TRABALHADORES)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporaria:
+        if args.pasta:
+            caminhos = [os.path.join(args.pasta, nome) for nome in sorted(os.listdir(args.pasta)) if nome.lower().endswith(".pdf")]
+        else:
+            caminhos = gerar_pdfs(temporaria)
+
+        total_seq, primeira_seq, paginas_seq = medir(sequencial, caminhos)
+        total_par, primeira_par, paginas_par = medir(lambda caminho: extracao_pdf.extrair_paginas(caminho, args.trabalhadores), caminhos)
+
+    print(f"{len(caminhos)} PDFs, {paginas_seq} páginas, {args.trabalhadores} processos (CPUs: {os.cpu_count()})")
+    print(f"Sequencial: {total_seq:.2f}s (primeira página em {primeira_seq:.2f}s)")
+    print(f"Paralelo:   {total_par:.2f}s (primeira página em {primeira_par:.2f}s), {paginas_seq - paginas_par} páginas sem texto ignoradas")
+    print(f"Ganho: {total_seq / total_par:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
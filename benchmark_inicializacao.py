@@ -0,0 +1,76 @@
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+
+# Tempo máximo de importação (segundos) de cada ponto de entrada; acima disso o benchmark falha
+ORCAMENTO = {
+    "api": float(os.getenv("ORCAMENTO_IMPORTACAO_API", "1.5")),
+    "app": float(os.getenv("ORCAMENTO_IMPORTACAO_APP", "2.5")),
+}
+
+# Bibliotecas que a API não pode carregar na inicialização
+PROIBIDOS = {
+    "api": ["streamlit", "plotly", "matplotlib", "seaborn", "selenium", "webdriver_manager", "PyPDF2", "bs4", "yfinance", "openai"],
+    "app": ["selenium", "webdriver_manager", "matplotlib", "seaborn", "yfinance", "fastapi"],
+}
+
+LINHA = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def medir_importacao(modulo):
+    """
+    Importa `modulo` em um processo novo com `python -X importtime`.
+
+    Returns:
+        list: (segundos acumulados, profundidade, nome) de cada módulo importado.
+    """
+    ambiente = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True, text=True, env=ambiente, check=True,
+    )
+    linhas = []
+    for linha in processo.stderr.splitlines():
+        encontrado = LINHA.match(linha)
+        if encontrado:
+            linhas.append((int(encontrado.group(2)) / 1e6, len(encontrado.group(3)) // 2, encontrado.group(4)))
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede o tempo de importação dos pontos de entrada e compara com o orçamento.")
+    parser.add_argument("modulos", nargs="*", default=list(ORCAMENTO))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--maiores", type=int, default=8, help="Quantas importações diretas mais lentas listar")
+    args = parser.parse_args()
+
+    falhas = []
+    for modulo in args.modulos:
+        # O menor tempo das repetições tira o ruído do disco frio e de outros processos
+        medicoes = [medir_importacao(modulo) for _ in range(args.repeticoes)]
+        linhas = min(medicoes, key=lambda medicao: medicao[-1][0])
+        total = linhas[-1][0]
+        carregados = {nome.split(".")[0] for _, _, nome in linhas}
+
+        orcamento = ORCAMENTO.get(modulo)
+        situacao = "" if orcamento is None else f" (orçamento {orcamento:.2f}s)"
+        print(f"{modulo}: {total:.3f}s{situacao}")
+        for segundos, _, nome in sorted((linha for linha in linhas if linha[1] == 1), reverse=True)[:args.maiores]:
+            print(f"  {segundos:.3f}s {nome}")
+
+        if orcamento is not None and total > orcamento:
+            falhas.append(f"{modulo} importa em {total:.3f}s, acima do orçamento de {orcamento:.2f}s")
+        proibidos = [nome for nome in PROIBIDOS.get(modulo, []) if nome in carregados]
+        if proibidos:
+            falhas.append(f"{modulo} carrega na inicialização: {', '.join(proibidos)}")
+
+    for falha in falhas:
+        print(f"FALHA: {falha}")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import time
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+import ingestao
+import agregados
+import ranking
+
+
+def apply_nlargest(df, grupo, metricas, n):
+    # Como era em metrica_at_pas_v1: um callback Python por grupo e por métrica
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        return {
+            metrica: (
+                df.groupby(grupo)[["CNPJ_Fundo", metrica]].apply(lambda x: x.nlargest(n, metrica))
+                .reset_index(level=0).reset_index(drop=True)
+            )
+            for metrica in metricas
+        }
+
+
+def vetorizado(df, grupo, metricas, n):
+    return ranking.maiores_por_grupo(df, grupo, metricas, n, colunas=["CNPJ_Fundo"])
+
+
+def medir(funcao, *args, repeticoes=3):
+    # Menor tempo das repetições
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resultado
+
+
+def mesmos_fundos(esperado, obtido, grupo):
+    # Mesmo conjunto de (grupo, fundo, valor); a ordem das linhas pode diferir entre métodos
+    colunas = [grupo, "CNPJ_Fundo"]
+    esperado = esperado.sort_values(colunas).reset_index(drop=True)
+    obtido = obtido[esperado.columns].sort_values(colunas).reset_index(drop=True)
+    return len(esperado) == len(obtido) and (esperado[colunas].to_numpy() == obtido[colunas].to_numpy()).all() and np.allclose(
+        esperado.iloc[:, 2].to_numpy(dtype=np.float64), obtido.iloc[:, 2].to_numpy(dtype=np.float64), equal_nan=True
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara o top N por grupo vetorizado com groupby().apply(nlargest).")
+    parser.add_argument("--n", type=int, nargs="*", default=[5, 50])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    df = ingestao.carregar_conjunto("ativo_passivo", ["CNPJ_Fundo", "Data_Referencia"] + agregados.COLUNAS_ATIVO + ["Total_Passivo"])
+    metricas = ["Total_Ativo", "Total_Passivo"]
+    anos = df["Data_Referencia"].dt.year
+    print(f"ativo_passivo: {len(df)} linhas de {int(anos.min())} a {int(anos.max())}")
+
+    for periodo in ranking.PERIODOS:
+        totais = pd.DataFrame({
+            periodo: ranking.chave_periodo(df["Data_Referencia"], periodo),
+            "CNPJ_Fundo": df["CNPJ_Fundo"].astype(str),
+            "Total_Ativo": df[agregados.COLUNAS_ATIVO].sum(axis=1),
+            "Total_Passivo": df["Total_Passivo"],
+        }).groupby([periodo, "CNPJ_Fundo"])[metricas].sum().reset_index()
+        grupos = totais[periodo].nunique()
+
+        for n in args.n:
+            antigo, esperado = medir(apply_nlargest, totais, periodo, metricas, n, repeticoes=args.repeticoes)
+            novo, obtido = medir(vetorizado, totais, periodo, metricas, n, repeticoes=args.repeticoes)
+            iguais = all(mesmos_fundos(esperado[metrica], obtido[metrica], periodo) for metrica in metricas)
+            print(
+                f"por {periodo} ({grupos} grupos, {len(totais)} linhas), top {n}: "
+                f"apply(nlargest) {antigo * 1000:.1f} ms, vetorizado {novo * 1000:.1f} ms "
+                f"({antigo / novo:.0f}x){'' if iguais else ' RESULTADOS DIFERENTES'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
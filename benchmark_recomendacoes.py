@@ -0,0 +1,56 @@
+import time
+import random
+import argparse
+import tempfile
+import os
+import pontuacao
+import cotacoes
+import recomendacao
+
+
+def perfis_aleatorios(quantidade, segmentos, semente=0):
+    aleatorio = random.Random(semente)
+    return [
+        recomendacao.normalizar_parametros(
+            aleatorio.choice(list(pontuacao.PESOS_PERFIS)),
+            historico=aleatorio.choice(recomendacao.HISTORICOS),
+            segmentos=aleatorio.sample(segmentos, aleatorio.randint(0, 3)),
+            preco_maximo=aleatorio.choice([None, 90.0, 120.0, 150.0]),
+            quantidade=aleatorio.randint(1, 10),
+        )
+        for _ in range(quantidade)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede quantos perfis por segundo o motor de recomendação atende.")
+    parser.add_argument("--perfis", type=int, default=1000)
+    parser.add_argument("--lote", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporaria:
+        # Preços fixos por ticker: mede só o motor, sem rede
+        cotacoes.base = cotacoes.BaseCotacoes(
+            fornecedor=lambda tickers: {ticker: 40.0 + sum(map(ord, ticker)) % 120 for ticker in tickers},
+            caminho=os.path.join(temporaria, "cotacoes.sqlite3"),
+        )
+
+        inicio = time.perf_counter()
+        motor = recomendacao.motor_atual()
+        cotacoes.base.precos(motor.tickers)
+        print(f"Tabela de scores {motor.versao} ({len(motor.pontuado)} linhas) carregada em {time.perf_counter() - inicio:.2f}s")
+
+        segmentos = sorted(motor.pontuado["Segmento_Atuacao"].unique())
+        perfis = perfis_aleatorios(args.perfis, segmentos)
+        lotes = [perfis[inicio:inicio + args.lote] for inicio in range(0, len(perfis), args.lote)]
+
+        for rodada in ("sem cache", "com cache"):
+            inicio = time.perf_counter()
+            for lote in lotes:
+                recomendacao.recomendar_lote(lote)
+            duracao = time.perf_counter() - inicio
+            print(f"{rodada}: {len(perfis) / duracao:,.0f} perfis/s em lotes de {args.lote} ({len(set(perfis))} combinações distintas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import re
+import time
+import threading
+from datetime import datetime
+from bs4 import BeautifulSoup
+import download_relatorio
+
+
+URL_FUNDO = "https://www.fundsexplorer.com.br/funds/{ticker}"
+
+# Quantos meses para trás um relatório ainda vale como "mais recente"
+LIMITE_MESES = int(os.getenv("RELATORIOS_LIMITE_MESES", "24"))
+
+# Validade, em segundos, da lista de relatórios lida da página de cada fundo
+TTL = int(os.getenv("RELATORIOS_TTL", "3600"))
+
+MES_ANO = re.compile(r"(?<!\d)(\d{2})/(\d{4})(?!\d)")
+
+_indices = {}
+_lock = threading.Lock()
+
+
+def indexar_relatorios(html):
+    """
+    Lê a página do fundo uma única vez e monta {(ano, mes): link} dos relatórios gerenciais.
+    Se houver mais de um link para o mesmo mês, vale o primeiro da página.
+    """
+    indice = {}
+    for link in BeautifulSoup(html, "html.parser").find_all("a", href=True):
+        texto = link.get_text(strip=True).lower()
+        if "gerencial" not in texto:
+            continue
+        for mes, ano in MES_ANO.findall(texto):
+            if 1 <= int(mes) <= 12:
+                indice.setdefault((int(ano), int(mes)), link["href"])
+    return indice
+
+
+def mais_recente(indice, referencia=None, limite_meses=LIMITE_MESES):
+    """
+    Relatório mais recente do índice entre o mês de `referencia` (padrão: hoje) e
+    `limite_meses` meses antes dele.
+
+    Returns:
+        tuple: (mês de referência "AAAA-MM", link), ou (None, None) se não houver.
+    """
+    referencia = referencia or datetime.now()
+    atual = referencia.year * 12 + referencia.month - 1
+    validos = [chave for chave in indice if atual - limite_meses <= chave[0] * 12 + chave[1] - 1 <= atual]
+    if not validos:
+        return None, None
+    ano, mes = max(validos)
+    return f"{ano}-{mes:02d}", indice[(ano, mes)]
+
+
+def obter_indice(ticker, sessao=None, ttl=TTL):
+    # Índice guardado por ticker; a página só é baixada de novo depois do TTL
+    ticker = ticker.lower()
+    agora = time.monotonic()
+    with _lock:
+        guardado = _indices.get(ticker)
+    if guardado and guardado[0] > agora:
+        return guardado[1]
+
+    sessao = sessao or download_relatorio.sessao_http()
+    response = sessao.get(URL_FUNDO.format(ticker=ticker), timeout=download_relatorio.TIMEOUT)
+    response.raise_for_status()
+    indice = indexar_relatorios(response.text)
+    with _lock:
+        _indices[ticker] = (agora + ttl, indice)
+    return indice
+
+
+def localizar_relatorio(ticker, referencia=None, limite_meses=LIMITE_MESES):
+    """
+    Procura o relatório gerencial mais recente do fundo.
+
+    Returns:
+        tuple: (mês de referência "AAAA-MM", link do relatório), ou (None, None) se não
+            houver relatório nos últimos `limite_meses` meses.
+    """
+    mes_referencia, url_relatorio = mais_recente(obter_indice(ticker), referencia, limite_meses)
+    if url_relatorio:
+        print(f"Relatório encontrado para: {mes_referencia}")
+    else:
+        print(f"Nenhum relatório gerencial de {ticker} nos últimos {limite_meses} meses")
+    return mes_referencia, url_relatorio
@@ -0,0 +1,129 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import orjson
+import registro_dados
+
+
+CAMINHO_CACHE = os.path.join(registro_dados.PASTA_DADOS, "cache_llm.sqlite3")
+
+# Validade de uma resposta, em segundos (os dados da CVM mudam no máximo uma vez por mês)
+TTL = int(os.getenv("CACHE_LLM_TTL", str(7 * 24 * 3600)))
+
+# Tamanho máximo das respostas guardadas; acima disso saem as menos usadas recentemente
+TAMANHO_MAXIMO = int(os.getenv("CACHE_LLM_TAMANHO_MAXIMO", str(50 * 1024 * 1024)))
+
+
+def chave_llm(nome, versao_prompt, modelo, parametros, entradas):
+    conteudo = orjson.dumps([nome, versao_prompt, modelo, parametros, entradas], option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+class CacheLLM:
+    """
+    Cache em SQLite das respostas do modelo, compartilhado entre reruns, sessões e processos.
+
+    A chave é o hash de (função, versão do prompt, modelo, parâmetros, entradas); mudar o
+    texto do prompt exige incrementar a versão. Cada função tem contadores de acertos e falhas.
+    """
+
+    def __init__(self, caminho=CAMINHO_CACHE, ttl=TTL, tamanho_maximo=TAMANHO_MAXIMO):
+        self.caminho = caminho
+        self.ttl = ttl
+        self.tamanho_maximo = tamanho_maximo
+        self._lock = threading.Lock()
+        self._conexao = None
+
+    def conexao(self):
+        if self._conexao is None:
+            os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+            conexao = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False, isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("""CREATE TABLE IF NOT EXISTS respostas (
+                chave TEXT PRIMARY KEY, nome TEXT, resposta TEXT,
+                criado_em REAL, acessado_em REAL, tamanho INTEGER)""")
+            conexao.execute("CREATE INDEX IF NOT EXISTS respostas_acesso ON respostas (acessado_em)")
+            conexao.execute("CREATE TABLE IF NOT EXISTS estatisticas (nome TEXT PRIMARY KEY, acertos INTEGER, falhas INTEGER)")
+            self._conexao = conexao
+        return self._conexao
+
+    def _contar(self, nome, acerto):
+        coluna = "acertos" if acerto else "falhas"
+        self.conexao().execute(
+            f"""INSERT INTO estatisticas (nome, acertos, falhas) VALUES (?, ?, ?)
+                ON CONFLICT(nome) DO UPDATE SET {coluna} = {coluna} + 1""",
+            (nome, int(acerto), int(not acerto)),
+        )
+
+    def obter(self, nome, chave):
+        agora = time.time()
+        with self._lock:
+            linha = self.conexao().execute(
+                "SELECT resposta FROM respostas WHERE chave = ? AND criado_em > ?", (chave, agora - self.ttl)
+            ).fetchone()
+            if linha:
+                self.conexao().execute("UPDATE respostas SET acessado_em = ? WHERE chave = ?", (agora, chave))
+            self._contar(nome, linha is not None)
+        return linha[0] if linha else None
+
+    def guardar(self, nome, chave, resposta):
+        agora = time.time()
+        with self._lock:
+            conexao = self.conexao()
+            conexao.execute(
+                "INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?, ?)",
+                (chave, nome, resposta, agora, agora, len(resposta.encode())),
+            )
+            self._despejar(conexao, agora)
+
+    def _despejar(self, conexao, agora):
+        conexao.execute("DELETE FROM respostas WHERE criado_em <= ?", (agora - self.ttl,))
+        total = conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+        if total <= self.tamanho_maximo:
+            return
+
+        # Remove as menos acessadas recentemente até voltar ao limite
+        excedente = total - self.tamanho_maximo
+        removidas = []
+        for chave, tamanho in conexao.execute("SELECT chave, tamanho FROM respostas ORDER BY acessado_em"):
+            removidas.append((chave,))
+            excedente -= tamanho
+            if excedente <= 0:
+                break
+        conexao.executemany("DELETE FROM respostas WHERE chave = ?", removidas)
+
+    def obter_ou_gerar(self, nome, versao_prompt, modelo, parametros, entradas, gerar):
+        """
+        Devolve a resposta guardada ou chama `gerar()` e guarda o resultado.
+        Exceções de `gerar` não são guardadas, então erros não ficam em cache.
+        """
+        chave = chave_llm(nome, versao_prompt, modelo, parametros, entradas)
+        resposta = self.obter(nome, chave)
+        if resposta is None:
+            resposta = gerar()
+            self.guardar(nome, chave, resposta)
+        return resposta
+
+    def estatisticas(self):
+        with self._lock:
+            conexao = self.conexao()
+            contadores = {
+                nome: {"acertos": acertos, "falhas": falhas}
+                for nome, acertos, falhas in conexao.execute("SELECT nome, acertos, falhas FROM estatisticas")
+            }
+            for nome, entradas, tamanho in conexao.execute("SELECT nome, COUNT(*), SUM(tamanho) FROM respostas GROUP BY nome"):
+                contadores.setdefault(nome, {"acertos": 0, "falhas": 0}).update(entradas=entradas, bytes=tamanho)
+        return contadores
+
+
+respostas = CacheLLM()
+
+
+if __name__ == "__main__":
+    for nome, valores in respostas.estatisticas().items():
+        consultas = valores["acertos"] + valores["falhas"]
+        taxa = valores["acertos"] / consultas if consultas else 0
+        print(f"{nome}: {valores['acertos']} acertos, {valores['falhas']} falhas ({taxa:.0%}), "
+              f"{valores.get('entradas', 0)} respostas, {valores.get('bytes', 0) or 0} bytes")
@@ -0,0 +1,58 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from email.utils import formatdate
+
+
+class RespostaJSON:
+    __slots__ = ("corpo", "etag", "ultima_modificacao")
+
+    def __init__(self, corpo, ultima_modificacao):
+        self.corpo = corpo
+        self.etag = '"' + hashlib.blake2b(corpo, digest_size=16).hexdigest() + '"'
+        self.ultima_modificacao = formatdate(ultima_modificacao, usegmt=True)
+
+    def corresponde(self, if_none_match):
+        # If-None-Match pode trazer vários ETags separados por vírgula, fracos (W/) ou "*"
+        if not if_none_match:
+            return False
+        etags = [etag.strip().removeprefix("W/") for etag in if_none_match.split(",")]
+        return "*" in etags or self.etag in etags
+
+
+class CacheRespostas:
+    """
+    Cache LRU de respostas já serializadas em JSON.
+
+    As chaves incluem a versão dos dados, então uma atualização do conjunto nunca
+    devolve uma resposta antiga; `limpar()` apenas libera a memória das versões anteriores.
+    """
+
+    def __init__(self, tamanho_maximo=1024):
+        self.tamanho_maximo = tamanho_maximo
+        self._respostas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            resposta = self._respostas.get(chave)
+            if resposta is not None:
+                self._respostas.move_to_end(chave)
+            return resposta
+
+    def guardar(self, chave, corpo, ultima_modificacao):
+        resposta = RespostaJSON(corpo, ultima_modificacao)
+        with self._lock:
+            self._respostas[chave] = resposta
+            self._respostas.move_to_end(chave)
+            while len(self._respostas) > self.tamanho_maximo:
+                self._respostas.popitem(last=False)
+        return resposta
+
+    def limpar(self):
+        with self._lock:
+            self._respostas.clear()
+
+
+# Cache das consultas por CNPJ dos endpoints /dataset/*
+respostas = CacheRespostas()
@@ -0,0 +1,114 @@
+import os
+import random
+import asyncio
+import openai
+from openai import AsyncOpenAI
+
+
+MODELO = "gpt-3.5-turbo"
+
+# Chamadas simultâneas à OpenAI por processo; as demais esperam na fila sem bloquear o event loop
+LIMITE_CONCORRENCIA = int(os.getenv("OPENAI_CONCORRENCIA", "64"))
+
+# Tempo máximo de cada tentativa, em segundos
+TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+
+TENTATIVAS = int(os.getenv("OPENAI_TENTATIVAS", "3"))
+BACKOFF_INICIAL = 0.5
+BACKOFF_MAXIMO = 8
+
+# Falhas que costumam passar sozinhas; erros de requisição (400, 401...) não são repetidos
+ERROS_TEMPORARIOS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    asyncio.TimeoutError,
+)
+
+
+def tempo_espera(tentativa, erro=None):
+    # Respeita o Retry-After do 429; senão, backoff exponencial com jitter
+    resposta = getattr(erro, "response", None)
+    if resposta is not None:
+        try:
+            return min(float(resposta.headers.get("retry-after")), BACKOFF_MAXIMO)
+        except (TypeError, ValueError):
+            pass
+    return min(BACKOFF_INICIAL * 2 ** tentativa, BACKOFF_MAXIMO) * (0.5 + random.random() / 2)
+
+
+def texto_chunk(chunk):
+    # Trecho de texto de um chunk de streaming (chunks de controle não trazem conteúdo)
+    if chunk.choices and chunk.choices[0].delta.content:
+        return chunk.choices[0].delta.content
+    return ""
+
+
+def textos_stream(stream):
+    """
+    Gera os trechos de texto de um stream síncrono da OpenAI (ex.: para st.write_stream).
+    """
+    for chunk in stream:
+        texto = texto_chunk(chunk)
+        if texto:
+            yield texto
+
+
+class ClienteLLM:
+    """
+    Cliente assíncrono da OpenAI com limite de concorrência, timeout por tentativa e
+    novas tentativas com backoff. `base_url` (ou OPENAI_BASE_URL) permite apontar
+    para qualquer servidor compatível, inclusive um mock local.
+    """
+
+    def __init__(self, api_key=None, base_url=None, limite=LIMITE_CONCORRENCIA, timeout=TIMEOUT, tentativas=TENTATIVAS):
+        # As novas tentativas são feitas aqui, não dentro do cliente da OpenAI
+        self.cliente = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+        self.semaforo = asyncio.Semaphore(limite)
+        self.timeout = timeout
+        self.tentativas = tentativas
+
+    async def completar(self, messages, modelo=MODELO, **parametros):
+        """
+        Chama chat.completions.create e devolve a resposta completa.
+
+        Raises:
+            asyncio.TimeoutError: Se todas as tentativas estourarem o timeout.
+            openai.OpenAIError: Erros não temporários ou a última falha temporária.
+        """
+        async with self.semaforo:
+            return await self._com_tentativas(model=modelo, messages=messages, **parametros)
+
+    async def transmitir(self, messages, modelo=MODELO, **parametros):
+        """
+        Gera os trechos de texto da resposta à medida que chegam.
+
+        Só há novas tentativas até o stream abrir; depois do primeiro trecho, uma falha
+        é repassada a quem consome. O timeout vale para a espera de cada trecho.
+        """
+        async with self.semaforo:
+            stream = await self._com_tentativas(model=modelo, messages=messages, stream=True, **parametros)
+            chunks = stream.__aiter__()
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                    except StopAsyncIteration:
+                        break
+                    texto = texto_chunk(chunk)
+                    if texto:
+                        yield texto
+            finally:
+                await stream.close()
+
+    async def _com_tentativas(self, **parametros):
+        for tentativa in range(self.tentativas):
+            try:
+                return await asyncio.wait_for(self.cliente.chat.completions.create(**parametros), self.timeout)
+            except ERROS_TEMPORARIOS as e:
+                if tentativa == self.tentativas - 1:
+                    raise
+                espera = tempo_espera(tentativa, e)
+                print(f"Falha temporária na OpenAI ({type(e).__name__}), nova tentativa em {espera:.1f}s")
+                await asyncio.sleep(espera)
@@ -0,0 +1,163 @@
+import os
+import time
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import registro_dados
+
+
+CAMINHO_COTACOES = os.path.join(registro_dados.PASTA_DADOS, "cotacoes.sqlite3")
+
+# Idade máxima, em segundos, de uma cotação antes de ser atualizada em segundo plano
+VALIDADE = int(os.getenv("COTACOES_VALIDADE", str(4 * 3600)))
+
+# Tickers por chamada ao provedor
+LOTE = 100
+
+
+def fechamentos_yfinance(tickers):
+    """
+    Provedor padrão: último fechamento conhecido de cada ticker na B3, pelo Yahoo Finance.
+
+    Args:
+        tickers (list): Tickers sem o sufixo ".SA".
+
+    Returns:
+        dict: {ticker: preço}. Tickers sem cotação ficam de fora.
+    """
+    import yfinance as yf
+
+    # Alguns dias de histórico para que feriados e fins de semana ainda tenham um último fechamento
+    fechamentos = yf.download([f"{ticker}.SA" for ticker in tickers], period="5d", progress=False)["Close"]
+    if isinstance(fechamentos, pd.Series):
+        fechamentos = fechamentos.to_frame(f"{tickers[0]}.SA")
+    ultimos = fechamentos.ffill().iloc[-1].dropna()
+    return {coluna.removesuffix(".SA"): float(preco) for coluna, preco in ultimos.items()}
+
+
+class BaseCotacoes:
+    """
+    Último preço de fechamento por ticker, com a hora em que foi obtido.
+
+    As leituras vêm da memória; o SQLite só guarda os preços entre execuções. Cotações
+    vencidas são atualizadas em lotes por uma tarefa em segundo plano, e quem lê recebe o
+    último preço conhecido sem esperar. `fornecedor(tickers) -> {ticker: preço}` é a fonte
+    dos preços e pode ser trocado (por exemplo, por uma fonte falsa).
+    """
+
+    def __init__(self, fornecedor=fechamentos_yfinance, caminho=CAMINHO_COTACOES, validade=VALIDADE, lote=LOTE):
+        self.fornecedor = fornecedor
+        self.caminho = caminho
+        self.validade = validade
+        self.lote = lote
+        self._lock = threading.Lock()
+        self._conexao = None
+        self._precos = None
+        # Muda a cada atualização gravada; entra na chave de quem guarda resultados que dependem dos preços
+        self.versao = 0
+        self._em_atualizacao = set()
+        # Última tentativa por ticker, para não buscar a cada leitura quem o provedor não cota
+        self._tentativas = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cotacoes")
+
+    def conexao(self):
+        if self._conexao is None:
+            os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+            conexao = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False, isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("CREATE TABLE IF NOT EXISTS cotacoes (ticker TEXT PRIMARY KEY, preco REAL, atualizado_em REAL)")
+            self._conexao = conexao
+        return self._conexao
+
+    def _carregar(self):
+        # Chamado com o lock: os preços guardados só são lidos do disco uma vez
+        if self._precos is None:
+            self._precos = {
+                ticker: (preco, atualizado_em)
+                for ticker, preco, atualizado_em in self.conexao().execute("SELECT ticker, preco, atualizado_em FROM cotacoes")
+            }
+        return self._precos
+
+    def atualizar(self, tickers):
+        """
+        Busca no provedor as cotações de `tickers`, em lotes. Um lote que falha não impede os
+        outros; os tickers dele mantêm o preço anterior.
+
+        Returns:
+            int: Quantidade de cotações atualizadas.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        atualizadas = 0
+        for inicio in range(0, len(tickers), self.lote):
+            lote = tickers[inicio:inicio + self.lote]
+            with self._lock:
+                self._tentativas.update(dict.fromkeys(lote, time.time()))
+            try:
+                precos = self.fornecedor(lote)
+            except Exception as e:
+                print(f"Erro ao atualizar {len(lote)} cotações: {e}")
+                continue
+
+            agora = time.time()
+            linhas = [(ticker, float(preco), agora) for ticker, preco in precos.items() if pd.notna(preco)]
+            with self._lock:
+                self.conexao().executemany("INSERT OR REPLACE INTO cotacoes VALUES (?, ?, ?)", linhas)
+                self._carregar().update({ticker: (preco, atualizado_em) for ticker, preco, atualizado_em in linhas})
+                if linhas:
+                    self.versao += 1
+            atualizadas += len(linhas)
+        return atualizadas
+
+    def _atualizar_em_segundo_plano(self, tickers):
+        try:
+            self.atualizar(tickers)
+        finally:
+            with self._lock:
+                self._em_atualizacao.difference_update(tickers)
+
+    def precos(self, tickers, aguardar_ausentes=True):
+        """
+        Últimos preços conhecidos de `tickers`.
+
+        Tickers com cotação vencida são agendados para atualização em segundo plano. Os que
+        nunca foram buscados são buscados na hora quando `aguardar_ausentes` é True.
+
+        Returns:
+            pd.Series: Preços indexados pelo ticker; tickers sem cotação ficam de fora.
+        """
+        tickers = list(dict.fromkeys(str(ticker).upper() for ticker in tickers))
+        limite = time.time() - self.validade
+        ausentes, vencidos = [], []
+        with self._lock:
+            precos = self._carregar()
+            for ticker in tickers:
+                if ticker in self._em_atualizacao:
+                    continue
+                # Uma tentativa recente que falhou também conta, para não repetir a busca a cada leitura
+                ultima = max(precos[ticker][1] if ticker in precos else float("-inf"), self._tentativas.get(ticker, float("-inf")))
+                if ultima == float("-inf"):
+                    ausentes.append(ticker)
+                elif ultima < limite:
+                    vencidos.append(ticker)
+            self._em_atualizacao.update(vencidos)
+
+        if vencidos:
+            self._executor.submit(self._atualizar_em_segundo_plano, vencidos)
+        if ausentes and aguardar_ausentes:
+            self.atualizar(ausentes)
+
+        with self._lock:
+            precos = self._carregar()
+            return pd.Series({ticker: precos[ticker][0] for ticker in tickers if ticker in precos}, dtype="float64")
+
+
+base = BaseCotacoes()
+
+
+if __name__ == "__main__":
+    import tabela_scores
+
+    tickers = tabela_scores.carregar_tickers()["TICKER"].dropna().str.upper().unique().tolist()
+    inicio = time.perf_counter()
+    print(f"{base.atualizar(tickers)} de {len(tickers)} cotações atualizadas em {time.perf_counter() - inicio:.1f}s")
@@ -0,0 +1,129 @@
+import os
+import time
+import base64
+import hashlib
+import tempfile
+import threading
+from urllib.parse import urlsplit, urlunsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36'
+}
+
+TIMEOUT = 30
+TAMANHO_BLOCO = 64 * 1024
+
+# O FNET (B3) às vezes devolve o PDF codificado em base64 ("%PDF" vira "JVBERi")
+PDF = b"%PDF"
+PDF_BASE64 = b"JVBERi"
+
+_sessao = None
+_lock = threading.Lock()
+
+
+def sessao_http():
+    """
+    Sessão compartilhada: reaproveita conexões entre downloads e repete falhas temporárias.
+    """
+    global _sessao
+    if _sessao is None:
+        with _lock:
+            if _sessao is None:
+                sessao = requests.Session()
+                sessao.headers.update(HEADERS)
+                tentativas = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET", "HEAD"))
+                adaptador = HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=tentativas)
+                sessao.mount("https://", adaptador)
+                sessao.mount("http://", adaptador)
+                _sessao = sessao
+    return _sessao
+
+
+def resolver_url(url):
+    # Links do FNET apontam para o visualizador; o arquivo em si vem de downloadDocumento
+    partes = urlsplit(url)
+    if "fnet" in partes.netloc and partes.path.endswith("/exibirDocumento"):
+        partes = partes._replace(path=partes.path.replace("/exibirDocumento", "/downloadDocumento"))
+    return urlunsplit(partes)
+
+
+def nome_arquivo(url):
+    return f"relatorio_{hashlib.sha1(url.encode()).hexdigest()[:12]}.pdf"
+
+
+def baixar_pdf(url, diretorio_download, sessao=None):
+    """
+    Baixa o relatório direto por HTTP, em blocos, seguindo redirecionamentos.
+
+    O arquivo é gravado em um temporário e só aparece na pasta depois de validado,
+    então a conclusão do download é o retorno desta função.
+
+    Returns:
+        str: Caminho do PDF baixado.
+
+    Raises:
+        ValueError: Se a resposta não for um PDF.
+        requests.RequestException: Falhas de rede ou status de erro.
+    """
+    sessao = sessao or sessao_http()
+    url = resolver_url(url)
+    os.makedirs(diretorio_download, exist_ok=True)
+
+    with sessao.get(url, stream=True, timeout=TIMEOUT, allow_redirects=True) as response:
+        response.raise_for_status()
+        # O Content-Type nem sempre é confiável (o FNET usa text/html para o PDF em base64);
+        # a decisão final é pelos primeiros bytes do conteúdo
+        tipo = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if tipo.startswith(("image/", "video/", "audio/")):
+            raise ValueError(f"Content-Type inesperado para PDF: {tipo}")
+
+        descritor, temporario = tempfile.mkstemp(suffix=".tmp", dir=diretorio_download)
+        try:
+            with os.fdopen(descritor, "wb") as arquivo:
+                for bloco in response.iter_content(chunk_size=TAMANHO_BLOCO):
+                    arquivo.write(bloco)
+
+            with open(temporario, "rb") as arquivo:
+                inicio = arquivo.read(len(PDF_BASE64)).lstrip()
+
+            if inicio.startswith(PDF_BASE64):
+                with open(temporario, "rb") as arquivo:
+                    conteudo = base64.b64decode(arquivo.read())
+                with open(temporario, "wb") as arquivo:
+                    arquivo.write(conteudo)
+            elif not inicio.startswith(PDF):
+                raise ValueError(f"Resposta de {response.url} não é um PDF (Content-Type: {tipo or 'ausente'})")
+
+            destino = os.path.join(diretorio_download, nome_arquivo(response.url))
+            os.replace(temporario, destino)
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+
+    print(f"Relatório baixado em {destino}")
+    return destino
+
+
+def aguardar_download(diretorio_download, existentes, timeout=60, intervalo=0.2):
+    """
+    Espera o navegador concluir um download: um novo PDF na pasta e nenhum arquivo parcial.
+
+    Returns:
+        str: Caminho do PDF baixado.
+
+    Raises:
+        TimeoutError: Se nada terminar de baixar dentro do prazo.
+    """
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        arquivos = set(os.listdir(diretorio_download))
+        parciais = [arquivo for arquivo in arquivos if arquivo.endswith((".crdownload", ".tmp"))]
+        novos = [arquivo for arquivo in arquivos - existentes if arquivo.lower().endswith(".pdf")]
+        if novos and not parciais:
+            return os.path.join(diretorio_download, novos[0])
+        time.sleep(intervalo)
+    raise TimeoutError(f"Download não concluído em {timeout}s em {diretorio_download}")
@@ -0,0 +1,105 @@
+import os
+import math
+import threading
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+from PyPDF2 import PdfReader
+
+
+CPUS = os.cpu_count() or 1
+
+# Processos do pool de extração, compartilhado por todo o processo; pode ser ajustado pela
+# variável de ambiente EXTRACAO_TRABALHADORES
+TRABALHADORES = int(os.getenv("EXTRACAO_TRABALHADORES", "0")) or CPUS
+
+# Menor lote entregue a um processo; abaixo disso abrir o arquivo de novo custa mais que ler as páginas
+PAGINAS_POR_LOTE = 8
+
+# PDFs com menos páginas que isso são lidos no próprio processo (em máquinas com uma só CPU,
+# todos são: os processos disputariam o mesmo núcleo e só somariam o custo de criá-los)
+MINIMO_PAGINAS_PARALELO = int(os.getenv("EXTRACAO_MINIMO_PAGINAS", "24"))
+
+# Páginas com menos caracteres que isso (ex.: só o número da página) são descartadas
+MINIMO_CARACTERES = 20
+
+
+def _objeto(valor):
+    return valor.get_object() if hasattr(valor, "get_object") else valor
+
+
+def pagina_sem_texto(page):
+    """
+    Heurística barata, sem extrair o texto: uma página sem fontes, cujos XObjects são
+    todos imagens (ou que não tem nenhum), não tem texto extraível.
+    """
+    recursos = _objeto(page.get("/Resources")) or {}
+    if recursos.get("/Font"):
+        return False
+
+    xobjects = _objeto(recursos.get("/XObject")) or {}
+    # Formulários (Form XObjects) podem ter fontes próprias, então a página é lida normalmente
+    return all(_objeto(xobject).get("/Subtype") == "/Image" for xobject in xobjects.values())
+
+
+def _textos(paginas):
+    for page in paginas:
+        if pagina_sem_texto(page):
+            continue
+        texto = page.extract_text() or ""
+        if len(texto.strip()) >= MINIMO_CARACTERES:
+            yield texto
+
+
+def _extrair_intervalo(caminho, inicio, fim):
+    # Roda nos processos do pool: cada um abre o arquivo e lê só as suas páginas
+    return list(_textos(PdfReader(caminho).pages[inicio:fim]))
+
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def pool(trabalhadores=TRABALHADORES):
+    """
+    Pool de processos compartilhado pelas extrações de todas as threads (como as do preparo
+    de relatórios), para que o total de processos não passe de `trabalhadores`.
+
+    Os processos são criados com "spawn": o app roda várias threads, e um fork copiaria
+    locks que estivessem presos por elas naquele instante.
+    """
+    with _lock:
+        if trabalhadores not in _pools:
+            _pools[trabalhadores] = ProcessPoolExecutor(max_workers=trabalhadores, mp_context=get_context("spawn"))
+        return _pools[trabalhadores]
+
+
+def usar_pool(total, trabalhadores):
+    return CPUS > 1 and trabalhadores > 1 and total >= MINIMO_PAGINAS_PARALELO
+
+
+def extrair_paginas(caminho, trabalhadores=None):
+    """
+    Gera o texto das páginas do PDF, em ordem, à medida que são extraídas.
+
+    PDFs grandes são divididos em um lote por processo do pool compartilhado, para que cada
+    processo abra o arquivo uma única vez; PDFs pequenos, ou máquinas com uma só CPU, são
+    lidos aqui mesmo. Páginas vazias ou só com imagens não aparecem no resultado. Quem
+    consome pode começar a trabalhar (ex.: resumir) antes de o arquivo inteiro ser lido.
+
+    Args:
+        caminho (str): Arquivo PDF.
+        trabalhadores (int): Tamanho do pool. None usa TRABALHADORES; 1 lê sem processos.
+    """
+    trabalhadores = trabalhadores or TRABALHADORES
+    reader = PdfReader(caminho)
+    total = len(reader.pages)
+
+    if not usar_pool(total, trabalhadores):
+        yield from _textos(reader.pages)
+        return
+
+    tamanho = max(PAGINAS_POR_LOTE, math.ceil(total / trabalhadores))
+    lotes = [(caminho, inicio, min(inicio + tamanho, total)) for inicio in range(0, total, tamanho)]
+    # map devolve os lotes na ordem das páginas, cada um assim que fica pronto
+    for textos in pool(trabalhadores).map(_extrair_intervalo, *zip(*lotes)):
+        yield from textos
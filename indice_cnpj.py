@@ -0,0 +1,238 @@
+import os
+import glob
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import ingestao
+import registro_dados
+
+
+# Arquivos Arrow (IPC) sem compressão, mapeados em memória por todos os workers da API
+PASTA_MAPAS = os.path.join(registro_dados.PASTA_COLUNAR, "mapas")
+
+
+def normalizar_cnpj(cnpjs):
+    # "00.332.266/0001-31" -> 332266000131
+    return pd.Series(cnpjs).astype(str).str.replace(r"\D", "", regex=True).astype("int64").to_numpy()
+
+
+def caminho_mapa(conjunto, versao):
+    return os.path.join(PASTA_MAPAS, f"{conjunto}-{versao}.arrow")
+
+
+def caminho_mapa_indice(conjunto, versao):
+    return os.path.join(PASTA_MAPAS, f"{conjunto}-{versao}.indice.arrow")
+
+
+def gravar_arrow(tabela, caminho):
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with pa.OSFile(temporario, "wb") as arquivo:
+        with pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    os.replace(temporario, caminho)
+
+
+def ler_arrow_mapeado(caminho):
+    # Os buffers apontam para o arquivo mapeado: nada é copiado para a memória do processo
+    with pa.memory_map(caminho, "r") as origem:
+        return pa.ipc.open_file(origem).read_all()
+
+
+def tipo_comum(tipos):
+    # Mesmo tipo, tipos compatíveis (ex.: int e double) ou, em último caso, texto
+    tipos = list(dict.fromkeys(tipos))
+    if len(tipos) == 1:
+        return tipos[0]
+    try:
+        return pa.unify_schemas([pa.schema([("coluna", tipo)]) for tipo in tipos], promote_options="permissive").field("coluna").type
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        return pa.string()
+
+
+def converter_coluna(coluna, tipo):
+    # Códigos lidos como float em algum ano (ex.: CNPJ_Administrador) viram texto sem notação científica
+    if pa.types.is_string(tipo) and pa.types.is_floating(coluna.type):
+        try:
+            coluna = coluna.cast(pa.int64())
+        except pa.ArrowInvalid:
+            pass
+    return coluna.cast(tipo)
+
+
+def montar_mapa(conjunto, versao, manifesto):
+    """
+    Junta as partições de um conjunto em um único arquivo Arrow ordenado por CNPJ, para que
+    as linhas de cada fundo fiquem contíguas, e grava ao lado o índice CNPJ -> [inicio, fim).
+    """
+    partes = [pq.read_table(arquivo) for arquivo in ingestao.arquivos_conjunto(conjunto, manifesto=manifesto)]
+    if not partes:
+        raise FileNotFoundError(f"Nenhuma partição encontrada para o conjunto {conjunto}")
+
+    # Os dicionários das colunas categóricas mudam entre os anos; no arquivo único ficam como texto
+    partes = [
+        pa.table(
+            [coluna.cast(coluna.type.value_type) if pa.types.is_dictionary(coluna.type) else coluna for coluna in parte.columns],
+            names=parte.column_names,
+        )
+        for parte in partes
+    ]
+    esquema = pa.schema([
+        (nome, tipo_comum([parte.schema.field(nome).type for parte in partes if nome in parte.column_names]))
+        for nome in dict.fromkeys(nome for parte in partes for nome in parte.column_names)
+    ])
+    partes = [
+        pa.table([converter_coluna(parte.column(campo.name), campo.type) if campo.name in parte.column_names else pa.nulls(len(parte), campo.type) for campo in esquema], schema=esquema)
+        for parte in partes
+    ]
+    tabela = pa.concat_tables(partes)
+
+    # A normalização é feita apenas sobre os CNPJs distintos, não sobre cada linha
+    codificado = pc.dictionary_encode(tabela.column("CNPJ_Fundo")).combine_chunks()
+    codigos = pc.fill_null(codificado.indices, -1).to_numpy()
+    cnpjs_distintos = normalizar_cnpj(codificado.dictionary.to_pylist())
+    cnpjs = np.where(codigos >= 0, cnpjs_distintos[codigos], -1)
+
+    ordem = np.argsort(cnpjs, kind="stable")
+    chaves, inicios = np.unique(cnpjs[ordem], return_index=True)
+    fins = np.append(inicios[1:], len(ordem))
+
+    gravar_arrow(tabela.take(ordem).combine_chunks(), caminho_mapa(conjunto, versao))
+    gravar_arrow(
+        pa.table({"chave": chaves, "inicio": inicios.astype(np.int64), "fim": fins.astype(np.int64)}),
+        caminho_mapa_indice(conjunto, versao),
+    )
+
+
+def garantir_mapa(conjunto, versao, manifesto):
+    # O primeiro worker monta o arquivo; os demais esperam o bloqueio e apenas o mapeiam
+    if os.path.exists(caminho_mapa_indice(conjunto, versao)):
+        return
+
+    os.makedirs(PASTA_MAPAS, exist_ok=True)
+    with registro_dados.bloqueio(os.path.join(PASTA_MAPAS, f"{conjunto}.lock"), espera=300):
+        if not os.path.exists(caminho_mapa_indice(conjunto, versao)):
+            print(f"Montando mapa de {conjunto} na versão {versao}...")
+            montar_mapa(conjunto, versao, manifesto)
+            coletar_mapas(conjunto, versao)
+
+
+def coletar_mapas(conjunto, versao):
+    # Workers que ainda mapeiam a versão antiga seguem lendo normalmente (o SO mantém as páginas)
+    atuais = {caminho_mapa(conjunto, versao), caminho_mapa_indice(conjunto, versao)}
+    for caminho in glob.glob(os.path.join(PASTA_MAPAS, f"{conjunto}-*.arrow")):
+        if caminho not in atuais:
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+
+class IndiceCNPJ:
+    """
+    Índice CNPJ normalizado -> linhas de um conjunto.
+
+    A tabela está ordenada por CNPJ, então as linhas de cada fundo são o intervalo
+    [inicio, fim) encontrado por um searchsorted sobre os CNPJs únicos. Tabela e índice
+    são mapeados do disco e compartilhados entre os processos; a busca só converte
+    para pandas as poucas linhas do fundo.
+    """
+
+    def __init__(self, tabela, chaves, inicios, fins, versao=None, ultima_modificacao=0):
+        self.tabela = tabela
+        self.chaves = chaves
+        self.inicios = inicios
+        self.fins = fins
+        self.versao = versao
+        self.ultima_modificacao = ultima_modificacao
+
+    @classmethod
+    def mapear(cls, conjunto, versao, ultima_modificacao=0):
+        tabela = ler_arrow_mapeado(caminho_mapa(conjunto, versao))
+        indice = ler_arrow_mapeado(caminho_mapa_indice(conjunto, versao)).combine_chunks()
+        chaves, inicios, fins = (indice.column(nome).chunk(0).to_numpy() for nome in ("chave", "inicio", "fim"))
+        return cls(tabela, chaves, inicios, fins, versao, ultima_modificacao)
+
+    def intervalo(self, cnpj):
+        i = np.searchsorted(self.chaves, cnpj)
+        if i == len(self.chaves) or self.chaves[i] != cnpj:
+            return None
+        return int(self.inicios[i]), int(self.fins[i])
+
+    def buscar(self, cnpj):
+        inicio, fim = self.intervalo(cnpj) or (0, 0)
+        return self.tabela.slice(inicio, fim - inicio).to_pandas()
+
+
+def criar_indice(conjunto, manifesto=None):
+    # Tabela, versão e data vêm do mesmo manifesto, mesmo que outro processo publique no meio
+    if manifesto is None:
+        ingestao.ingerir([conjunto])
+        manifesto = registro_dados.ler_manifesto()
+
+    versao = ingestao.versao_conjunto(conjunto, manifesto)
+    garantir_mapa(conjunto, versao, manifesto)
+    return IndiceCNPJ.mapear(conjunto, versao, ingestao.ultima_modificacao_conjunto(conjunto, manifesto))
+
+
+# Índices compartilhados pelo processo, um por conjunto. O dicionário nunca é alterado,
+# só substituído, para que uma recarga troque todos os índices de uma vez.
+_indices = {}
+_lock = threading.Lock()
+
+
+def obter_indice(conjunto):
+    indice = _indices.get(conjunto)
+    if indice is None:
+        with _lock:
+            indice = _indices.get(conjunto)
+            if indice is None:
+                indice = criar_indice(conjunto)
+                _trocar({conjunto: indice})
+    return indice
+
+
+def _trocar(novos):
+    global _indices
+    _indices = {**_indices, **novos}
+
+
+def construir_indices(conjuntos=ingestao.CONJUNTOS):
+    for conjunto in conjuntos:
+        obter_indice(conjunto)
+
+
+def construir_mapas(conjuntos=ingestao.CONJUNTOS):
+    """
+    Monta os arquivos mapeados da versão publicada, para que os workers da API subam sem montar nada.
+    """
+    manifesto = registro_dados.ler_manifesto()
+    for conjunto in conjuntos:
+        garantir_mapa(conjunto, ingestao.versao_conjunto(conjunto, manifesto), manifesto)
+
+
+def recarregar_indices(conjuntos=None):
+    """
+    Reconstrói os índices já carregados (ex.: após atualizar os dados) e troca todos de uma vez.
+    Conjuntos cuja versão não mudou mantêm o índice atual.
+
+    Returns:
+        list: Conjuntos cujo índice foi reconstruído.
+    """
+    manifesto = registro_dados.ler_manifesto()
+    if conjuntos is None:
+        conjuntos = list(_indices)
+    alterados = [
+        conjunto for conjunto in conjuntos
+        if conjunto not in _indices or _indices[conjunto].versao != ingestao.versao_conjunto(conjunto, manifesto)
+    ]
+    novos = {conjunto: criar_indice(conjunto, manifesto) for conjunto in alterados}
+    with _lock:
+        _trocar(novos)
+    return alterados
+
+
+def versoes_carregadas():
+    return {conjunto: indice.versao for conjunto, indice in _indices.items()}
@@ -0,0 +1,333 @@
+import os
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import pandas as pd
+import registro_dados
+from registro_dados import PASTA_DADOS, PASTA_COLUNAR
+
+# Conjuntos mensais disponibilizados pela CVM para cada ano
+CONJUNTOS = ("ativo_passivo", "complemento", "geral")
+
+# Processos usados na conversão; pode ser ajustado pela variável de ambiente INGESTAO_TRABALHADORES
+TRABALHADORES = int(os.getenv("INGESTAO_TRABALHADORES", "0")) or os.cpu_count() or 1
+
+# Colunas de data presentes nos CSVs da CVM
+COLUNAS_DATA = [
+    "Data_Referencia",
+    "Data_Entrega",
+    "Data_Informacao_Numero_Cotistas",
+    "Data_Funcionamento",
+    "Data_Prazo_Duracao",
+]
+
+# Formatos aceitos em cada coluna de data, tentados em ordem. O padrão da CVM é ISO, mas
+# alguns arquivos (ex.: complemento 2022) trazem DD/MM/AAAA
+FORMATOS_DATA = {coluna: ["%Y-%m-%d", "%d/%m/%Y"] for coluna in COLUNAS_DATA}
+
+# Colunas sem as quais a linha some de todo agrupamento por período: um CSV com valores
+# que nenhum formato lê é recusado em vez de publicado com datas vazias
+COLUNAS_DATA_OBRIGATORIAS = ["Data_Referencia"]
+
+# Muda sempre que a leitura dos CSVs muda: entra na assinatura da origem e refaz as partições
+VERSAO_LEITURA = 2
+
+# Valores que não casam com nenhum formato guardados como exemplo no relatório de validação
+EXEMPLOS_INVALIDOS = 5
+
+# Conjuntos em que, fora o CNPJ e as datas, todas as colunas são numéricas
+CONJUNTOS_NUMERICOS = ("ativo_passivo", "complemento")
+
+
+def caminho_csv(conjunto, ano):
+    return os.path.join(PASTA_DADOS, f"inf_mensal_fii_{ano}", f"inf_mensal_fii_{conjunto}_{ano}.csv")
+
+
+def anos_disponiveis(manifesto=None):
+    """
+    Anos com dados disponíveis, seja como pasta de CSVs da CVM ou como partição já publicada.
+    """
+    manifesto = manifesto or registro_dados.ler_manifesto()
+    anos = set()
+    for pasta in glob.glob(os.path.join(PASTA_DADOS, "inf_mensal_fii_*")):
+        sufixo = os.path.basename(pasta).rsplit("_", 1)[-1]
+        if os.path.isdir(pasta) and sufixo.isdigit():
+            anos.add(int(sufixo))
+
+    for conjunto in manifesto["conjuntos"]:
+        anos.update(registro_dados.anos_conjunto(conjunto, manifesto))
+
+    return sorted(anos)
+
+
+def converter_numerico(serie):
+    # Alguns arquivos (ex.: complemento 2022) trazem valores como "1,00E-06" ou "1.324.416";
+    # a vírgula decimal é convertida e o que continuar ambíguo vira NaN
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie
+    return pd.to_numeric(serie.str.replace(",", ".", regex=False), errors="coerce")
+
+
+def converter_datas(serie, formatos):
+    """
+    Converte uma coluna de datas testando cada formato explícito nas linhas que ainda
+    não foram convertidas, sem a inferência elemento a elemento do format="mixed".
+
+    Returns:
+        tuple: (datas em datetime64, máscara das linhas preenchidas que nenhum formato leu)
+    """
+    texto = serie.astype("string").str.strip().replace("", pd.NA)
+    datas = pd.Series(pd.NaT, index=serie.index, dtype="datetime64[us]")
+    for formato in formatos:
+        pendentes = datas.isna() & texto.notna()
+        if not pendentes.any():
+            break
+        datas[pendentes] = pd.to_datetime(texto[pendentes], format=formato, errors="coerce")
+    return datas, (texto.notna() & datas.isna()).to_numpy()
+
+
+def ler_csv_cvm(caminho, conjunto):
+    """
+    Lê um CSV da CVM com os tipos finais: números, datas em datetime64 e texto em categorias.
+
+    Returns:
+        tuple: (DataFrame, relatório {coluna: {"linhas": n, "exemplos": [...]}} das datas inválidas)
+
+    Raises:
+        ValueError: Alguma coluna de COLUNAS_DATA_OBRIGATORIAS com valor em formato desconhecido.
+    """
+    df = pd.read_csv(caminho, delimiter=";", encoding="ISO-8859-1", dtype={coluna: str for coluna in COLUNAS_DATA})
+
+    if conjunto in CONJUNTOS_NUMERICOS:
+        for coluna in df.columns:
+            if coluna != "CNPJ_Fundo" and coluna not in COLUNAS_DATA:
+                df[coluna] = converter_numerico(df[coluna])
+
+    # Datas convertidas só aqui; quem lê as partições já recebe datetime64
+    datas_invalidas = {}
+    for coluna in COLUNAS_DATA:
+        if coluna in df.columns:
+            datas, invalidas = converter_datas(df[coluna], FORMATOS_DATA[coluna])
+            if invalidas.any():
+                datas_invalidas[coluna] = {
+                    "linhas": int(invalidas.sum()),
+                    "exemplos": df[coluna][invalidas].drop_duplicates().head(EXEMPLOS_INVALIDOS).tolist(),
+                }
+            df[coluna] = datas
+
+    for coluna in COLUNAS_DATA_OBRIGATORIAS:
+        if coluna in datas_invalidas:
+            invalidas = datas_invalidas[coluna]
+            raise ValueError(
+                f"{caminho}: {invalidas['linhas']} valores de {coluna} em formato desconhecido "
+                f"(ex.: {', '.join(map(str, invalidas['exemplos']))}); inclua o formato em FORMATOS_DATA"
+            )
+
+    # Colunas de texto (CNPJ, segmento, administrador...) se repetem muito entre os meses
+    for coluna in df.columns:
+        if coluna not in COLUNAS_DATA and pd.api.types.is_string_dtype(df[coluna]):
+            df[coluna] = df[coluna].astype("category")
+
+    return df, datas_invalidas
+
+
+def assinatura_csv(caminho):
+    info = os.stat(caminho)
+    return [info.st_mtime_ns, info.st_size, VERSAO_LEITURA]
+
+
+def particao_desatualizada(conjunto, ano, manifesto=None):
+    origem = caminho_csv(conjunto, ano)
+    if not os.path.exists(origem):
+        return False
+
+    particao = registro_dados.particao(conjunto, ano, manifesto)
+    if particao is None or not os.path.exists(registro_dados.caminho_particao(conjunto, ano, manifesto)):
+        return True
+    return particao["origem"] != assinatura_csv(origem)
+
+
+def converter_para_parquet(conjunto, ano):
+    """
+    Converte um CSV da CVM em sua partição Parquet. Roda tanto no processo principal
+    quanto nos processos do pool de ingestão.
+
+    O arquivo leva o hash do conteúdo no nome e nunca é sobrescrito; a partição só passa
+    a ser lida depois que o manifesto é publicado.
+
+    Returns:
+        dict: Partição gerada, hash, número de linhas, datas inválidas e tempo gasto.
+    """
+    inicio = time.perf_counter()
+    origem = caminho_csv(conjunto, ano)
+    assinatura = assinatura_csv(origem)
+    pasta = os.path.join(PASTA_COLUNAR, conjunto)
+    os.makedirs(pasta, exist_ok=True)
+
+    df, datas_invalidas = ler_csv_cvm(origem, conjunto)
+
+    temporario = os.path.join(pasta, f"{conjunto}_{ano}.{os.getpid()}.tmp")
+    df.to_parquet(temporario, compression="zstd", index=False)
+    sha256 = registro_dados.hash_arquivo(temporario)
+    destino = os.path.join(pasta, f"{conjunto}_{ano}-{sha256[:12]}.parquet")
+    os.replace(temporario, destino)
+
+    return {
+        "conjunto": conjunto,
+        "ano": ano,
+        "arquivo": destino,
+        "sha256": sha256,
+        "linhas": len(df),
+        "origem": assinatura,
+        "datas_invalidas": datas_invalidas,
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+def ingerir(conjuntos=CONJUNTOS, anos=None, forcar=False, trabalhadores=None):
+    """
+    Converte os CSVs da CVM em partições Parquet (uma por conjunto e ano).
+    Apenas partições inexistentes ou cujo CSV de origem mudou são refeitas, cada uma
+    de forma independente em um pool de processos. Ao final, todas as novas partições
+    são publicadas juntas no manifesto (registro_dados).
+
+    Args:
+        conjuntos (list): Conjuntos a converter.
+        anos (list): Anos a converter. None converte todos os disponíveis.
+        forcar (bool): Se True, refaz todas as partições.
+        trabalhadores (int): Número de processos. None usa TRABALHADORES.
+
+    Returns:
+        list: Relatório de cada partição gerada (arquivo, linhas e segundos).
+    """
+    manifesto = registro_dados.ler_manifesto()
+    if anos is None:
+        anos = anos_disponiveis(manifesto)
+
+    pendentes = [
+        (conjunto, ano)
+        for conjunto in conjuntos
+        for ano in anos
+        if os.path.exists(caminho_csv(conjunto, ano)) and (forcar or particao_desatualizada(conjunto, ano, manifesto))
+    ]
+    if not pendentes:
+        return []
+
+    trabalhadores = min(trabalhadores or TRABALHADORES, len(pendentes))
+    inicio = time.perf_counter()
+
+    if trabalhadores == 1:
+        relatorio = [converter_para_parquet(conjunto, ano) for conjunto, ano in pendentes]
+    else:
+        # spawn: ingerir também roda dentro da API e do Streamlit, que têm threads; fork copiaria seus locks
+        with ProcessPoolExecutor(max_workers=trabalhadores, mp_context=get_context("spawn")) as executor:
+            relatorio = list(executor.map(converter_para_parquet, *zip(*pendentes)))
+
+    manifesto = registro_dados.registrar_particoes(relatorio)
+
+    for item in relatorio:
+        print(f"Partição {item['arquivo']}: {item['linhas']} linhas em {item['segundos']:.2f}s")
+        for coluna, invalidas in item["datas_invalidas"].items():
+            print(f"  Aviso: {invalidas['linhas']} datas inválidas em {coluna} (ex.: {', '.join(map(str, invalidas['exemplos']))})")
+    print(f"{len(relatorio)} partições geradas em {time.perf_counter() - inicio:.2f}s com {trabalhadores} processo(s)")
+    print(f"Dados publicados na versão {manifesto['versao']}")
+
+    return relatorio
+
+
+def arquivos_conjunto(conjunto, anos=None, manifesto=None):
+    manifesto = manifesto or registro_dados.ler_manifesto()
+    if anos is None:
+        anos = registro_dados.anos_conjunto(conjunto, manifesto)
+    caminhos = [registro_dados.caminho_particao(conjunto, ano, manifesto) for ano in anos]
+    return [caminho for caminho in caminhos if caminho]
+
+
+def versao_particao(conjunto, ano, manifesto=None):
+    particao = registro_dados.particao(conjunto, ano, manifesto)
+    return particao["sha256"][:16] if particao else None
+
+
+def versao_conjunto(conjunto, manifesto=None):
+    """
+    Identificador do conteúdo publicado de um conjunto; muda sempre que alguma partição muda.
+    """
+    return registro_dados.versao_conjunto(conjunto, manifesto)
+
+
+def relatorio_datas(manifesto=None):
+    """
+    Datas que não foram convertidas em cada partição publicada.
+
+    Returns:
+        list: (conjunto, ano, coluna, linhas, exemplos), só das colunas com problema.
+    """
+    manifesto = manifesto or registro_dados.ler_manifesto()
+    return [
+        (conjunto, int(ano), coluna, invalidas["linhas"], invalidas["exemplos"])
+        for conjunto, dados in sorted(manifesto["conjuntos"].items())
+        for ano, particao in sorted(dados["particoes"].items())
+        for coluna, invalidas in particao.get("datas_invalidas", {}).items()
+    ]
+
+
+def ultima_modificacao_conjunto(conjunto, manifesto=None):
+    return registro_dados.ultima_modificacao_conjunto(conjunto, manifesto)
+
+
+def carregar_conjunto(conjunto, colunas=None, anos=None, manifesto=None):
+    """
+    Lê as partições Parquet de um conjunto, trazendo apenas as colunas solicitadas.
+
+    Args:
+        conjunto (str): "ativo_passivo", "complemento" ou "geral".
+        colunas (list): Colunas desejadas. None traz todas.
+        anos (list): Anos desejados. None traz todos os disponíveis.
+        manifesto (dict): Versão dos dados a ler. None ingere o que estiver
+            desatualizado e lê a versão publicada em seguida.
+
+    Returns:
+        pd.DataFrame: Conjunto concatenado de todos os anos.
+    """
+    if manifesto is None:
+        ingerir([conjunto], anos)
+        manifesto = registro_dados.ler_manifesto()
+
+    arquivos = arquivos_conjunto(conjunto, anos, manifesto)
+    if not arquivos:
+        raise FileNotFoundError(f"Nenhuma partição encontrada para o conjunto {conjunto}")
+
+    partes = [pd.read_parquet(arquivo, columns=colunas) for arquivo in arquivos]
+    df = pd.concat(partes, ignore_index=True)
+
+    # As categorias variam entre os anos, então o concat volta para texto
+    categoricas = {coluna for parte in partes for coluna in parte.columns if isinstance(parte[coluna].dtype, pd.CategoricalDtype)}
+    for coluna in categoricas:
+        if not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = df[coluna].astype("category")
+
+    return df
+
+
+if __name__ == "__main__":
+    import tabela_scores
+    import indice_cnpj
+    import agregados
+
+    parser = argparse.ArgumentParser(description="Converte os CSVs da CVM em partições Parquet.")
+    parser.add_argument("--trabalhadores", type=int, default=None, help="Número de processos (padrão: núcleos da máquina)")
+    parser.add_argument("--anos", type=int, nargs="*", default=None, help="Anos a converter (padrão: todos)")
+    parser.add_argument("--incremental", action="store_true", help="Converte apenas partições desatualizadas")
+    args = parser.parse_args()
+
+    ingerir(anos=args.anos, forcar=not args.incremental, trabalhadores=args.trabalhadores)
+    tabela_scores.materializar_scores()
+    indice_cnpj.construir_mapas()
+    agregados.construir_agregados()
+
+    problemas = relatorio_datas()
+    for conjunto, ano, coluna, linhas, exemplos in problemas:
+        print(f"{conjunto} {ano}: {linhas} datas inválidas em {coluna} (ex.: {', '.join(map(str, exemplos))})")
+    print(f"Validação de datas: {len(problemas)} coluna(s) com problema" if problemas else "Validação de datas: todas as datas convertidas")
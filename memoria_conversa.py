@@ -0,0 +1,236 @@
+import math
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+import orjson
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+# Tokens reservados ao histórico enviado ao modelo (sem contar o contexto do sistema e a resposta)
+LIMITE_TOKENS_HISTORICO = 2500
+
+# Mensagens mais recentes que sempre vão na íntegra
+RECENTES_MINIMO = 4
+
+# As mensagens antigas são resumidas em blocos deste tamanho, sempre a partir do início,
+# para que o resumo de cada prefixo possa ser reaproveitado nas chamadas seguintes
+MENSAGENS_POR_BLOCO = 6
+
+LIMITE_TOKENS_RESUMO = 300
+
+# Tokens extras que a OpenAI conta por mensagem (papel e separadores)
+TOKENS_POR_MENSAGEM = 4
+
+# Indica ao modelo que o fim de uma mensagem foi cortado para caber no orçamento
+MARCA_TRUNCADO = " […]"
+
+# Contexto do especialista em FIIs, usado pelo chat do app e pelo da API
+SYSTEM_CONTEXT = """Você é um especialista em Fundos Imobiliários (FIIs) do mercado brasileiro.
+Forneça respostas claras e objetivas sobre FIIs, incluindo análises, recomendações e explicações
+sobre conceitos importantes do mercado. Mantenha um tom profissional e educativo."""
+
+INSTRUCAO_RESUMO = """Você resume conversas entre um usuário e um especialista em Fundos Imobiliários (FIIs).
+Atualize o resumo com as novas mensagens, mantendo fundos, tickers, números, preferências e
+perguntas em aberto do usuário. Responda apenas com o resumo, em até 150 palavras."""
+
+
+@functools.lru_cache(maxsize=1)
+def codificador():
+    # Carregado no primeiro uso, não na importação: o tiktoken baixa a tabela de tokens
+    # (ou a lê do disco) e isso atrasaria a subida da API e do Streamlit.
+    # Sem a tabela, a contagem é estimada
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def contar_tokens(texto):
+    if not texto:
+        return 0
+    tabela = codificador()
+    if tabela is not None:
+        return len(tabela.encode(texto))
+    # Aproximação de ~4 caracteres por token
+    return math.ceil(len(texto) / 4)
+
+
+def tokens_mensagem(mensagem):
+    return TOKENS_POR_MENSAGEM + contar_tokens(mensagem["content"])
+
+
+def truncar_texto(texto, tokens):
+    """
+    Início de `texto` em até `tokens` tokens, com MARCA_TRUNCADO no fim quando houve corte.
+    """
+    if contar_tokens(texto) <= tokens:
+        return texto
+    tokens -= contar_tokens(MARCA_TRUNCADO)
+    if tokens <= 0:
+        return ""
+    tabela = codificador()
+    if tabela is not None:
+        return tabela.decode(tabela.encode(texto)[:tokens]) + MARCA_TRUNCADO
+    return texto[:tokens * 4] + MARCA_TRUNCADO
+
+
+def limitar_janela(janela, orcamento):
+    """
+    Corta a janela para caber em `orcamento` tokens, para quando nem resumir as mensagens
+    antigas basta (por exemplo, quando as últimas mensagens sozinhas passam do limite).
+
+    O conteúdo é cortado a partir das mensagens mais antigas da janela, mantendo o início
+    de cada uma; a última (a pergunta atual) só é cortada se não houver outra saída.
+    Mensagens que ficam vazias saem da janela.
+    """
+    excesso = sum(tokens_mensagem(mensagem) for mensagem in janela) - orcamento
+    if excesso <= 0:
+        return list(janela)
+
+    limitada = []
+    for posicao, mensagem in enumerate(janela):
+        ultima = posicao == len(janela) - 1
+        if excesso > 0:
+            conteudo = contar_tokens(mensagem["content"])
+            texto = truncar_texto(mensagem["content"], max(conteudo - excesso, 0))
+            if not texto and not ultima:
+                excesso -= TOKENS_POR_MENSAGEM + conteudo
+                continue
+            excesso -= conteudo - contar_tokens(texto)
+            mensagem = {**mensagem, "content": texto}
+        limitada.append(mensagem)
+    return limitada
+
+
+def chave_bloco(chave_anterior, bloco):
+    # Encadeada: identifica o prefixo inteiro da conversa até o fim do bloco
+    conteudo = orjson.dumps([chave_anterior, [[m["role"], m["content"]] for m in bloco]])
+    return hashlib.blake2b(conteudo, digest_size=16).hexdigest()
+
+
+def mensagens_resumo(resumo_anterior, bloco):
+    """
+    Mensagens para o modelo atualizar o resumo com um novo bloco da conversa.
+    """
+    conversa = "\n".join(f"{m['role']}: {m['content']}" for m in bloco)
+    return [
+        {"role": "system", "content": INSTRUCAO_RESUMO},
+        {"role": "user", "content": f"Resumo atual:\n{resumo_anterior or '(vazio)'}\n\nNovas mensagens:\n{conversa}"},
+    ]
+
+
+def montar_mensagens(contexto, resumo, janela):
+    mensagens = [{"role": "system", "content": contexto}]
+    if resumo:
+        mensagens.append({"role": "system", "content": f"Resumo da conversa até aqui:\n{resumo}"})
+    return mensagens + list(janela)
+
+
+class MemoriaConversa:
+    """
+    Memória de conversa com orçamento de tokens: as mensagens recentes vão na íntegra
+    e as antigas viram um resumo acumulado.
+
+    O resumo é feito por uma função injetada `resumir(resumo_anterior, bloco) -> str`
+    (síncrona em `compactar`, assíncrona em `compactar_async`), o que permite usar o
+    cliente da OpenAI no Streamlit, o cliente assíncrono na API ou um modelo falso.
+    Os resumos ficam em cache por prefixo da conversa, então cada bloco é resumido
+    uma única vez mesmo que a API receba o histórico completo a cada chamada.
+
+    Janela e resumo juntos ficam sempre dentro de `limite_tokens` (contando `reserva_resumo`
+    para o resumo); se as mensagens recentes sozinhas não couberem, elas são cortadas
+    (`limitar_janela`).
+    """
+
+    def __init__(self, limite_tokens=LIMITE_TOKENS_HISTORICO, recentes_minimo=RECENTES_MINIMO,
+                 mensagens_por_bloco=MENSAGENS_POR_BLOCO, tamanho_cache=4096, reserva_resumo=LIMITE_TOKENS_RESUMO):
+        self.limite_tokens = limite_tokens
+        self.recentes_minimo = recentes_minimo
+        self.mensagens_por_bloco = mensagens_por_bloco
+        self.reserva_resumo = reserva_resumo
+        self.tamanho_cache = tamanho_cache
+        self._resumos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def corte(self, mensagens):
+        """
+        Quantas mensagens do início são resumidas: o menor múltiplo do bloco cuja janela
+        restante (mais a reserva do resumo) cabe no orçamento.
+        """
+        tokens = [tokens_mensagem(mensagem) for mensagem in mensagens]
+        total = sum(tokens)
+        if total <= self.limite_tokens:
+            return 0
+
+        maximo = max(len(mensagens) - self.recentes_minimo, 0)
+        corte = 0
+        janela = total
+        while corte + self.mensagens_por_bloco <= maximo:
+            janela -= sum(tokens[corte:corte + self.mensagens_por_bloco])
+            corte += self.mensagens_por_bloco
+            if janela + self.reserva_resumo <= self.limite_tokens:
+                break
+        return corte
+
+    def janela(self, mensagens, corte):
+        # Mensagens enviadas na íntegra (ou cortadas, se mesmo assim passarem do orçamento)
+        orcamento = self.limite_tokens - (self.reserva_resumo if corte else 0)
+        return limitar_janela(mensagens[corte:], orcamento)
+
+    def _blocos(self, mensagens, corte):
+        chave = None
+        for inicio in range(0, corte, self.mensagens_por_bloco):
+            bloco = mensagens[inicio:inicio + self.mensagens_por_bloco]
+            chave = chave_bloco(chave, bloco)
+            yield chave, bloco
+
+    def _obter(self, chave):
+        with self._lock:
+            resumo = self._resumos.get(chave)
+            if resumo is not None:
+                self._resumos.move_to_end(chave)
+            return resumo
+
+    def _guardar(self, chave, resumo):
+        with self._lock:
+            self._resumos[chave] = resumo
+            self._resumos.move_to_end(chave)
+            while len(self._resumos) > self.tamanho_cache:
+                self._resumos.popitem(last=False)
+
+    def compactar(self, mensagens, resumir):
+        """
+        Returns:
+            tuple: (resumo das mensagens antigas, mensagens recentes na íntegra)
+        """
+        corte = self.corte(mensagens)
+        resumo = ""
+        for chave, bloco in self._blocos(mensagens, corte):
+            anterior = resumo
+            resumo = self._obter(chave)
+            if resumo is None:
+                resumo = resumir(anterior, bloco)
+                self._guardar(chave, resumo)
+        return resumo, self.janela(mensagens, corte)
+
+    async def compactar_async(self, mensagens, resumir):
+        corte = self.corte(mensagens)
+        resumo = ""
+        for chave, bloco in self._blocos(mensagens, corte):
+            anterior = resumo
+            resumo = self._obter(chave)
+            if resumo is None:
+                resumo = await resumir(anterior, bloco)
+                self._guardar(chave, resumo)
+        return resumo, self.janela(mensagens, corte)
+
+
+# Memória compartilhada pelo chat da página e pela API
+memoria = MemoriaConversa()
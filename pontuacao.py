@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+
+# Métricas mensais usadas no score, na ordem das linhas da matriz de pesos
+FEATURES = [
+    "Percentual_Dividend_Yield_Mes",
+    "Percentual_Rentabilidade_Efetiva_Mes",
+    "Percentual_Rentabilidade_Patrimonial_Mes",
+]
+
+# Peso de cada métrica por perfil de investidor; um novo perfil é apenas uma nova entrada
+PESOS_PERFIS = {
+    "Conservador": {"Percentual_Dividend_Yield_Mes": 0.6, "Percentual_Rentabilidade_Efetiva_Mes": 0.3, "Percentual_Rentabilidade_Patrimonial_Mes": 0.1},
+    "Moderado": {"Percentual_Dividend_Yield_Mes": 0.4, "Percentual_Rentabilidade_Efetiva_Mes": 0.4, "Percentual_Rentabilidade_Patrimonial_Mes": 0.2},
+    "Arrojado": {"Percentual_Dividend_Yield_Mes": 0.2, "Percentual_Rentabilidade_Efetiva_Mes": 0.5, "Percentual_Rentabilidade_Patrimonial_Mes": 0.3},
+}
+
+
+def coluna_score(perfil):
+    return f"score_{perfil.lower()}"
+
+
+def matriz_pesos(perfis=PESOS_PERFIS, features=FEATURES):
+    """
+    Matriz (n_features x n_perfis) com os pesos de cada perfil nas colunas.
+    """
+    nomes = list(perfis)
+    pesos = np.array([[perfis[perfil].get(feature, 0.0) for perfil in nomes] for feature in features], dtype=np.float64)
+    return nomes, pesos
+
+
+def preparar_features(valores):
+    """
+    Percentuais mensais em pontos percentuais; ausentes e negativos contam como zero.
+    """
+    valores = np.nan_to_num(np.asarray(valores, dtype=np.float64) * 100, nan=0.0)
+    np.maximum(valores, 0, out=valores)
+    return valores
+
+
+def limites_features(preparados):
+    return preparados.min(axis=0), preparados.max(axis=0)
+
+
+def normalizar_features(preparados, minimo=None, maximo=None):
+    """
+    Escala cada coluna de 0 a 100 (min-max). Os limites podem vir de fora, para que
+    partes da base sejam normalizadas separadamente com a mesma escala.
+    """
+    if minimo is None or maximo is None:
+        minimo, maximo = limites_features(preparados)
+
+    amplitude = np.asarray(maximo, dtype=np.float64) - minimo
+    amplitude[amplitude == 0] = 1
+    return (preparados - minimo) / amplitude * 100
+
+
+def calcular_scores(features, pesos):
+    # Todos os perfis de uma vez: (n_linhas x n_features) @ (n_features x n_perfis)
+    return features @ pesos
+
+
+def top_k(scores, k):
+    """
+    Posições das k maiores linhas de cada coluna de `scores`, em ordem decrescente.
+    Aceita um vetor (um perfil) ou uma matriz (um perfil por coluna).
+    """
+    negativos = -np.asarray(scores)
+    k = min(k, negativos.shape[0])
+    if k <= 0:
+        return np.empty((0,) + negativos.shape[1:], dtype=np.intp)
+
+    candidatos = np.argpartition(negativos, k - 1, axis=0)[:k]
+    ordem = np.argsort(np.take_along_axis(negativos, candidatos, axis=0), axis=0, kind="stable")
+    return np.take_along_axis(candidatos, ordem, axis=0)
+
+
+def segmentos_por_fundo(df_segmento):
+    # Segmento do primeiro registro de cada fundo
+    segmentos = df_segmento[["CNPJ_Fundo", "Segmento_Atuacao"]].astype({"CNPJ_Fundo": str, "Segmento_Atuacao": object})
+    return segmentos.drop_duplicates(subset=["CNPJ_Fundo"], keep="first")
+
+
+def aplicar_segmentos(base, segmentos):
+    colunas = list(base.columns) if "Segmento_Atuacao" in base.columns else None
+    base = base.drop(columns=["Segmento_Atuacao"], errors="ignore").merge(segmentos, how="left", on="CNPJ_Fundo")
+    base["Segmento_Atuacao"] = base["Segmento_Atuacao"].fillna("Outros")
+    return base[colunas] if colunas else base
+
+
+def montar_base(df_complemento, df_tickers, df_segmento):
+    """
+    Junta as métricas mensais dos FIIs listados atualmente com ticker e segmento.
+
+    Args:
+        df_complemento (pd.DataFrame): CNPJ_Fundo, Data_Referencia e as colunas de FEATURES.
+        df_tickers (pd.DataFrame): TICKER e CNPJ_Fundo dos fundos listados.
+        df_segmento (pd.DataFrame): CNPJ_Fundo e Segmento_Atuacao.
+
+    Returns:
+        pd.DataFrame: Uma linha por fundo e mês, com as features ainda sem normalizar.
+    """
+    tickers = df_tickers[["TICKER", "CNPJ_Fundo"]].astype({"CNPJ_Fundo": str})
+    base = df_complemento[["CNPJ_Fundo", "Data_Referencia"] + FEATURES].astype({"CNPJ_Fundo": str})
+    base = base.merge(tickers, how="inner", on="CNPJ_Fundo")
+
+    base = aplicar_segmentos(base, segmentos_por_fundo(df_segmento))
+
+    return base[["CNPJ_Fundo", "Data_Referencia", "TICKER", "Segmento_Atuacao"] + FEATURES]
+
+
+def pontuar(base, perfis=PESOS_PERFIS):
+    """
+    Normaliza as features e calcula o score de todos os perfis em um único produto matricial.
+    """
+    nomes, pesos = matriz_pesos(perfis)
+    features = normalizar_features(preparar_features(base[FEATURES].to_numpy()))
+    scores = calcular_scores(features, pesos)
+
+    pontuado = base.copy()
+    pontuado[FEATURES] = features
+    for i, perfil in enumerate(nomes):
+        pontuado[coluna_score(perfil)] = scores[:, i]
+    return pontuado
+
+
+def mascara_periodo(datas, historico):
+    """
+    "Histórica" mantém tudo, "Anual" o ano mais recente e "Mensal" o mês mais recente.
+    """
+    datas = pd.DatetimeIndex(datas)
+    if historico == "Anual":
+        return np.asarray(datas.year == datas.year.max())
+    if historico == "Mensal":
+        mais_recente = datas.max()
+        return np.asarray((datas.year == mais_recente.year) & (datas.month == mais_recente.month))
+    return np.ones(len(datas), dtype=bool)
+
+
+def selecionar(pontuado, perfil, historico=None, segmentos=None, k=None):
+    """
+    Melhores fundos de um perfil, um por ticker (o mês de maior score), em ordem decrescente.
+    """
+    mascara = mascara_periodo(pontuado["Data_Referencia"], historico)
+    if segmentos:
+        mascara &= pontuado["Segmento_Atuacao"].isin(segmentos).to_numpy()
+
+    candidatos = pontuado[mascara]
+    scores = candidatos[coluna_score(perfil)].to_numpy()
+
+    # Melhor linha de cada ticker: ordena por score e mantém a primeira ocorrência
+    ordem = np.argsort(-scores, kind="stable")
+    _, primeiras = np.unique(candidatos["TICKER"].to_numpy()[ordem], return_index=True)
+    melhores = ordem[primeiras]
+
+    posicoes = melhores[top_k(scores[melhores], len(melhores) if k is None else k)]
+    return candidatos.iloc[posicoes]
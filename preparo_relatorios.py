@@ -0,0 +1,123 @@
+import os
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import busca_relatorio
+
+
+# Fundos preparados ao mesmo tempo (cada um já resume seus trechos em paralelo)
+TRABALHADORES = int(os.getenv("PREPARO_TRABALHADORES", "3"))
+
+
+class PreparoRelatorios:
+    """
+    Prepara em segundo plano o resumo do relatório gerencial dos fundos recomendados.
+
+    `preparar(ticker)` faz busca, download, extração e resumo; cada etapa guarda o próprio
+    resultado (acervo de relatórios e cache do modelo), então depois de preparado o resumo
+    é montado só com leituras em cache. Um fundo já em preparo não é agendado de novo, e um
+    fundo preparado há menos de `validade` segundos também não.
+    """
+
+    def __init__(self, preparar, trabalhadores=TRABALHADORES, validade=busca_relatorio.TTL):
+        self.preparar = preparar
+        self.validade = validade
+        self._executor = ThreadPoolExecutor(max_workers=max(1, trabalhadores), thread_name_prefix="preparo")
+        self._lock = threading.Lock()
+        self._pendentes = {}
+        self._preparados = {}
+
+    def _executar(self, ticker):
+        try:
+            resultado = self.preparar(ticker)
+        except Exception as e:
+            print(f"Erro ao preparar o relatório de {ticker}: {e}")
+            raise
+        with self._lock:
+            self._preparados[ticker] = time.monotonic()
+        return resultado
+
+    def _concluir(self, ticker):
+        with self._lock:
+            self._pendentes.pop(ticker, None)
+
+    def agendar(self, tickers):
+        """
+        Agenda o preparo dos fundos e volta na hora.
+
+        Returns:
+            dict: {ticker: Future} dos fundos em preparo.
+        """
+        agora = time.monotonic()
+        futuros = {}
+        with self._lock:
+            for ticker in dict.fromkeys(str(ticker).lower() for ticker in tickers):
+                if ticker not in self._pendentes:
+                    if agora - self._preparados.get(ticker, float("-inf")) < self.validade:
+                        continue
+                    futuro = self._executor.submit(self._executar, ticker)
+                    futuro.add_done_callback(lambda _, ticker=ticker: self._concluir(ticker))
+                    self._pendentes[ticker] = futuro
+                futuros[ticker] = self._pendentes[ticker]
+        return futuros
+
+    def obter(self, ticker):
+        """
+        Resumo do relatório do fundo: espera o preparo em andamento ou, se não houver,
+        prepara na hora (o que é rápido quando tudo já está em cache).
+        """
+        ticker = str(ticker).lower()
+        with self._lock:
+            futuro = self._pendentes.get(ticker)
+        if futuro is not None:
+            try:
+                return futuro.result()
+            except Exception:
+                pass
+        return self.preparar(ticker)
+
+
+_compartilhado = None
+_lock = threading.Lock()
+
+
+def compartilhado(preparar):
+    """
+    Instância única do processo. O Streamlit reexecuta o script principal a cada interação,
+    e uma instância criada nele perderia a cada rerun os preparos em andamento (e deixaria
+    para trás o pool de threads anterior).
+    """
+    global _compartilhado
+    if _compartilhado is None:
+        with _lock:
+            if _compartilhado is None:
+                _compartilhado = PreparoRelatorios(preparar)
+    return _compartilhado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deixa em cache o resumo do relatório gerencial de todos os fundos.")
+    parser.add_argument("--trabalhadores", type=int, default=TRABALHADORES)
+    parser.add_argument("--limite", type=int, help="Prepara só os primeiros N fundos da lista")
+    args = parser.parse_args()
+
+    # Importado aqui para que app.py possa importar este módulo
+    import app
+    import tabela_scores
+
+    tickers = tabela_scores.carregar_tickers()["TICKER"].dropna().str.lower().unique().tolist()[:args.limite]
+    preparo = PreparoRelatorios(app.preparar_relatorio, trabalhadores=args.trabalhadores)
+
+    inicio = time.perf_counter()
+    falhas = 0
+    futuros = preparo.agendar(tickers)
+    for numero, futuro in enumerate(as_completed(futuros.values()), start=1):
+        if futuro.exception() is not None:
+            falhas += 1
+        print(f"{numero}/{len(futuros)} fundos preparados ({falhas} falhas)")
+    print(f"Concluído em {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
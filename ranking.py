@@ -0,0 +1,128 @@
+import functools
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import ingestao
+import registro_dados
+
+
+# Períodos aceitos nos rankings por fundo
+PERIODOS = ("Ano", "Mes")
+
+
+def posicoes_por_grupo(codigos, valores, n):
+    """
+    Posições das n maiores linhas de cada grupo, sem laço em Python: ordena por
+    (grupo, valor decrescente) e mantém as linhas cuja ordem dentro do grupo é menor que n.
+
+    Args:
+        codigos (np.ndarray): Código inteiro do grupo de cada linha (como os de pd.factorize).
+        valores (np.ndarray): Métrica de cada linha; NaN fica de fora, como no nlargest.
+        n (int): Linhas por grupo.
+
+    Returns:
+        np.ndarray: Posições ordenadas por grupo e, dentro dele, por valor decrescente.
+            Empates mantêm a ordem original.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    validas = np.flatnonzero(~np.isnan(valores) & (codigos >= 0))
+    if n <= 0 or len(validas) == 0:
+        return np.empty(0, dtype=np.intp)
+
+    # lexsort é estável e usa a última chave como principal
+    ordem = validas[np.lexsort((-valores[validas], codigos[validas]))]
+    grupos = codigos[ordem]
+
+    # Ordem dentro do grupo (o cumcount do groupby): posição menos o início do grupo
+    inicio = np.r_[True, grupos[1:] != grupos[:-1]]
+    indices = np.arange(len(ordem))
+    ordem_no_grupo = indices - np.maximum.accumulate(np.where(inicio, indices, 0))
+    return ordem[ordem_no_grupo < n]
+
+
+def maiores_por_grupo(df, grupo, metricas, n=5, colunas=None):
+    """
+    Top n de cada grupo para várias métricas; os grupos são codificados uma única vez.
+
+    Args:
+        df (pd.DataFrame): Linhas a ranquear.
+        grupo (str): Coluna que define os grupos (ex.: "Ano").
+        metricas (list): Colunas numéricas a ranquear, cada uma separadamente.
+        n (int): Linhas por grupo.
+        colunas (list): Colunas mantidas além do grupo e da métrica. None mantém as demais.
+
+    Returns:
+        dict: {métrica: DataFrame com grupo, colunas e métrica}, grupos em ordem crescente.
+    """
+    codigos, _ = pd.factorize(df[grupo], sort=True)
+    if colunas is None:
+        colunas = [coluna for coluna in df.columns if coluna != grupo and coluna not in metricas]
+
+    resultado = {}
+    for metrica in metricas:
+        posicoes = posicoes_por_grupo(codigos, df[metrica].to_numpy(dtype=np.float64, na_value=np.nan), n)
+        resultado[metrica] = df[[grupo] + list(colunas) + [metrica]].iloc[posicoes].reset_index(drop=True)
+    return resultado
+
+
+def chave_periodo(datas, periodo):
+    # "Ano" vira o ano (inteiro) e "Mes" o texto AAAA-MM; datas ausentes ficam fora dos grupos
+    if periodo == "Mes":
+        return datas.dt.strftime("%Y-%m")
+    return datas.dt.year.astype("Int64")
+
+
+@functools.lru_cache(maxsize=16)
+def _colunas_numericas(arquivos):
+    # As partições têm o hash do conteúdo no nome, então o resultado de uma tupla nunca muda;
+    # só o rodapé de cada arquivo é lido
+    comuns = None
+    for arquivo in arquivos:
+        esquema = pq.read_schema(arquivo)
+        numericas = {campo.name for campo in esquema if pa.types.is_integer(campo.type) or pa.types.is_floating(campo.type)}
+        comuns = numericas if comuns is None else comuns & numericas
+    return sorted(comuns or ())
+
+
+def metricas_disponiveis(conjunto, manifesto=None):
+    """
+    Colunas numéricas presentes em todas as partições publicadas do conjunto
+    (fora o CNPJ, as datas e a versão do formulário).
+    """
+    excluidas = {"CNPJ_Fundo", "Versao", *ingestao.COLUNAS_DATA}
+    arquivos = tuple(ingestao.arquivos_conjunto(conjunto, manifesto=manifesto))
+    return [coluna for coluna in _colunas_numericas(arquivos) if coluna not in excluidas]
+
+
+def ranking_fundos(conjunto, metricas, periodo="Ano", n=5, manifesto=None):
+    """
+    Fundos com os maiores totais de cada métrica por ano ou por mês.
+
+    Raises:
+        ValueError: Conjunto, período ou métrica inválidos.
+
+    Returns:
+        dict: {métrica: DataFrame com periodo, CNPJ_Fundo e o total}.
+    """
+    if conjunto not in ingestao.CONJUNTOS_NUMERICOS:
+        raise ValueError(f"Conjunto sem métricas numéricas: {conjunto}. Use um de {list(ingestao.CONJUNTOS_NUMERICOS)}")
+    if periodo not in PERIODOS:
+        raise ValueError(f"Período desconhecido: {periodo}. Use um de {list(PERIODOS)}")
+    if manifesto is None:
+        ingestao.ingerir([conjunto])
+        manifesto = registro_dados.ler_manifesto()
+
+    metricas = list(dict.fromkeys(metricas))
+    validas = metricas_disponiveis(conjunto, manifesto)
+    invalidas = [metrica for metrica in metricas if metrica not in validas]
+    if not metricas or invalidas:
+        raise ValueError(f"Métricas inválidas para {conjunto}: {invalidas or metricas}. Use uma ou mais de {validas}")
+
+    df = ingestao.carregar_conjunto(conjunto, ["CNPJ_Fundo", "Data_Referencia"] + metricas, manifesto=manifesto)
+
+    totais = pd.DataFrame({"periodo": chave_periodo(df["Data_Referencia"], periodo), "CNPJ_Fundo": df["CNPJ_Fundo"].astype(str)})
+    for metrica in metricas:
+        totais[metrica] = pd.to_numeric(df[metrica], errors="coerce")
+    totais = totais.groupby(["periodo", "CNPJ_Fundo"])[metricas].sum(min_count=1).reset_index()
+    return maiores_por_grupo(totais, "periodo", metricas, n, colunas=["CNPJ_Fundo"])
@@ -0,0 +1,190 @@
+import threading
+import numpy as np
+import orjson
+import pontuacao
+import tabela_scores
+import cotacoes
+from cache_respostas import CacheRespostas
+
+
+HISTORICOS = ["Histórica", "Anual", "Mensal"]
+
+# Faixas de preço da cota oferecidas no app: (acima de, até)
+FAIXAS_VALOR = {
+    "R$0,00 a R$90,00": (float("-inf"), 90.00),
+    "R$91,00 a R$120,00": (90.00, 120.00),
+    "Acima de R$121,00": (121.00, float("inf")),
+}
+
+COLUNAS = ["CNPJ_Fundo", "Data_Referencia", "TICKER", "Segmento_Atuacao"]
+
+
+def normalizar_parametros(perfil, historico=None, segmentos=None, preco_minimo=None, preco_maximo=None, quantidade=5):
+    """
+    Forma canônica dos parâmetros de uma recomendação, usada também como chave de cache.
+
+    Raises:
+        ValueError: Perfil ou período desconhecido.
+    """
+    perfis = {nome.lower(): nome for nome in pontuacao.PESOS_PERFIS}
+    if str(perfil).lower() not in perfis:
+        raise ValueError(f"Perfil desconhecido: {perfil}. Use um de {list(pontuacao.PESOS_PERFIS)}")
+    historicos = {nome.lower(): nome for nome in HISTORICOS}
+    historico = historico or "Histórica"
+    if historico.lower() not in historicos:
+        raise ValueError(f"Período desconhecido: {historico}. Use um de {HISTORICOS}")
+
+    return (
+        perfis[str(perfil).lower()],
+        historicos[historico.lower()],
+        tuple(sorted(set(segmentos))) if segmentos else None,
+        float("-inf") if preco_minimo is None else float(preco_minimo),
+        float("inf") if preco_maximo is None else float(preco_maximo),
+        int(quantidade),
+    )
+
+
+class MotorRecomendacao:
+    """
+    Recomendações sobre uma versão da tabela de scores.
+
+    O ranking de cada (perfil, período), com o melhor mês de cada fundo, é calculado uma
+    vez por versão e compartilhado por todas as consultas; segmentos, faixa de preço e
+    quantidade são só filtros sobre ele. Como o segmento é o mesmo em todos os meses de
+    um fundo, filtrar o ranking dá o mesmo resultado que `pontuacao.selecionar` com segmentos.
+    """
+
+    def __init__(self, pontuado, versao):
+        self.pontuado = pontuado
+        self.versao = versao
+        self.tickers = pontuado["TICKER"].str.upper().unique().tolist()
+        self._rankings = {}
+        self._lock = threading.Lock()
+
+    def ranking(self, perfil, historico):
+        """
+        Ranking do perfil no período e suas colunas em arrays, prontas para os filtros.
+        """
+        chave = (perfil, historico)
+        ranking = self._rankings.get(chave)
+        if ranking is None:
+            df = pontuacao.selecionar(self.pontuado, perfil, historico)[COLUNAS + [pontuacao.coluna_score(perfil)]]
+            df = df.reset_index(drop=True)
+            datas = df["Data_Referencia"]
+            ranking = {
+                "df": df,
+                "cnpj": df["CNPJ_Fundo"].to_numpy(dtype=object),
+                "ticker": df["TICKER"].str.upper().to_numpy(dtype=object),
+                "segmento": df["Segmento_Atuacao"].to_numpy(dtype=object),
+                "data": datas.dt.strftime("%Y-%m-%d").where(datas.notna(), None).to_numpy(dtype=object),
+                "score": df[pontuacao.coluna_score(perfil)].to_numpy(dtype=np.float64),
+            }
+            with self._lock:
+                self._rankings[chave] = ranking
+        return ranking
+
+    def cotacoes_ranking(self, ranking, precos):
+        # Cotação de cada linha do ranking (NaN sem cotação)
+        precos = precos.to_dict() if hasattr(precos, "to_dict") else precos
+        return np.array([precos.get(ticker, np.nan) for ticker in ranking["ticker"]], dtype=np.float64)
+
+    def posicoes(self, ranking, cotacao, segmentos, preco_minimo, preco_maximo, quantidade):
+        mascara = ~np.isnan(cotacao) & (cotacao > preco_minimo) & (cotacao <= preco_maximo)
+        if segmentos:
+            mascara &= np.isin(ranking["segmento"], segmentos)
+        return np.flatnonzero(mascara)[:quantidade]
+
+    def recomendar(self, perfil, historico, segmentos, preco_minimo, preco_maximo, quantidade, precos):
+        """
+        Fundos recomendados, em ordem de score, já com a cotação.
+
+        Args:
+            precos (pd.Series): Cotação por ticker (em maiúsculas).
+
+        Returns:
+            pd.DataFrame: COLUNAS, o score do perfil e "cotacao".
+        """
+        ranking = self.ranking(perfil, historico)
+        cotacao = self.cotacoes_ranking(ranking, precos)
+        posicoes = self.posicoes(ranking, cotacao, segmentos, preco_minimo, preco_maximo, quantidade)
+        return ranking["df"].iloc[posicoes].assign(cotacao=cotacao[posicoes])
+
+
+_motor = None
+_lock = threading.Lock()
+
+
+def motor_atual():
+    """
+    Motor da versão mais recente da tabela de scores, recriado só quando ela muda.
+    """
+    global _motor
+    estado = tabela_scores.ler_versao()
+    if _motor is None or estado.get("versao") != _motor.versao:
+        with _lock:
+            if _motor is None or estado.get("versao") != _motor.versao:
+                pontuado, versao = tabela_scores.carregar_scores()
+                _motor = MotorRecomendacao(pontuado, versao)
+    return _motor
+
+
+# Recomendações já serializadas, por (versão dos scores, versão das cotações, parâmetros)
+respostas = CacheRespostas(tamanho_maximo=4096)
+
+
+def serializar(parametros, ranking, cotacao, posicoes):
+    perfil, historico, segmentos, preco_minimo, preco_maximo, quantidade = parametros
+    fundos = [
+        {"ticker": ticker, "cnpj": cnpj, "segmento": segmento, "data_referencia": data,
+         "score": round(score, 4), "cotacao": round(preco, 2)}
+        for ticker, cnpj, segmento, data, score, preco in zip(
+            ranking["ticker"][posicoes], ranking["cnpj"][posicoes], ranking["segmento"][posicoes],
+            ranking["data"][posicoes], ranking["score"][posicoes].tolist(), cotacao[posicoes].tolist(),
+        )
+    ]
+    return orjson.dumps({
+        "perfil": perfil,
+        "historico": historico,
+        "segmentos": list(segmentos) if segmentos else None,
+        "preco_minimo": None if preco_minimo == float("-inf") else preco_minimo,
+        "preco_maximo": None if preco_maximo == float("inf") else preco_maximo,
+        "quantidade": quantidade,
+        "fundos": fundos,
+    })
+
+
+def recomendar_lote(lista_parametros):
+    """
+    Recomendações de vários investidores de uma vez, na ordem recebida.
+
+    A tabela de scores, os rankings e as cotações são obtidos uma vez para o lote inteiro;
+    parâmetros repetidos (no lote ou em lotes anteriores) vêm do cache.
+
+    Args:
+        lista_parametros (list): Tuplas de `normalizar_parametros`.
+
+    Returns:
+        bytes: JSON {"versao": ..., "resultados": [...]}.
+    """
+    motor = motor_atual()
+    # A versão é lida antes dos preços: se uma atualização terminar no meio, as respostas ficam
+    # sob a versão anterior (e são refeitas) em vez de guardar preços antigos sob a nova
+    versao = (motor.versao, cotacoes.base.versao)
+    precos = cotacoes.base.precos(motor.tickers).to_dict()
+
+    cotacoes_rankings = {}
+    partes = []
+    for parametros in lista_parametros:
+        chave = (versao, parametros)
+        resposta = respostas.obter(chave)
+        if resposta is None:
+            perfil, historico, segmentos, preco_minimo, preco_maximo, quantidade = parametros
+            ranking = motor.ranking(perfil, historico)
+            if (perfil, historico) not in cotacoes_rankings:
+                cotacoes_rankings[(perfil, historico)] = motor.cotacoes_ranking(ranking, precos)
+            cotacao = cotacoes_rankings[(perfil, historico)]
+            posicoes = motor.posicoes(ranking, cotacao, segmentos, preco_minimo, preco_maximo, quantidade)
+            resposta = respostas.guardar(chave, serializar(parametros, ranking, cotacao, posicoes), 0)
+        partes.append(resposta.corpo)
+
+    return b'{"versao":' + orjson.dumps(motor.versao) + b',"resultados":[' + b",".join(partes) + b"]}"
@@ -0,0 +1,171 @@
+import os
+import glob
+import json
+import time
+import hashlib
+from contextlib import contextmanager
+from datetime import datetime
+
+
+PASTA_DADOS = "data"
+PASTA_COLUNAR = os.path.join(PASTA_DADOS, "colunar")
+ARQUIVO_MANIFESTO = os.path.join(PASTA_COLUNAR, "manifesto.json")
+ARQUIVO_BLOQUEIO = ARQUIVO_MANIFESTO + ".lock"
+
+# Um bloqueio mais antigo que isso é considerado abandonado por um processo que morreu
+BLOQUEIO_EXPIRADO = 120
+
+
+def hash_arquivo(caminho):
+    sha256 = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b""):
+            sha256.update(bloco)
+    return sha256.hexdigest()
+
+
+def hash_texto(texto):
+    return hashlib.sha1(texto.encode()).hexdigest()[:16]
+
+
+def ler_manifesto(caminho=ARQUIVO_MANIFESTO):
+    """
+    Manifesto atual dos dados. Como é substituído de forma atômica, quem o lê uma vez
+    enxerga um conjunto consistente de partições até terminar a leitura.
+    """
+    if not os.path.exists(caminho):
+        return {"versao": None, "conjuntos": {}}
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def gravar_manifesto(manifesto, caminho=ARQUIVO_MANIFESTO):
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+@contextmanager
+def bloqueio(caminho=ARQUIVO_BLOQUEIO, espera=60):
+    """
+    Bloqueio entre processos (Streamlit, workers do uvicorn, CLI) para alterar o manifesto.
+    """
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    limite = time.monotonic() + espera
+    while True:
+        try:
+            descritor = os.open(caminho, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(caminho) > BLOQUEIO_EXPIRADO:
+                    os.remove(caminho)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > limite:
+                raise TimeoutError(f"Não foi possível obter o bloqueio {caminho}")
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(descritor)
+        os.remove(caminho)
+
+
+def calcular_versoes(manifesto):
+    # A versão de um conjunto depende só do conteúdo das suas partições
+    for dados in manifesto["conjuntos"].values():
+        conteudo = sorted((ano, particao["sha256"]) for ano, particao in dados["particoes"].items())
+        dados["versao"] = hash_texto(repr(conteudo))
+    conteudo = sorted((conjunto, dados["versao"]) for conjunto, dados in manifesto["conjuntos"].items())
+    manifesto["versao"] = hash_texto(repr(conteudo))
+
+
+def registrar_particoes(particoes):
+    """
+    Publica novas partições no manifesto de uma só vez.
+
+    Args:
+        particoes (list): Dicionários com conjunto, ano, arquivo, sha256, linhas, origem e datas inválidas.
+
+    Returns:
+        dict: Manifesto publicado.
+    """
+    if not particoes:
+        return ler_manifesto()
+
+    with bloqueio():
+        anterior = ler_manifesto()
+        manifesto = json.loads(json.dumps(anterior))
+
+        for particao in particoes:
+            conjunto = manifesto["conjuntos"].setdefault(particao["conjunto"], {"particoes": {}})
+            conjunto["particoes"][str(particao["ano"])] = {
+                "arquivo": os.path.basename(particao["arquivo"]),
+                "sha256": particao["sha256"],
+                "linhas": particao["linhas"],
+                "origem": particao["origem"],
+                "datas_invalidas": particao.get("datas_invalidas", {}),
+                "atualizado_em": time.time(),
+            }
+
+        calcular_versoes(manifesto)
+        manifesto["gerado_em"] = datetime.now().isoformat(timespec="seconds")
+        gravar_manifesto(manifesto)
+        coletar_lixo(anterior, manifesto)
+
+    return manifesto
+
+
+def coletar_lixo(anterior, atual):
+    """
+    Remove partições que não estão nem no manifesto atual nem no anterior; as do anterior
+    ficam mais uma geração para leitores que ainda estejam no meio de uma leitura.
+    """
+    manter = set()
+    for manifesto in (anterior, atual):
+        for conjunto, dados in manifesto["conjuntos"].items():
+            for particao in dados["particoes"].values():
+                manter.add(os.path.join(PASTA_COLUNAR, conjunto, particao["arquivo"]))
+
+    for conjunto in atual["conjuntos"]:
+        for arquivo in glob.glob(os.path.join(PASTA_COLUNAR, conjunto, "*.parquet")):
+            if arquivo not in manter:
+                try:
+                    os.remove(arquivo)
+                except OSError:
+                    pass
+
+
+def particao(conjunto, ano, manifesto=None):
+    manifesto = manifesto or ler_manifesto()
+    return manifesto["conjuntos"].get(conjunto, {}).get("particoes", {}).get(str(ano))
+
+
+def caminho_particao(conjunto, ano, manifesto=None):
+    registro = particao(conjunto, ano, manifesto)
+    if registro is None:
+        return None
+    return os.path.join(PASTA_COLUNAR, conjunto, registro["arquivo"])
+
+
+def anos_conjunto(conjunto, manifesto=None):
+    manifesto = manifesto or ler_manifesto()
+    return sorted(int(ano) for ano in manifesto["conjuntos"].get(conjunto, {}).get("particoes", {}))
+
+
+def versao_dados(manifesto=None):
+    return (manifesto or ler_manifesto())["versao"]
+
+
+def versao_conjunto(conjunto, manifesto=None):
+    manifesto = manifesto or ler_manifesto()
+    return manifesto["conjuntos"].get(conjunto, {}).get("versao")
+
+
+def ultima_modificacao_conjunto(conjunto, manifesto=None):
+    manifesto = manifesto or ler_manifesto()
+    particoes = manifesto["conjuntos"].get(conjunto, {}).get("particoes", {}).values()
+    return max((particao["atualizado_em"] for particao in particoes), default=0)
@@ -0,0 +1,105 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from memoria_conversa import contar_tokens
+
+
+# Tokens de texto do relatório por chamada ao modelo
+LIMITE_TOKENS_TRECHO = 3000
+
+# Trechos resumidos ao mesmo tempo
+PARALELISMO = int(os.getenv("RESUMO_PARALELISMO", "4"))
+
+# Incrementar ao mudar PROMPT_TRECHO
+VERSAO_PROMPT_TRECHO = 1
+
+PROMPT_TRECHO = """Você está lendo um trecho do relatório gerencial de um fundo imobiliário.
+Resuma de forma objetiva as informações relevantes do trecho: objetivos e estratégia, resultados
+financeiros do mês, dividendos, indicadores de performance, ativos e mudanças na carteira, riscos
+(alavancagem, concentração) e perspectivas. Preserve números, percentuais e datas. Se o trecho não
+tiver nada relevante, responda apenas "Sem informações relevantes".
+
+Trecho:
+{texto}"""
+
+
+def dividir_texto(texto, limite_tokens):
+    # Quebra uma página grande por linhas; linhas gigantes são cortadas por caracteres
+    if contar_tokens(texto) <= limite_tokens:
+        return [texto]
+
+    partes = []
+    for linha in texto.splitlines():
+        if contar_tokens(linha) <= limite_tokens:
+            partes.append(linha)
+        else:
+            passo = limite_tokens * 3
+            partes.extend(linha[inicio:inicio + passo] for inicio in range(0, len(linha), passo))
+    return partes
+
+
+def dividir_em_trechos(paginas, limite_tokens=LIMITE_TOKENS_TRECHO):
+    """
+    Agrupa as páginas, em ordem, em trechos de até `limite_tokens`. Páginas vazias são ignoradas.
+    É um gerador: cada trecho sai assim que fica completo, mesmo que `paginas` ainda esteja
+    sendo extraído.
+    """
+    atual = []
+    tokens_atual = 0
+    for pagina in paginas:
+        if not pagina or not pagina.strip():
+            continue
+        for parte in dividir_texto(pagina, limite_tokens):
+            tokens = contar_tokens(parte)
+            if atual and tokens_atual + tokens > limite_tokens:
+                yield "\n".join(atual)
+                atual, tokens_atual = [], 0
+            atual.append(parte)
+            tokens_atual += tokens
+    if atual:
+        yield "\n".join(atual)
+
+
+def resumir_trechos(trechos, completar, paralelismo=PARALELISMO):
+    """
+    Resume os trechos em paralelo, mantendo a ordem. Cada trecho é enviado assim que
+    `trechos` o produz.
+
+    Cada trecho passa por `completar(nome, versao_prompt, prompt, **parametros)`, que guarda
+    o resultado em cache; se algum falhar, os que deram certo já ficam guardados e uma nova
+    execução refaz apenas os que faltaram.
+    """
+    def resumir(trecho):
+        return completar("resumo_trecho", VERSAO_PROMPT_TRECHO, PROMPT_TRECHO.format(texto=trecho), temperature=0, max_tokens=500)
+
+    with ThreadPoolExecutor(max_workers=max(1, paralelismo)) as executor:
+        futuros = [executor.submit(resumir, trecho) for trecho in trechos]
+
+    falhas = [futuro.exception() for futuro in futuros if futuro.exception() is not None]
+    if falhas:
+        raise RuntimeError(f"{len(falhas)} de {len(futuros)} trechos falharam: {falhas[0]}") from falhas[0]
+    return [futuro.result() for futuro in futuros]
+
+
+def resumir_relatorio(paginas, completar, reduzir, limite_tokens=LIMITE_TOKENS_TRECHO, paralelismo=PARALELISMO):
+    """
+    Resumo de um relatório longo em map-reduce.
+
+    Args:
+        paginas (iterable): Texto de cada página do relatório (lista ou gerador).
+        completar (callable): Chamada ao modelo com cache, usada em cada trecho.
+        reduzir (callable): Recebe os resumos parciais concatenados e devolve o resumo final.
+        limite_tokens (int): Tamanho máximo de cada trecho.
+        paralelismo (int): Trechos resumidos ao mesmo tempo.
+
+    Returns:
+        str: Resumo final.
+    """
+    resumos = resumir_trechos(dividir_em_trechos(paginas or [], limite_tokens), completar, paralelismo)
+    if not resumos:
+        raise ValueError("Relatório sem texto para resumir")
+
+    # Se os resumos parciais ainda não cabem em um único prompt, são resumidos de novo em grupos
+    while len(resumos) > 1 and contar_tokens("\n\n".join(resumos)) > limite_tokens:
+        resumos = resumir_trechos(dividir_em_trechos(resumos, limite_tokens), completar, paralelismo)
+
+    return reduzir("\n\n".join(resumos))
@@ -0,0 +1,215 @@
+import os
+import glob
+import json
+import hashlib
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import ingestao
+import pontuacao
+import registro_dados
+
+
+PASTA_SCORES = os.path.join(ingestao.PASTA_COLUNAR, "scores")
+ARQUIVO_VERSAO = os.path.join(PASTA_SCORES, "versao.json")
+ARQUIVO_BLOQUEIO = ARQUIVO_VERSAO + ".lock"
+CAMINHO_TICKERS = os.path.join(ingestao.PASTA_DADOS, "Tickers", "cnpj_fundos.csv")
+
+# Features antes da normalização, guardadas para que a tabela possa ser atualizada por partes
+FEATURES_BRUTAS = [f"{feature}_Bruto" for feature in pontuacao.FEATURES]
+
+
+def caminho_particao(arquivo):
+    return os.path.join(PASTA_SCORES, arquivo)
+
+
+def hash_pesos(perfis):
+    return hashlib.sha1(json.dumps(perfis, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def ler_versao():
+    if not os.path.exists(ARQUIVO_VERSAO):
+        return {}
+    with open(ARQUIVO_VERSAO, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def gravar_json(caminho, conteudo):
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(conteudo, arquivo, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def gravar_parquet(df, ano):
+    """
+    Grava a partição com o hash do conteúdo no nome; arquivos publicados nunca são sobrescritos.
+
+    Returns:
+        str: Nome do arquivo gravado.
+    """
+    temporario = os.path.join(PASTA_SCORES, f"scores_{ano}.{os.getpid()}.tmp")
+    df.to_parquet(temporario, compression="zstd", index=False)
+    arquivo = f"scores_{ano}-{registro_dados.hash_arquivo(temporario)[:12]}.parquet"
+    os.replace(temporario, caminho_particao(arquivo))
+    return arquivo
+
+
+def coletar_lixo(anterior, atual):
+    # Mantém também a geração anterior, que ainda pode estar sendo lida
+    manter = set(anterior.get("arquivos", {}).values()) | set(atual["arquivos"].values())
+    for caminho in glob.glob(os.path.join(PASTA_SCORES, "*.parquet")):
+        if os.path.basename(caminho) not in manter:
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+
+def carregar_tickers():
+    df = pd.read_csv(CAMINHO_TICKERS, sep=";")
+    return df.rename(columns={'CNPJ': 'CNPJ_Fundo'})
+
+
+def fontes_atuais(manifesto=None):
+    manifesto = manifesto or registro_dados.ler_manifesto()
+    anos = registro_dados.anos_conjunto("complemento", manifesto)
+    return {str(ano): ingestao.versao_particao("complemento", ano, manifesto) for ano in anos}
+
+
+def montar_particao(ano, df_tickers, segmentos, manifesto=None):
+    colunas = ["CNPJ_Fundo", "Data_Referencia"] + pontuacao.FEATURES
+    df_complemento = ingestao.carregar_conjunto("complemento", colunas, anos=[ano], manifesto=manifesto)
+    base = pontuacao.montar_base(df_complemento, df_tickers, segmentos)
+    base[FEATURES_BRUTAS] = pontuacao.preparar_features(base[pontuacao.FEATURES].to_numpy())
+    return base.drop(columns=pontuacao.FEATURES)
+
+
+def pontuar_particao(particao, minimo, maximo, perfis):
+    nomes, pesos = pontuacao.matriz_pesos(perfis)
+    features = pontuacao.normalizar_features(particao[FEATURES_BRUTAS].to_numpy(), minimo, maximo)
+    scores = pontuacao.calcular_scores(features, pesos)
+
+    particao = particao.copy()
+    particao[pontuacao.FEATURES] = features
+    for i, perfil in enumerate(nomes):
+        particao[pontuacao.coluna_score(perfil)] = scores[:, i]
+    return particao
+
+
+def materializar_scores(perfis=pontuacao.PESOS_PERFIS, forcar=False):
+    """
+    Gera (ou atualiza) a tabela de scores por fundo e mês, uma partição por ano.
+
+    Só são remontados os anos cujo complemento mudou. A normalização é global (min-max
+    sobre todos os meses), então os demais anos só são repontuados quando os limites
+    ou os pesos mudam; caso contrário, ficam como estão.
+
+    Returns:
+        dict: Conteúdo do arquivo de versão gravado.
+    """
+    ingestao.ingerir(["complemento", "geral"])
+    os.makedirs(PASTA_SCORES, exist_ok=True)
+
+    with registro_dados.bloqueio(ARQUIVO_BLOQUEIO, espera=300):
+        return _materializar(perfis, forcar)
+
+
+def _materializar(perfis, forcar):
+    # Todas as fontes vêm do mesmo manifesto, mesmo que outra ingestão publique no meio
+    manifesto = registro_dados.ler_manifesto()
+    estado = ler_versao()
+    fontes = fontes_atuais(manifesto)
+    geral = ingestao.versao_conjunto("geral", manifesto)
+    tickers = registro_dados.hash_arquivo(CAMINHO_TICKERS)
+    pesos = hash_pesos(perfis)
+
+    completo = forcar or estado.get("tickers") != tickers or estado.get("features") != pontuacao.FEATURES
+    fontes_anteriores = {} if completo else estado.get("fontes", {})
+
+    df_tickers = carregar_tickers()
+    segmentos = pontuacao.segmentos_por_fundo(ingestao.carregar_conjunto("geral", ["CNPJ_Fundo", "Segmento_Atuacao"], manifesto=manifesto))
+
+    arquivos_anteriores = estado.get("arquivos", {})
+    particoes = {}
+    alterados = set()
+    for ano, versao in fontes.items():
+        arquivo = arquivos_anteriores.get(ano)
+        if fontes_anteriores.get(ano) == versao and arquivo and os.path.exists(caminho_particao(arquivo)):
+            particao = pd.read_parquet(caminho_particao(arquivo))
+            atualizada = pontuacao.aplicar_segmentos(particao, segmentos)
+            if not np.array_equal(atualizada["Segmento_Atuacao"].to_numpy(dtype=object), particao["Segmento_Atuacao"].to_numpy(dtype=object)):
+                alterados.add(ano)
+            particoes[ano] = atualizada
+        else:
+            print(f"Montando scores de {ano}...")
+            particoes[ano] = montar_particao(int(ano), df_tickers, segmentos, manifesto)
+            alterados.add(ano)
+
+    # Limites globais da normalização
+    brutos = np.concatenate([particao[FEATURES_BRUTAS].to_numpy() for particao in particoes.values()])
+    minimo, maximo = pontuacao.limites_features(brutos)
+    mesma_escala = (
+        estado.get("pesos") == pesos
+        and np.array_equal(estado.get("minimo", []), minimo)
+        and np.array_equal(estado.get("maximo", []), maximo)
+    )
+
+    repontuar = alterados if mesma_escala and not completo else set(particoes)
+    arquivos = {ano: arquivos_anteriores[ano] for ano in particoes if ano not in repontuar}
+    for ano in sorted(repontuar):
+        arquivos[ano] = gravar_parquet(pontuar_particao(particoes[ano], minimo, maximo, perfis), ano)
+
+    assinatura = json.dumps([fontes, geral, tickers, pesos, minimo.tolist(), maximo.tolist()], sort_keys=True)
+    nova_versao = {
+        "versao": hashlib.sha1(assinatura.encode()).hexdigest()[:16],
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "fontes": fontes,
+        "geral": geral,
+        "tickers": tickers,
+        "pesos": pesos,
+        "features": pontuacao.FEATURES,
+        "perfis": list(perfis),
+        "minimo": minimo.tolist(),
+        "maximo": maximo.tolist(),
+        "arquivos": dict(sorted(arquivos.items())),
+    }
+    # A nova tabela passa a valer quando o arquivo de versão é trocado
+    gravar_json(ARQUIVO_VERSAO, nova_versao)
+    coletar_lixo(estado, nova_versao)
+
+    print(f"Tabela de scores {nova_versao['versao']}: {len(repontuar)} de {len(particoes)} partições regravadas")
+    return nova_versao
+
+
+def tabela_desatualizada():
+    estado = ler_versao()
+    manifesto = registro_dados.ler_manifesto()
+    return (
+        not estado
+        or "arquivos" not in estado
+        or estado.get("fontes") != fontes_atuais(manifesto)
+        or estado.get("geral") != ingestao.versao_conjunto("geral", manifesto)
+        or estado.get("tickers") != registro_dados.hash_arquivo(CAMINHO_TICKERS)
+        or estado.get("pesos") != hash_pesos(pontuacao.PESOS_PERFIS)
+    )
+
+
+def carregar_scores():
+    """
+    Tabela de scores pronta para o recomendador, atualizada antes se necessário.
+
+    Returns:
+        tuple: (pd.DataFrame com os scores de todos os anos, versão da tabela)
+    """
+    ingestao.ingerir(["complemento", "geral"])
+    if tabela_desatualizada():
+        materializar_scores()
+
+    estado = ler_versao()
+    partes = [pd.read_parquet(caminho_particao(arquivo)) for arquivo in estado["arquivos"].values()]
+    return pd.concat(partes, ignore_index=True), estado["versao"]
+
+
+if __name__ == "__main__":
+    materializar_scores(forcar=True)
@@ -0,0 +1,123 @@
+import os
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from zipfile import BadZipFile, ZipFile
+import pytest
+import atualizacao_cvm
+import ingestao
+
+
+class ServidorCVM(SimpleHTTPRequestHandler):
+    # Registra cada requisição para os testes saberem o que foi baixado
+    requisicoes = None
+
+    def do_HEAD(self):
+        self.requisicoes.append(("HEAD", self.path))
+        super().do_HEAD()
+
+    def do_GET(self):
+        self.requisicoes.append(("GET", self.path))
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor(tmp_path, monkeypatch):
+    # Os caminhos de dados do projeto são relativos à pasta de trabalho
+    monkeypatch.chdir(tmp_path)
+    publicados = tmp_path / "cvm"
+    publicados.mkdir()
+
+    requisicoes = []
+    handler = partial(type("Servidor", (ServidorCVM,), {"requisicoes": requisicoes}), directory=str(publicados))
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_address[1]}/", publicados, requisicoes
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def publicar_zip(publicados, ano, passivo, mtime):
+    caminho = publicados / f"inf_mensal_fii_{ano}.zip"
+    with ZipFile(caminho, "w") as arquivo:
+        arquivo.writestr(
+            f"inf_mensal_fii_ativo_passivo_{ano}.csv",
+            f"CNPJ_Fundo;Data_Referencia;Total_Passivo\n11.111.111/0001-11;{ano}-01-01;{passivo}\n".encode("ISO-8859-1"),
+        )
+    # Last-Modified do http.server tem resolução de segundos
+    os.utime(caminho, (mtime, mtime))
+    return caminho
+
+
+def downloads(requisicoes):
+    return sorted(caminho for metodo, caminho in requisicoes if metodo == "GET" and caminho.endswith(".zip"))
+
+
+def test_primeira_execucao_baixa_e_extrai_todos_os_anos(servidor):
+    url, publicados, requisicoes = servidor
+    publicar_zip(publicados, 2023, 10, 1_700_000_000)
+    publicar_zip(publicados, 2024, 20, 1_700_000_000)
+
+    assert atualizacao_cvm.atualizar(url) == [2023, 2024]
+
+    assert downloads(requisicoes) == ["/inf_mensal_fii_2023.zip", "/inf_mensal_fii_2024.zip"]
+    assert os.path.exists(ingestao.caminho_csv("ativo_passivo", 2024))
+    assert set(atualizacao_cvm.ler_estado()) == {"2023", "2024"}
+
+
+def test_execucao_sem_alteracoes_nao_baixa_nada(servidor):
+    url, publicados, requisicoes = servidor
+    publicar_zip(publicados, 2023, 10, 1_700_000_000)
+    atualizacao_cvm.atualizar(url)
+    requisicoes.clear()
+
+    assert atualizacao_cvm.atualizar(url) == []
+
+    # Só o HEAD condicional de cada ano
+    assert downloads(requisicoes) == []
+    assert ("HEAD", "/inf_mensal_fii_2023.zip") in requisicoes
+
+
+def test_zip_alterado_baixa_e_reingere_so_o_seu_ano(servidor):
+    url, publicados, requisicoes = servidor
+    publicar_zip(publicados, 2023, 10, 1_700_000_000)
+    publicar_zip(publicados, 2024, 20, 1_700_000_000)
+    atualizacao_cvm.atualizar(url)
+    ingestao.ingerir(["ativo_passivo"], trabalhadores=1)
+    requisicoes.clear()
+
+    publicar_zip(publicados, 2024, 30, 1_700_000_100)
+    assert atualizacao_cvm.atualizar(url) == [2024]
+
+    assert downloads(requisicoes) == ["/inf_mensal_fii_2024.zip"]
+    relatorio = ingestao.ingerir(["ativo_passivo"], trabalhadores=1)
+    assert [item["ano"] for item in relatorio] == [2024]
+    df = ingestao.carregar_conjunto("ativo_passivo", ["Data_Referencia", "Total_Passivo"])
+    assert sorted(df["Total_Passivo"].tolist()) == [10, 30]
+
+
+def test_zip_corrompido_mantem_a_pasta_atual(servidor):
+    url, publicados, _ = servidor
+    publicar_zip(publicados, 2023, 10, 1_700_000_000)
+    atualizacao_cvm.atualizar(url)
+    estado = atualizacao_cvm.ler_estado()
+
+    corrompido = publicados / "inf_mensal_fii_2023.zip"
+    corrompido.write_bytes(b"isto nao e um zip")
+    os.utime(corrompido, (1_700_000_100, 1_700_000_100))
+    with pytest.raises(BadZipFile):
+        atualizacao_cvm.atualizar(url)
+
+    with open(ingestao.caminho_csv("ativo_passivo", 2023), encoding="ISO-8859-1") as arquivo:
+        assert arquivo.read().splitlines()[1].endswith(";10")
+    # O estado continua apontando para o último download bom, que será tentado de novo
+    assert atualizacao_cvm.ler_estado() == estado
+    assert [nome for nome in os.listdir(ingestao.PASTA_DADOS) if nome.startswith(".")] == [
+        os.readlink(os.path.join(ingestao.PASTA_DADOS, "inf_mensal_fii_2023"))
+    ]
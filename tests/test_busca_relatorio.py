@@ -0,0 +1,81 @@
+import os
+from datetime import datetime
+import pytest
+import busca_relatorio
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DOCUMENTO = "https://fnet.bmfbovespa.com.br/fnet/publico/exibirDocumento?id={}"
+
+
+def ler_fixture(nome):
+    with open(os.path.join(FIXTURES, nome), encoding="utf-8") as arquivo:
+        return arquivo.read()
+
+
+@pytest.fixture
+def indice():
+    return busca_relatorio.indexar_relatorios(ler_fixture("fundo_varios_relatorios.html"))
+
+
+def test_indexa_so_relatorios_gerenciais_com_mes_valido(indice):
+    # Fato relevante, informe mensal, mês 13 e link sem href ficam de fora
+    assert indice == {
+        (2024, 9): DOCUMENTO.format(800909),
+        (2024, 8): DOCUMENTO.format(790808),
+        (2024, 7): DOCUMENTO.format(780707),
+        (2023, 12): DOCUMENTO.format(701212),
+    }
+
+
+def test_mesmo_mes_vale_o_primeiro_link_da_pagina(indice):
+    assert indice[(2024, 8)] == DOCUMENTO.format(790808)
+
+
+def test_mais_recente_ate_a_referencia(indice):
+    assert busca_relatorio.mais_recente(indice, datetime(2024, 10, 15)) == ("2024-09", DOCUMENTO.format(800909))
+    # Relatórios posteriores ao mês de referência não contam
+    assert busca_relatorio.mais_recente(indice, datetime(2024, 8, 1)) == ("2024-08", DOCUMENTO.format(790808))
+    assert busca_relatorio.mais_recente(indice, datetime(2024, 3, 1)) == ("2023-12", DOCUMENTO.format(701212))
+
+
+def test_mais_recente_respeita_o_limite_de_meses(indice):
+    assert busca_relatorio.mais_recente(indice, datetime(2026, 9, 1), limite_meses=24) == ("2024-09", DOCUMENTO.format(800909))
+    assert busca_relatorio.mais_recente(indice, datetime(2026, 10, 1), limite_meses=24) == (None, None)
+
+
+def test_pagina_sem_relatorio_gerencial():
+    indice = busca_relatorio.indexar_relatorios(ler_fixture("fundo_sem_relatorios.html"))
+    assert indice == {}
+    assert busca_relatorio.mais_recente(indice, datetime(2024, 10, 15)) == (None, None)
+
+
+def test_mais_recente_sem_relatorio_antes_da_referencia(indice):
+    assert busca_relatorio.mais_recente(indice, datetime(2023, 11, 30)) == (None, None)
+
+
+class SessaoFalsa:
+    def __init__(self, html):
+        self.html = html
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        return self
+
+    def raise_for_status(self):
+        pass
+
+    @property
+    def text(self):
+        return self.html
+
+
+def test_obter_indice_baixa_a_pagina_uma_vez_por_ttl(monkeypatch):
+    monkeypatch.setattr(busca_relatorio, "_indices", {})
+    sessao = SessaoFalsa(ler_fixture("fundo_varios_relatorios.html"))
+
+    primeiro = busca_relatorio.obter_indice("XPML11", sessao=sessao)
+    segundo = busca_relatorio.obter_indice("xpml11", sessao=sessao)
+
+    assert primeiro == segundo and len(primeiro) == 4
+    assert sessao.urls == [busca_relatorio.URL_FUNDO.format(ticker="xpml11")]
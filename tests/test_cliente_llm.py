@@ -0,0 +1,170 @@
+import json
+import time
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import openai
+import pytest
+from cliente_llm import ClienteLLM
+
+
+MENSAGENS = [{"role": "user", "content": "oi"}]
+
+
+class OpenAIFalsa(BaseHTTPRequestHandler):
+    """
+    Servidor compatível com /v1/chat/completions. Cada requisição consome o próximo item de
+    `servidor.roteiro` (status, cabeçalhos); sem roteiro, responde 200 depois de `servidor.atraso`.
+    """
+
+    def do_POST(self):
+        servidor = self.server
+        corpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with servidor.lock:
+            servidor.requisicoes.append(time.perf_counter())
+            servidor.ativas += 1
+            servidor.maximo_ativas = max(servidor.maximo_ativas, servidor.ativas)
+            status, cabecalhos = servidor.roteiro.pop(0) if servidor.roteiro else (200, {})
+        try:
+            time.sleep(servidor.atraso)
+            if status != 200:
+                self.responder(status, {"error": {"message": "limite", "type": "rate_limit"}}, cabecalhos)
+            elif corpo.get("stream"):
+                self.transmitir(servidor.trechos, servidor.intervalo)
+            else:
+                self.responder(200, {
+                    "id": "c", "object": "chat.completion", "created": 0, "model": corpo["model"],
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": "resposta"}, "finish_reason": "stop"}],
+                })
+        finally:
+            with servidor.lock:
+                servidor.ativas -= 1
+
+    def responder(self, status, dados, cabecalhos=None):
+        conteudo = json.dumps(dados).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(conteudo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(conteudo)
+
+    def transmitir(self, trechos, intervalo):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for trecho in trechos:
+            chunk = {
+                "id": "c", "object": "chat.completion.chunk", "created": 0, "model": "m",
+                "choices": [{"index": 0, "delta": {"content": trecho}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(intervalo)
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, *args):
+        pass
+
+
+class ServidorFalso(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), OpenAIFalsa)
+        self.lock = threading.Lock()
+        self.requisicoes = []
+        self.roteiro = []
+        self.ativas = 0
+        self.maximo_ativas = 0
+        self.atraso = 0
+        self.trechos = ["Olá", ", ", "mundo"]
+        self.intervalo = 0
+
+    def handle_error(self, request, client_address):
+        # O cliente fechar a conexão no meio (timeout, stream encerrado) é esperado nos testes
+        pass
+
+
+@pytest.fixture
+def servidor():
+    servidor = ServidorFalso()
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def cliente(servidor, **parametros):
+    return ClienteLLM(api_key="teste", base_url=f"http://127.0.0.1:{servidor.server_address[1]}/v1", **parametros)
+
+
+def test_semaforo_limita_chamadas_simultaneas(servidor):
+    servidor.atraso = 0.2
+
+    async def principal():
+        llm = cliente(servidor, limite=2)
+        return await asyncio.gather(*(llm.completar(MENSAGENS) for _ in range(6)))
+
+    respostas = asyncio.run(principal())
+
+    assert [resposta.choices[0].message.content for resposta in respostas] == ["resposta"] * 6
+    assert len(servidor.requisicoes) == 6
+    assert servidor.maximo_ativas == 2
+
+
+def test_429_espera_o_retry_after_e_tenta_de_novo(servidor):
+    servidor.roteiro = [(429, {"Retry-After": "0.3"})]
+
+    resposta = asyncio.run(cliente(servidor, tentativas=2).completar(MENSAGENS))
+
+    assert resposta.choices[0].message.content == "resposta"
+    primeira, segunda = servidor.requisicoes
+    assert segunda - primeira >= 0.3
+
+
+def test_429_na_ultima_tentativa_e_repassado(servidor):
+    servidor.roteiro = [(429, {"Retry-After": "0"})] * 2
+
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(cliente(servidor, tentativas=2).completar(MENSAGENS))
+
+    assert len(servidor.requisicoes) == 2
+
+
+def test_timeout_estoura_sem_esperar_o_servidor(servidor):
+    servidor.atraso = 3
+    inicio = time.perf_counter()
+
+    with pytest.raises((asyncio.TimeoutError, openai.APITimeoutError)):
+        asyncio.run(cliente(servidor, timeout=0.3, tentativas=1).completar(MENSAGENS))
+
+    assert time.perf_counter() - inicio < 2
+
+
+def test_transmitir_entrega_os_trechos_em_ordem(servidor):
+    async def principal():
+        return [trecho async for trecho in cliente(servidor).transmitir(MENSAGENS)]
+
+    assert asyncio.run(principal()) == ["Olá", ", ", "mundo"]
+
+
+def test_transmitir_fechado_no_meio_libera_o_semaforo(servidor):
+    servidor.trechos = [f"trecho {i} " for i in range(20)]
+    servidor.intervalo = 0.1
+
+    async def principal():
+        llm = cliente(servidor, limite=1)
+        stream = llm.transmitir(MENSAGENS)
+        primeiro = await stream.__anext__()
+        await stream.aclose()
+        # Com limite 1, uma nova chamada só passa se o stream fechado devolveu a vaga
+        resposta = await asyncio.wait_for(llm.completar(MENSAGENS), 2)
+        return primeiro, resposta
+
+    primeiro, resposta = asyncio.run(principal())
+
+    assert primeiro == "trecho 0 "
+    assert resposta.choices[0].message.content == "resposta"
@@ -0,0 +1,95 @@
+import time
+import threading
+import pytest
+from cotacoes import BaseCotacoes
+
+
+class FornecedorFalso:
+    """Provedor falso: registra os lotes pedidos e pode segurar a resposta até ser liberado."""
+
+    def __init__(self, precos):
+        self.precos = dict(precos)
+        self.chamadas = []
+        self.liberado = threading.Event()
+        self.liberado.set()
+
+    def __call__(self, tickers):
+        self.chamadas.append(list(tickers))
+        self.liberado.wait(timeout=10)
+        return {ticker: self.precos[ticker] for ticker in tickers if ticker in self.precos}
+
+
+@pytest.fixture
+def nova_base(tmp_path):
+    criadas = []
+
+    def criar(fornecedor, **parametros):
+        base = BaseCotacoes(fornecedor=fornecedor, caminho=str(tmp_path / "cotacoes.sqlite3"), **parametros)
+        criadas.append(base)
+        return base
+
+    yield criar
+    for base in criadas:
+        base._executor.shutdown(wait=True)
+        if base._conexao is not None:
+            base._conexao.close()
+
+
+def test_ticker_ausente_e_buscado_na_hora(nova_base):
+    fornecedor = FornecedorFalso({"HGLG11": 160.5, "KNRI11": 140.0})
+    base = nova_base(fornecedor)
+
+    precos = base.precos(["hglg11", "KNRI11", "XXXX11"])
+
+    assert precos.to_dict() == {"HGLG11": 160.5, "KNRI11": 140.0}
+    assert fornecedor.chamadas == [["HGLG11", "KNRI11", "XXXX11"]]
+    # Quem o provedor não cota não é buscado de novo a cada leitura
+    base.precos(["XXXX11"])
+    assert len(fornecedor.chamadas) == 1
+
+
+def test_cotacao_vencida_e_atualizada_em_segundo_plano_sem_bloquear(nova_base):
+    fornecedor = FornecedorFalso({"HGLG11": 160.5})
+    base = nova_base(fornecedor, validade=0)
+    base.precos(["HGLG11"])
+
+    fornecedor.precos["HGLG11"] = 170.0
+    fornecedor.liberado.clear()
+    inicio = time.perf_counter()
+    precos = base.precos(["HGLG11"])
+
+    # Leitura imediata com o último preço conhecido, enquanto o provedor está parado
+    assert time.perf_counter() - inicio < 1
+    assert precos.to_dict() == {"HGLG11": 160.5}
+    fornecedor.liberado.set()
+    base._executor.submit(lambda: None).result(timeout=10)
+
+    assert base.precos(["HGLG11"], aguardar_ausentes=False).to_dict() == {"HGLG11": 170.0}
+    assert fornecedor.chamadas[:2] == [["HGLG11"], ["HGLG11"]]
+
+
+def test_precos_persistem_entre_instancias(nova_base):
+    nova_base(FornecedorFalso({"HGLG11": 160.5})).precos(["HGLG11"])
+
+    fornecedor = FornecedorFalso({})
+    precos = nova_base(fornecedor).precos(["HGLG11"])
+
+    assert precos.to_dict() == {"HGLG11": 160.5}
+    assert fornecedor.chamadas == []
+
+
+def test_versao_muda_a_cada_atualizacao_gravada(nova_base):
+    fornecedor = FornecedorFalso({"HGLG11": 160.5, "KNRI11": 140.0, "MXRF11": 10.2})
+    base = nova_base(fornecedor, lote=2)
+    assert base.versao == 0
+
+    assert base.atualizar(["HGLG11"]) == 1
+    assert base.versao == 1
+
+    # Um incremento por lote gravado
+    assert base.atualizar(["HGLG11", "KNRI11", "MXRF11"]) == 3
+    assert base.versao == 3
+
+    # Nada gravado, nada muda
+    assert base.atualizar(["XXXX11"]) == 0
+    assert base.versao == 3
@@ -0,0 +1,38 @@
+import pytest
+import benchmark_extracao
+import extracao_pdf
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    return benchmark_extracao.gerar_pdfs(str(tmp_path), quantidade=1, paginas=60)[0]
+
+
+@pytest.fixture
+def com_pool(monkeypatch):
+    # Força o caminho paralelo mesmo em máquinas com uma só CPU
+    monkeypatch.setattr(extracao_pdf, "CPUS", 2)
+    yield
+    with extracao_pdf._lock:
+        for executor in extracao_pdf._pools.values():
+            executor.shutdown()
+        extracao_pdf._pools.clear()
+
+
+def test_uma_cpu_nunca_usa_o_pool(monkeypatch):
+    monkeypatch.setattr(extracao_pdf, "CPUS", 1)
+
+    assert not extracao_pdf.usar_pool(1000, trabalhadores=4)
+
+
+def test_paralelo_devolve_as_paginas_em_ordem_como_o_sequencial(pdf, com_pool):
+    serial = list(extracao_pdf.extrair_paginas(pdf, trabalhadores=1))
+
+    paralelo = list(extracao_pdf.extrair_paginas(pdf, trabalhadores=3))
+
+    assert extracao_pdf._pools, "o caminho paralelo não foi usado"
+    assert paralelo == serial
+    # Páginas com imagem e em branco (2 a cada 10) ficam de fora, as demais saem na ordem do arquivo
+    esperado = [texto for texto in benchmark_extracao.sequencial(pdf) if len(texto.strip()) >= extracao_pdf.MINIMO_CARACTERES]
+    assert len(paralelo) == 48
+    assert paralelo == esperado
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+import ingestao
+
+
+def gravar_csv(caminho, linhas):
+    caminho.write_text("\n".join(linhas) + "\n", encoding="ISO-8859-1")
+    return str(caminho)
+
+
+def test_converter_datas_aceita_iso_e_dia_mes_ano():
+    serie = pd.Series(["2022-01-01", "01/02/2022", " 2022-03-01 ", None, "", "31/02/2022"])
+
+    datas, invalidas = ingestao.converter_datas(serie, ingestao.FORMATOS_DATA["Data_Referencia"])
+
+    assert datas.iloc[:3].tolist() == [pd.Timestamp("2022-01-01"), pd.Timestamp("2022-02-01"), pd.Timestamp("2022-03-01")]
+    assert datas.iloc[3:].isna().all()
+    # Vazios não são erro; um valor preenchido que nenhum formato lê é
+    assert invalidas.tolist() == [False, False, False, False, False, True]
+
+
+def test_csv_com_datas_dia_mes_ano_nao_perde_linhas(tmp_path):
+    # Como o complemento 2022 da CVM
+    caminho = gravar_csv(tmp_path / "complemento.csv", [
+        "CNPJ_Fundo;Data_Referencia;Data_Informacao_Numero_Cotistas;Percentual_Dividend_Yield_Mes",
+        "11.111.111/0001-11;01/01/2022;31/01/2022;0,0075",
+        "11.111.111/0001-11;01/02/2022;2022-02-28;0,0080",
+    ])
+
+    df, datas_invalidas = ingestao.ler_csv_cvm(caminho, "complemento")
+
+    assert df["Data_Referencia"].tolist() == [pd.Timestamp("2022-01-01"), pd.Timestamp("2022-02-01")]
+    assert df["Data_Informacao_Numero_Cotistas"].notna().all()
+    assert df["Percentual_Dividend_Yield_Mes"].tolist() == [0.0075, 0.0080]
+    assert datas_invalidas == {}
+
+
+def test_datas_invalidas_entram_no_relatorio(tmp_path):
+    caminho = gravar_csv(tmp_path / "geral.csv", [
+        "CNPJ_Fundo;Data_Referencia;Data_Entrega",
+        "11.111.111/0001-11;2022-01-01;2022-02-10",
+        "22.222.222/0001-22;2022-01-01;10.02.2022",
+    ])
+
+    df, datas_invalidas = ingestao.ler_csv_cvm(caminho, "geral")
+
+    assert df["Data_Entrega"].isna().tolist() == [False, True]
+    assert datas_invalidas == {"Data_Entrega": {"linhas": 1, "exemplos": ["10.02.2022"]}}
+
+
+def test_data_referencia_ilegivel_recusa_o_arquivo(tmp_path):
+    caminho = gravar_csv(tmp_path / "ativo_passivo.csv", [
+        "CNPJ_Fundo;Data_Referencia;Total_Passivo",
+        "11.111.111/0001-11;2022-01-01;10",
+        "11.111.111/0001-11;jan/2022;20",
+    ])
+
+    with pytest.raises(ValueError, match="Data_Referencia"):
+        ingestao.ler_csv_cvm(caminho, "ativo_passivo")
@@ -0,0 +1,139 @@
+import asyncio
+import memoria_conversa
+from memoria_conversa import MemoriaConversa, contar_tokens, montar_mensagens, tokens_mensagem
+
+
+def conversa(quantidade, palavras=20):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"mensagem {i} " + "palavra " * palavras}
+        for i in range(quantidade)
+    ]
+
+
+class ResumidorFalso:
+    """Modelo falso: registra os blocos recebidos e devolve um resumo curto e previsível."""
+
+    def __init__(self):
+        self.chamadas = []
+
+    def __call__(self, resumo_anterior, bloco):
+        self.chamadas.append((resumo_anterior, [m["content"] for m in bloco]))
+        return f"resumo {len(self.chamadas)}"
+
+
+def tokens_historico(resumo, janela):
+    # Tudo o que vai ao modelo além do contexto do sistema
+    return sum(tokens_mensagem(m) for m in montar_mensagens("", resumo, janela)[1:])
+
+
+def memoria_pequena(**parametros):
+    return MemoriaConversa(limite_tokens=200, recentes_minimo=2, mensagens_por_bloco=2, reserva_resumo=20, **parametros)
+
+
+def test_conversa_curta_vai_inteira_sem_resumo():
+    resumir = ResumidorFalso()
+    mensagens = conversa(3)
+
+    resumo, janela = memoria_pequena().compactar(mensagens, resumir)
+
+    assert resumo == ""
+    assert janela == mensagens
+    assert resumir.chamadas == []
+
+
+def test_conversa_longa_fica_no_orcamento_com_resumo():
+    resumir = ResumidorFalso()
+    memoria = memoria_pequena()
+    mensagens = conversa(20)
+
+    resumo, janela = memoria.compactar(mensagens, resumir)
+
+    assert resumo == f"resumo {len(resumir.chamadas)}"
+    assert tokens_historico(resumo, janela) <= memoria.limite_tokens
+    # A janela é o fim da conversa, na íntegra, com ao menos as mensagens recentes mínimas
+    assert len(janela) >= memoria.recentes_minimo
+    assert janela == mensagens[-len(janela):]
+    # Os blocos resumidos são exatamente as mensagens que ficaram fora da janela, em ordem
+    resumidas = [conteudo for _, bloco in resumir.chamadas for conteudo in bloco]
+    assert resumidas == [m["content"] for m in mensagens[:len(mensagens) - len(janela)]]
+
+
+def test_resumo_encadeia_o_anterior_e_entra_como_mensagem_de_sistema():
+    resumir = ResumidorFalso()
+    resumo, janela = memoria_pequena().compactar(conversa(20), resumir)
+
+    anteriores = [anterior for anterior, _ in resumir.chamadas]
+    assert anteriores == [""] + [f"resumo {i}" for i in range(1, len(resumir.chamadas))]
+
+    enviadas = montar_mensagens("contexto", resumo, janela)
+    assert enviadas[0] == {"role": "system", "content": "contexto"}
+    assert enviadas[1]["role"] == "system" and resumo in enviadas[1]["content"]
+    assert enviadas[2:] == janela
+
+
+def test_blocos_ja_resumidos_vem_do_cache():
+    resumir = ResumidorFalso()
+    memoria = memoria_pequena()
+    mensagens = conversa(20)
+
+    memoria.compactar(mensagens, resumir)
+    chamadas = len(resumir.chamadas)
+    memoria.compactar(mensagens, resumir)
+    assert len(resumir.chamadas) == chamadas
+
+    # Uma nova troca só resume o que passou a ficar fora da janela
+    memoria.compactar(mensagens + conversa(2), resumir)
+    assert len(resumir.chamadas) <= chamadas + 1
+
+
+def test_mensagens_recentes_acima_do_orcamento_sao_cortadas():
+    resumir = ResumidorFalso()
+    memoria = memoria_pequena()
+    mensagens = conversa(4, palavras=5) + conversa(2, palavras=400)
+
+    resumo, janela = memoria.compactar(mensagens, resumir)
+
+    assert tokens_historico(resumo, janela) <= memoria.limite_tokens
+    # A pergunta atual continua sendo a última mensagem, com o início preservado
+    assert janela[-1]["role"] == mensagens[-1]["role"]
+    assert mensagens[-1]["content"].startswith(janela[-1]["content"].removesuffix(memoria_conversa.MARCA_TRUNCADO))
+    assert all(m in mensagens or m["content"].endswith(memoria_conversa.MARCA_TRUNCADO) for m in janela)
+
+
+def test_truncar_texto_respeita_o_limite():
+    texto = "palavra " * 100
+    assert memoria_conversa.truncar_texto(texto, 1000) == texto
+    cortado = memoria_conversa.truncar_texto(texto, 30)
+    assert contar_tokens(cortado) <= 30
+    assert cortado.endswith(memoria_conversa.MARCA_TRUNCADO)
+
+
+def test_compactar_async_usa_o_mesmo_corte():
+    resumir = ResumidorFalso()
+
+    async def resumir_async(resumo_anterior, bloco):
+        return resumir(resumo_anterior, bloco)
+
+    mensagens = conversa(20)
+    esperado = memoria_pequena().compactar(mensagens, ResumidorFalso())
+    assert asyncio.run(memoria_pequena().compactar_async(mensagens, resumir_async)) == esperado
+
+
+def test_codificador_carregado_so_na_primeira_contagem(monkeypatch):
+    carregamentos = []
+
+    class TiktokenFalso:
+        @staticmethod
+        def get_encoding(nome):
+            carregamentos.append(nome)
+            return type("Codificador", (), {"encode": staticmethod(str.split)})()
+
+    monkeypatch.setattr(memoria_conversa, "tiktoken", TiktokenFalso)
+    memoria_conversa.codificador.cache_clear()
+    try:
+        assert carregamentos == []
+        assert contar_tokens("uma frase com cinco palavras") == 5
+        assert contar_tokens("mais duas") == 2
+        assert carregamentos == ["cl100k_base"]
+    finally:
+        memoria_conversa.codificador.cache_clear()